@@ -0,0 +1,257 @@
+"""
+Servidor local que imita la Bot API de Telegram para pruebas de carga de extremo a extremo.
+
+Entrega updates por getUpdates (long polling) o, si se llama a setWebhook, por POST
+al webhook registrado; responde a sendMessage, editMessageText, sendPoll,
+answerCallbackQuery y al resto de métodos con respuestas con la forma de las reales.
+Se puede añadir latencia a cada llamada e inyectar errores 429 con retry_after.
+
+El bot se apunta a este servidor sin tocar su código:
+
+    python benchmarks/api_falsa.py --puerto 8081
+    TELEGRAM_BASE_URL=http://127.0.0.1:8081/bot python bot/bot.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Optional
+from urllib.parse import parse_qsl
+
+# Métodos que envían o modifican mensajes: son los únicos en los que se inyectan 429
+METODOS_SALIDA = {"sendMessage", "editMessageText", "sendPoll", "answerCallbackQuery"}
+
+
+class ServidorAPIFalsa:
+    """
+    Bot API en memoria servida en 127.0.0.1:*puerto*.
+
+    *al_enviar*, si se indica, se llama con (método, datos de la petición, mensaje
+    devuelto) cada vez que el bot envía o edita un mensaje, desde el hilo que atiende
+    la petición; es el punto de enganche del generador de carga.
+    """
+
+    def __init__(self, puerto: int = 8081, latencia: float = 0.0, tasa_429: float = 0.0,
+                 retry_after: int = 1, al_enviar: Optional[Callable[[str, Dict[str, Any], Any], None]] = None,
+                 semilla: int = 1):
+        self.puerto = puerto
+        self.latencia = latencia
+        self.tasa_429 = tasa_429
+        self.retry_after = retry_after
+        self.al_enviar = al_enviar
+        self.llamadas: Counter = Counter()
+        self.errores_429 = 0
+        self.webhook: Optional[str] = None
+        self.listo = threading.Event()  # Se activa con la primera llamada a getUpdates
+
+        self._rnd = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._hay_updates = threading.Condition(self._lock)
+        self._pendientes: Deque[Dict[str, Any]] = deque()
+        self._siguiente_update = 1
+        self._siguiente_mensaje: Dict[int, int] = {}
+        self._entregas: Optional[ThreadPoolExecutor] = None
+        self._servidor: Optional[ThreadingHTTPServer] = None
+
+    # ----------------------------------------------------------------------- #
+    #  Updates                                                                #
+    # ----------------------------------------------------------------------- #
+    def encolar_update(self, datos: Dict[str, Any]) -> int:
+        """Añade un update (se le asigna update_id) y lo entrega por getUpdates o por el webhook."""
+        with self._lock:
+            datos["update_id"] = self._siguiente_update
+            self._siguiente_update += 1
+            if self.webhook is None:
+                self._pendientes.append(datos)
+                self._hay_updates.notify_all()
+                return datos["update_id"]
+            url, entregas = self.webhook, self._entregas
+        entregas.submit(self._entregar_webhook, url, datos)
+        return datos["update_id"]
+
+    def _entregar_webhook(self, url: str, datos: Dict[str, Any]) -> None:
+        peticion = urllib.request.Request(url, data=json.dumps(datos).encode("utf-8"),
+                                          headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(peticion, timeout=10).read()
+        except OSError as e:
+            print(f"Error entregando el update {datos['update_id']} al webhook: {e}", file=sys.stderr)
+
+    def _get_updates(self, datos: Dict[str, Any]) -> list:
+        offset = int(datos.get("offset", 0) or 0)
+        limite = int(datos.get("limit", 100) or 100)
+        espera = float(datos.get("timeout", 0) or 0)
+        self.listo.set()
+        fin = time.monotonic() + espera
+        with self._hay_updates:
+            while True:
+                # Los updates con id menor que offset quedan confirmados
+                while self._pendientes and self._pendientes[0]["update_id"] < offset:
+                    self._pendientes.popleft()
+                restante = fin - time.monotonic()
+                if self._pendientes or restante <= 0:
+                    break
+                self._hay_updates.wait(restante)
+            return [self._pendientes[i] for i in range(min(limite, len(self._pendientes)))]
+
+    # ----------------------------------------------------------------------- #
+    #  Métodos de la API                                                      #
+    # ----------------------------------------------------------------------- #
+    def _mensaje(self, datos: Dict[str, Any], editado: bool) -> Dict[str, Any]:
+        chat_id = int(datos.get("chat_id", 0))
+        with self._lock:
+            if editado and datos.get("message_id"):
+                message_id = int(datos["message_id"])
+            else:
+                message_id = self._siguiente_mensaje.get(chat_id, 1) + 1
+                self._siguiente_mensaje[chat_id] = message_id
+        mensaje = {"message_id": message_id, "date": int(time.time()),
+                   "chat": {"id": chat_id, "type": "private"}, "text": datos.get("text", "")}
+        if editado:
+            mensaje["edit_date"] = int(time.time())
+        if datos.get("reply_markup"):
+            markup = datos["reply_markup"]
+            mensaje["reply_markup"] = json.loads(markup) if isinstance(markup, str) else markup
+        return mensaje
+
+    def atender(self, metodo: str, datos: Dict[str, Any]) -> tuple[int, Dict[str, Any]]:
+        """Resuelve una llamada a la API y devuelve (código HTTP, cuerpo JSON)."""
+        with self._lock:
+            self.llamadas[metodo] += 1
+        if metodo != "getUpdates" and self.latencia:
+            time.sleep(self.latencia)
+        if metodo in METODOS_SALIDA and self.tasa_429 and self._rnd.random() < self.tasa_429:
+            with self._lock:
+                self.errores_429 += 1
+            return 429, {"ok": False, "error_code": 429,
+                         "description": f"Too Many Requests: retry after {self.retry_after}",
+                         "parameters": {"retry_after": self.retry_after}}
+
+        if metodo == "getUpdates":
+            resultado: Any = self._get_updates(datos)
+        elif metodo == "getMe":
+            resultado = {"id": 1, "is_bot": True, "first_name": "API falsa", "username": "api_falsa_bot",
+                         "can_join_groups": False, "can_read_all_group_messages": False,
+                         "supports_inline_queries": False}
+        elif metodo in ("sendMessage", "editMessageText"):
+            resultado = self._mensaje(datos, editado=metodo == "editMessageText")
+        elif metodo == "sendPoll":
+            resultado = self._mensaje(datos, editado=False)
+            opciones = datos.get("options", [])
+            opciones = json.loads(opciones) if isinstance(opciones, str) else opciones
+            resultado["poll"] = {
+                "id": f"{resultado['chat']['id']}_{resultado['message_id']}", "question": datos.get("question", ""),
+                "options": [{"text": o, "voter_count": 0} for o in opciones], "total_voter_count": 0,
+                "is_closed": False, "is_anonymous": False, "type": datos.get("type", "quiz"),
+                "allows_multiple_answers": False,
+            }
+        elif metodo == "setWebhook":
+            with self._lock:
+                self.webhook = datos.get("url") or None
+                if self.webhook and self._entregas is None:
+                    self._entregas = ThreadPoolExecutor(int(datos.get("max_connections", 40) or 40))
+            resultado = True
+        elif metodo == "deleteWebhook":
+            with self._lock:
+                self.webhook = None
+            resultado = True
+        elif metodo == "getWebhookInfo":
+            resultado = {"url": self.webhook or "", "has_custom_certificate": False,
+                         "pending_update_count": len(self._pendientes)}
+        else:
+            # answerCallbackQuery, deleteMessage, setMyCommands...
+            resultado = True
+
+        if metodo in ("sendMessage", "editMessageText", "sendPoll") and self.al_enviar is not None:
+            self.al_enviar(metodo, datos, resultado)
+        return 200, {"ok": True, "result": resultado}
+
+    # ----------------------------------------------------------------------- #
+    #  Servidor HTTP                                                          #
+    # ----------------------------------------------------------------------- #
+    def iniciar(self) -> None:
+        api = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            # HTTP/1.1 para que el pool de urllib3 del bot reutilice las conexiones
+            protocol_version = "HTTP/1.1"
+            # Cabeceras y cuerpo van en dos escrituras: sin esto Nagle añade ~40 ms por llamada
+            disable_nagle_algorithm = True
+
+            def _responder(self) -> None:
+                # Ruta: /bot<token>/<método>
+                partes = self.path.split("?", 1)
+                metodo = partes[0].rsplit("/", 1)[-1]
+                datos: Dict[str, Any] = dict(parse_qsl(partes[1])) if len(partes) > 1 else {}
+                longitud = int(self.headers.get("Content-Length") or 0)
+                if longitud:
+                    cuerpo = self.rfile.read(longitud)
+                    if "json" in (self.headers.get("Content-Type") or ""):
+                        datos.update(json.loads(cuerpo))
+                    else:
+                        datos.update(parse_qsl(cuerpo.decode("utf-8")))
+                codigo, respuesta = api.atender(metodo, datos)
+                salida = json.dumps(respuesta).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(salida)))
+                self.end_headers()
+                self.wfile.write(salida)
+
+            do_GET = _responder
+            do_POST = _responder
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", self.puerto), Manejador)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name="api-falsa", daemon=True).start()
+
+    def detener(self) -> None:
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+        if self._entregas is not None:
+            self._entregas.shutdown(wait=False)
+
+    @property
+    def base_url(self) -> str:
+        """Valor para TELEGRAM_BASE_URL."""
+        return f"http://127.0.0.1:{self.puerto}/bot"
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Bot API de Telegram falsa para pruebas locales")
+    p.add_argument("--puerto", type=int, default=8081)
+    p.add_argument("--latencia", type=float, default=0.0, help="Latencia añadida a cada llamada (s)")
+    p.add_argument("--tasa-429", type=float, default=0.0, help="Fracción de envíos que responden 429")
+    p.add_argument("--retry-after", type=int, default=1, help="retry_after de los 429 (s)")
+    return p
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    servidor = ServidorAPIFalsa(args.puerto, args.latencia, args.tasa_429, args.retry_after)
+    servidor.iniciar()
+    print(f"API falsa escuchando: TELEGRAM_BASE_URL={servidor.base_url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"Llamadas: {dict(servidor.llamadas)} (429 inyectados: {servidor.errores_429})")
+    except KeyboardInterrupt:
+        servidor.detener()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
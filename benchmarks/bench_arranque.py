@@ -0,0 +1,145 @@
+"""
+Arranque en frío del bot contra la API falsa de api_falsa.py.
+
+Lanza `bot/bot.py` varias veces sobre un banco sintético (10 000 preguntas por
+defecto) con un /start ya encolado, como el primer usuario que escribe durante un
+reinicio, y mide desde que se lanza el proceso hasta:
+
+  - que el bot se declara listo (línea "Bot listo en ..." del log, con sus fases),
+  - que responde al /start,
+  - que ese alumno recibe su primera pregunta (menú → test global → cantidad).
+
+Termina con código 1 si la mediana del arranque supera --objetivo. Uso:
+
+    python benchmarks/bench_arranque.py --preguntas 10000 --repeticiones 5 --objetivo 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from api_falsa import ServidorAPIFalsa  # noqa: E402
+from comun import ROOT_DIR, generar_banco, EstudianteVirtual  # noqa: E402
+
+PATRON_LISTO = re.compile(r"Bot listo en ([\d.]+) s.*\((.*)\)")
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Tiempo de arranque en frío y del primer usuario")
+    p.add_argument("--preguntas", type=int, default=10000, help="Tamaño del banco sintético")
+    p.add_argument("--repeticiones", type=int, default=5, help="Arranques medidos")
+    p.add_argument("--objetivo", type=float, default=2.0, help="Mediana máxima del arranque (s)")
+    p.add_argument("--puerto", type=int, default=8082, help="Puerto base de la API falsa (uno por arranque)")
+    return p
+
+
+class PrimerUsuario:
+    """Alumno que escribe /start antes de que el bot arranque y avanza hasta la primera pregunta."""
+
+    def __init__(self, api: ServidorAPIFalsa):
+        self.api = api
+        self.alumno = EstudianteVirtual(1)
+        self.respuesta: Optional[float] = None
+        self.pregunta = threading.Event()
+        self.instante_pregunta: Optional[float] = None
+
+    def al_enviar(self, metodo: str, datos: Dict[str, Any], mensaje: Dict[str, Any]) -> None:
+        if mensaje["chat"]["id"] != self.alumno.user_id or not mensaje.get("reply_markup"):
+            return
+        ahora = time.perf_counter()
+        if self.respuesta is None:
+            self.respuesta = ahora
+        botones = [b.get("callback_data", "") for fila in mensaje["reply_markup"].get("inline_keyboard", [])
+                   for b in fila]
+        if any(b.startswith("resp_") for b in botones):
+            self.instante_pregunta = ahora
+            self.pregunta.set()
+            return
+        siguiente = self.alumno.reaccionar(0, mensaje["message_id"], mensaje.get("text", ""), mensaje["reply_markup"])
+        if siguiente is not None:
+            self.api.encolar_update(siguiente)
+
+
+def arrancar(api: ServidorAPIFalsa, directorio: Path) -> Dict[str, Any]:
+    """Un arranque completo; devuelve los tiempos medidos (s) y las fases del log."""
+    usuario = PrimerUsuario(api)
+    api.al_enviar = usuario.al_enviar
+    api.encolar_update(usuario.alumno.inicio(0))
+
+    entorno = dict(os.environ,
+                   TELEGRAM_TOKEN="123456:ARRANQUE", TELEGRAM_BASE_URL=api.base_url,
+                   BOT_DATA_DIR=str(directorio), METRICAS_PUERTO="0", LOG_NIVEL="INFO",
+                   LIMITE_USUARIO_RAFAGA="1000000", LIMITE_USUARIO_POR_SEGUNDO="1000000")
+    inicio = time.perf_counter()
+    bot = subprocess.Popen([sys.executable, str(ROOT_DIR / "bot" / "bot.py")], env=entorno,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    listo: Optional[float] = None
+    fases = ""
+    salida: List[str] = []
+    for linea in bot.stderr:
+        salida.append(linea)
+        coincidencia = PATRON_LISTO.search(linea)
+        if coincidencia:
+            listo = float(coincidencia.group(1))
+            fases = coincidencia.group(2)
+            break
+    usuario.pregunta.wait(30)
+
+    bot.send_signal(signal.SIGINT)
+    try:
+        bot.communicate(timeout=30)
+    except subprocess.TimeoutExpired:
+        bot.kill()
+    if listo is None:
+        raise RuntimeError("El bot no ha llegado a estar listo:\n" + "".join(salida[-20:]))
+
+    return {
+        "listo": listo,
+        "fases": fases,
+        "respuesta": usuario.respuesta - inicio if usuario.respuesta else float("nan"),
+        "pregunta": usuario.instante_pregunta - inicio if usuario.instante_pregunta else float("nan"),
+    }
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    directorio = Path(tempfile.mkdtemp(prefix="bench_arranque_"))
+    (directorio / "logs").mkdir()
+    generar_banco(directorio / "preguntas.json", args.preguntas)
+
+    print(f"Banco de {args.preguntas} preguntas, {args.repeticiones} arranques")
+    resultados = []
+    for repeticion in range(1, args.repeticiones + 1):
+        # Una API nueva por arranque: ningún update sin confirmar pasa al siguiente
+        api = ServidorAPIFalsa(args.puerto + repeticion)
+        api.iniciar()
+        try:
+            resultado = arrancar(api, directorio)
+        finally:
+            api.detener()
+        resultados.append(resultado)
+        print(f"  #{repeticion}: listo {resultado['listo']:.2f} s, /start respondido "
+              f"{resultado['respuesta']:.2f} s, primera pregunta {resultado['pregunta']:.2f} s "
+              f"(fases: {resultado['fases']})")
+
+    mediana = statistics.median(r["listo"] for r in resultados)
+    print(f"  Mediana hasta estar listo: {mediana:.2f} s (objetivo {args.objetivo:.1f} s); "
+          f"primera pregunta {statistics.median(r['pregunta'] for r in resultados):.2f} s")
+    return 0 if mediana <= args.objetivo else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Prueba de carga de extremo a extremo contra la API falsa de api_falsa.py.
+
+Arranca el servidor, lanza `bot/bot.py` sin modificar apuntando TELEGRAM_BASE_URL
+a él (o usa un bot ya lanzado con --sin-lanzar) y simula alumnos que hacen
+/start, eligen un test global, responden y avanzan hasta terminar. La latencia
+de extremo a extremo es el tiempo desde que un update se encola hasta que el bot
+envía o edita el mensaje con el que el alumno puede seguir.
+
+Un alumno que no recibe respuesta en --reintento segundos (p. ej. por un 429)
+repite el último update, como haría una persona. Uso:
+
+    python benchmarks/bench_e2e.py --usuarios 1000 --latencia 0.02 --tasa-429 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import queue
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from api_falsa import ServidorAPIFalsa  # noqa: E402
+from comun import ROOT_DIR, generar_banco, EstudianteVirtual, percentiles  # noqa: E402
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Carga de extremo a extremo con una Bot API local")
+    p.add_argument("--usuarios", type=int, default=1000, help="Alumnos virtuales")
+    p.add_argument("--tests", type=int, default=1, help="Tests que completa cada alumno")
+    p.add_argument("--preguntas", type=int, default=5000, help="Tamaño del banco sintético")
+    p.add_argument("--rampa", type=float, default=5.0, help="Segundos en los que se reparten los /start")
+    p.add_argument("--pausa", type=float, default=0.0, help="Tiempo de reflexión del alumno antes de pulsar (s)")
+    p.add_argument("--latencia", type=float, default=0.0, help="Latencia de cada llamada a la API falsa (s)")
+    p.add_argument("--tasa-429", type=float, default=0.0, help="Fracción de envíos que responden 429")
+    p.add_argument("--reintento", type=float, default=5.0, help="Segundos sin respuesta antes de repetir el update")
+    p.add_argument("--limite", type=float, default=600.0, help="Duración máxima de la prueba (s)")
+    p.add_argument("--procesos", type=int, default=1, help="BOT_PROCESOS del bot lanzado")
+    p.add_argument("--puerto", type=int, default=8081, help="Puerto de la API falsa")
+    p.add_argument("--sin-lanzar", action="store_true", help="No lanzar el bot: ya apunta a la API falsa")
+    return p
+
+
+class GeneradorCarga:
+    """Alumnos virtuales en bucle cerrado sobre la API falsa."""
+
+    def __init__(self, api: ServidorAPIFalsa, args):
+        self.api = api
+        self.args = args
+        self.alumnos = {uid: EstudianteVirtual(uid, args.tests) for uid in range(1, args.usuarios + 1)}
+        # user_id -> (primer intento, último envío, update) del último update sin respuesta
+        self.esperando: Dict[int, tuple[float, float, Dict[str, Any]]] = {}
+        self.latencias: List[float] = []
+        self.enviados = 0
+        self.reintentos = 0
+        self.terminados = 0
+        self._lock = threading.Lock()
+        self._reacciones: "queue.Queue[tuple[float, int, Dict[str, Any]]]" = queue.Queue()
+        self.fin = threading.Event()
+
+    def enviar(self, user_id: int, datos: Dict[str, Any], instante: Optional[float] = None) -> None:
+        """Encola *datos*; *instante* conserva el momento del primer intento al repetir un update."""
+        with self._lock:
+            ahora = time.perf_counter()
+            self.esperando[user_id] = (instante or ahora, ahora, datos)
+            self.enviados += 1
+        self.api.encolar_update(datos)
+
+    def al_enviar(self, metodo: str, datos: Dict[str, Any], mensaje: Dict[str, Any]) -> None:
+        """Llamado por la API falsa con cada mensaje enviado o editado por el bot."""
+        user_id = mensaje["chat"]["id"]
+        alumno = self.alumnos.get(user_id)
+        if alumno is None or not mensaje.get("reply_markup"):
+            return
+        with self._lock:
+            pendiente = self.esperando.pop(user_id, None)
+            if pendiente is None:
+                return
+            self.latencias.append(time.perf_counter() - pendiente[0])
+        siguiente = alumno.reaccionar(0, mensaje["message_id"], mensaje.get("text", ""), mensaje["reply_markup"])
+        if siguiente is None:
+            with self._lock:
+                self.terminados += 1
+                if self.terminados == len(self.alumnos):
+                    self.fin.set()
+            return
+        self._reacciones.put((time.perf_counter() + self.args.pausa, user_id, siguiente))
+
+    def _bucle_reacciones(self) -> None:
+        while not self.fin.is_set():
+            try:
+                instante, user_id, datos = self._reacciones.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            espera = instante - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            self.enviar(user_id, datos)
+
+    def _bucle_reintentos(self) -> None:
+        while not self.fin.wait(0.5):
+            ahora = time.perf_counter()
+            with self._lock:
+                vencidos = [(uid, instante, datos) for uid, (instante, enviado, datos) in self.esperando.items()
+                            if ahora - enviado > self.args.reintento]
+                self.reintentos += len(vencidos)
+            for user_id, instante, datos in vencidos:
+                # Un update nuevo (el anterior ya se entregó); la latencia cuenta desde el primer intento
+                self.enviar(user_id, dict(datos), instante)
+
+    def ejecutar(self) -> float:
+        threading.Thread(target=self._bucle_reacciones, daemon=True).start()
+        threading.Thread(target=self._bucle_reintentos, daemon=True).start()
+        inicio = time.perf_counter()
+        intervalo = self.args.rampa / len(self.alumnos)
+        for indice, (user_id, alumno) in enumerate(self.alumnos.items()):
+            espera = inicio + indice * intervalo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            self.enviar(user_id, alumno.inicio(0))
+        self.fin.wait(self.args.limite)
+        duracion = time.perf_counter() - inicio
+        self.fin.set()
+        return duracion
+
+
+def lanzar_bot(args, api: ServidorAPIFalsa, directorio: Path) -> subprocess.Popen:
+    entorno = dict(os.environ,
+                   TELEGRAM_TOKEN="123456:CARGA", TELEGRAM_BASE_URL=api.base_url,
+                   BOT_DATA_DIR=str(directorio), BOT_PROCESOS=str(args.procesos),
+                   METRICAS_PUERTO="0", LOG_NIVEL="WARNING",
+                   LIMITE_USUARIO_RAFAGA="1000000", LIMITE_USUARIO_POR_SEGUNDO="1000000")
+    return subprocess.Popen([sys.executable, str(ROOT_DIR / "bot" / "bot.py")], env=entorno,
+                            stdout=subprocess.DEVNULL, stderr=open(directorio / "bot.stderr", "w"))
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    directorio = Path(tempfile.mkdtemp(prefix="bench_e2e_"))
+    (directorio / "logs").mkdir()
+    generar_banco(directorio / "preguntas.json", args.preguntas)
+
+    api = ServidorAPIFalsa(args.puerto, args.latencia, args.tasa_429)
+    generador = GeneradorCarga(api, args)
+    api.al_enviar = generador.al_enviar
+    api.iniciar()
+
+    bot: Optional[subprocess.Popen] = None
+    if not args.sin_lanzar:
+        bot = lanzar_bot(args, api, directorio)
+    print(f"Esperando al bot en {api.base_url} ...")
+    if not api.listo.wait(60):
+        print("El bot no ha empezado a pedir updates; revisa", directorio / "bot.stderr")
+        if bot:
+            bot.kill()
+        return 1
+
+    print(f"{args.usuarios} alumnos × {args.tests} test(s), banco de {args.preguntas} preguntas, "
+          f"latencia API {args.latencia * 1000:.1f} ms, 429 en el {args.tasa_429 * 100:.1f}% de los envíos")
+    duracion = generador.ejecutar()
+
+    p = percentiles(generador.latencias, (50, 90, 95, 99))
+    print(f"  Alumnos que terminan: {generador.terminados}/{args.usuarios} en {duracion:.1f} s")
+    print(f"  Updates: {generador.enviados} ({generador.enviados / duracion:.0f} updates/s), "
+          f"reintentos {generador.reintentos}, 429 inyectados {api.errores_429}")
+    print("  Latencia extremo a extremo (ms): " + ", ".join(f"p{k} {v * 1000:.1f}" for k, v in p.items()) +
+          f", máx {max(generador.latencias, default=0) * 1000:.1f}")
+    print(f"  Llamadas a la API: {dict(api.llamadas)}")
+
+    if bot:
+        bot.send_signal(signal.SIGINT)
+        try:
+            bot.wait(30)
+        except subprocess.TimeoutExpired:
+            bot.kill()
+    api.detener()
+    return 0 if generador.terminados == args.usuarios else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Construcción del banco con JsonBuilder: una escritura por archivo frente a un lote.
+
+Genera resultados de parse_docx sintéticos (sin DOCX: solo se mide el volcado)
+y construye preguntas.json de dos formas:
+
+  - por archivo: build_json por cada uno, que lee, ordena y reescribe el JSON,
+  - en lote: las mismas llamadas dentro de `JsonBuilder.batch()`, que lee una vez
+    y escribe una vez al final.
+
+Para cada número de archivos informa del tiempo de ambas y comprueba que las
+preguntas resultantes son idénticas. Uso:
+
+    python benchmarks/bench_extractor.py --archivos 10 50 100 200 --preguntas-por-archivo 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from comun import ROOT_DIR  # noqa: E402
+
+sys.path.insert(0, str(ROOT_DIR))
+from extractor.json_builder import JsonBuilder  # noqa: E402
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Tiempo de construcción del banco según el número de archivos")
+    p.add_argument("--archivos", type=int, nargs="+", default=[10, 50, 100, 200], help="Archivos por ejecución")
+    p.add_argument("--preguntas-por-archivo", type=int, default=50, help="Preguntas de cada archivo")
+    p.add_argument("--mode", choices=["add", "replace"], default="replace", help="Modo de JsonBuilder")
+    return p
+
+
+def generar_resultados(n_archivos: int, por_archivo: int) -> List[Dict[str, Any]]:
+    """Lo que devolvería parse_docx para *n_archivos* simulacros distintos."""
+    resultados = []
+    for a in range(n_archivos):
+        preguntas = []
+        for i in range(por_archivo):
+            preguntas.append({
+                "enunciado": f"Pregunta {i} del simulacro {a}: ¿cuál es la opción correcta?",
+                "opciones": [{"letra": l, "texto": f"Opción {l} de la pregunta {i}"} for l in "ABCD"],
+                "respuesta_correcta": "ABCD"[(a + i) % 4],
+                "explicacion": f"Explicación de la pregunta {i}.",
+                "referencia": f"UT{i % 9 + 1}",
+            })
+        resultados.append({"asignatura": f"Asignatura {a % 7}", "origen": f"Simulacro {a}", "preguntas": preguntas})
+    return resultados
+
+
+def construir(salida: Path, resultados: List[Dict[str, Any]], mode: str, lote: bool) -> float:
+    salida.unlink(missing_ok=True)
+    builder = JsonBuilder(str(salida))
+    inicio = time.perf_counter()
+    if lote:
+        with builder.batch():
+            for r in resultados:
+                builder.build_json(r["asignatura"], r["origen"], r["preguntas"], mode)
+    else:
+        for r in resultados:
+            builder.build_json(r["asignatura"], r["origen"], r["preguntas"], mode)
+    return time.perf_counter() - inicio
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    logging.getLogger("json_builder").setLevel(logging.WARNING)
+    directorio = Path(tempfile.mkdtemp(prefix="bench_extractor_"))
+
+    print(f"{args.preguntas_por_archivo} preguntas por archivo, modo {args.mode}")
+    print(f"  {'archivos':>8} {'por archivo':>12} {'en lote':>10} {'mejora':>8}")
+    iguales = True
+    for n in args.archivos:
+        resultados = generar_resultados(n, args.preguntas_por_archivo)
+        por_archivo = construir(directorio / "por_archivo.json", resultados, args.mode, lote=False)
+        en_lote = construir(directorio / "en_lote.json", resultados, args.mode, lote=True)
+        # La versión publicada sí difiere: una por archivo frente a una por lote
+        igual = (json.loads((directorio / "por_archivo.json").read_text(encoding="utf-8"))["preguntas"]
+                 == json.loads((directorio / "en_lote.json").read_text(encoding="utf-8"))["preguntas"])
+        iguales = iguales and igual
+        print(f"  {n:>8} {por_archivo:>10.2f} s {en_lote:>8.2f} s {por_archivo / en_lote:>7.1f}x"
+              + ("" if igual else "  ¡SALIDA DISTINTA!"))
+    return 0 if iguales else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Benchmark de los handlers de la conversación, sin red ni Dispatcher.
+
+Llama directamente a enviar_mensaje_bienvenida, manejar_seleccion_cantidad,
+manejar_respuesta y mostrar_historial con Updates construidos a mano, un
+contexto mínimo y un bot real cuya capa HTTP es PeticionFalsa. Cada alumno
+virtual hace /start, elige la cantidad, responde todas las preguntas y abre su
+historial; los alumnos avanzan por turnos para que sus sesiones se intercalen.
+
+Por cada handler se informa de los percentiles de latencia, el tiempo pasado
+en SQLite (métrica bot_bd_segundos) y, en una segunda pasada con tracemalloc,
+la memoria reservada por llamada. Uso:
+
+    python benchmarks/bench_handlers.py --usuarios 100 --preguntas 1000 10000 --cantidad 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import queue
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from comun import preparar_entorno, generar_banco, PeticionFalsa, EstudianteVirtual, percentiles  # noqa: E402
+
+# (nombre del handler, handler, update en JSON)
+Paso = Tuple[str, Callable, Dict[str, Any]]
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Latencia, tiempo de base de datos y memoria de cada handler")
+    p.add_argument("--usuarios", type=int, default=100, help="Alumnos virtuales")
+    p.add_argument("--preguntas", type=int, nargs="+", default=[1000, 10000], help="Tamaños de banco a medir")
+    p.add_argument("--cantidad", type=int, default=10, help="Preguntas por test (una de las opciones del bot)")
+    p.add_argument("--rapido", action="store_true", help="Responder en modo rápido")
+    p.add_argument("--sin-memoria", action="store_true", help="Omitir la pasada con tracemalloc")
+    return p
+
+
+class ContextoFalso:
+    """Lo que los handlers usan de CallbackContext: el bot y los datos del usuario."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.user_data: Dict[str, Any] = {}
+
+
+class SesionAlumno:
+    """Alumno virtual con su contexto; `pasos` genera los updates de una sesión completa."""
+
+    def __init__(self, user_id: int, bot, cantidad: int, rapido: bool):
+        self.alumno = EstudianteVirtual(user_id)
+        self.contexto = ContextoFalso(bot)
+        self.contexto.user_data['modo_rapido'] = rapido
+        self.cantidad = cantidad
+        self.message_id = 0
+        self.update_id = user_id * 1000
+
+    def _siguiente_id(self) -> int:
+        self.update_id += 1
+        return self.update_id
+
+    def _pulsar(self, data: str) -> Dict[str, Any]:
+        return self.alumno.pulsar(self._siguiente_id(), self.message_id, data)
+
+    def ver_salida(self, message_id: int, texto: str) -> None:
+        self.message_id = message_id
+        self.alumno._ultimo_texto = texto
+
+    def pasos(self, mh) -> Iterator[Paso]:
+        yield "enviar_mensaje_bienvenida", mh.enviar_mensaje_bienvenida, self.alumno.inicio(self._siguiente_id())
+        yield "manejar_seleccion_cantidad", mh.manejar_seleccion_cantidad, self._pulsar(f"cant_{self.cantidad}")
+
+        estado = self.contexto.user_data['estado_test']
+        rapido = self.contexto.user_data['modo_rapido']
+        while estado['pregunta_actual'] < len(estado['preguntas']):
+            pregunta = estado['preguntas'][estado['pregunta_actual']]
+            letra = self.alumno.rnd.choice([o['letra'] for o in pregunta['opciones']])
+            yield "manejar_respuesta", mh.manejar_respuesta, self._pulsar(f"resp_{pregunta['id']}_{letra}")
+            if not rapido:
+                yield "manejar_respuesta", mh.manejar_respuesta, self._pulsar("siguiente")
+
+        yield "mostrar_historial", mh.mostrar_historial, self._pulsar("ver_historial")
+
+
+def total_bd(latencia_bd) -> float:
+    return sum(suma for _, suma, _ in latencia_bd.series().values())
+
+
+def ejecutar(args, con_memoria: bool) -> Dict[str, Dict[str, List[float]]]:
+    """Completa una sesión por alumno y devuelve, por handler, las medidas de cada llamada."""
+    from telegram import Bot, Update
+    import message_handler as mh
+    from metricas import LATENCIA_BD
+
+    salidas: "queue.Queue" = queue.Queue()
+    peticion = PeticionFalsa(0.0, salidas)
+    bot = Bot("123456:BENCHMARK", request=peticion)
+    sesiones = {uid: SesionAlumno(uid, bot, args.cantidad, args.rapido) for uid in range(1, args.usuarios + 1)}
+    pendientes = {uid: sesion.pasos(mh) for uid, sesion in sesiones.items()}
+    medidas: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+
+    if con_memoria:
+        tracemalloc.start()
+    while pendientes:
+        for uid in list(pendientes):
+            sesion = sesiones[uid]
+            try:
+                nombre, handler, datos = next(pendientes[uid])
+            except StopIteration:
+                del pendientes[uid]
+                continue
+            update = Update.de_json(datos, bot)
+
+            bd_antes = total_bd(LATENCIA_BD)
+            if con_memoria:
+                tracemalloc.reset_peak()
+                memoria_antes = tracemalloc.get_traced_memory()[0]
+            inicio = time.perf_counter()
+            handler(update, sesion.contexto)
+            duracion = time.perf_counter() - inicio
+            if con_memoria:
+                actual, pico = tracemalloc.get_traced_memory()
+                medidas[nombre]["pico"].append(pico - memoria_antes)
+                medidas[nombre]["retenida"].append(actual - memoria_antes)
+            else:
+                medidas[nombre]["latencia"].append(duracion)
+                medidas[nombre]["bd"].append(total_bd(LATENCIA_BD) - bd_antes)
+
+            while not salidas.empty():
+                chat_id, message_id, texto, _ = salidas.get_nowait()
+                sesiones[chat_id].ver_salida(message_id, texto)
+    if con_memoria:
+        tracemalloc.stop()
+    return medidas
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    directorio = Path(tempfile.mkdtemp(prefix="bench_handlers_"))
+    preparar_entorno(directorio)
+    logging.disable(logging.WARNING)
+
+    from utils import inicializar_base_datos
+    inicializar_base_datos()
+
+    print(f"{args.usuarios} alumnos, tests de {args.cantidad} preguntas"
+          f"{' en modo rápido' if args.rapido else ''}")
+    for n_preguntas in args.preguntas:
+        generar_banco(directorio / "preguntas.json", n_preguntas)
+        tiempos = ejecutar(args, con_memoria=False)
+        memoria = {} if args.sin_memoria else ejecutar(args, con_memoria=True)
+
+        print(f"\nBanco de {n_preguntas} preguntas")
+        print(f"  {'handler':<28}{'llamadas':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'BD ms':>8}{'BD %':>6}{'pico KB':>9}{'retenida B':>11}")
+        for nombre, valores in tiempos.items():
+            latencias = valores["latencia"]
+            p = percentiles(latencias, (50, 95, 99))
+            total = sum(latencias)
+            bd = sum(valores["bd"])
+            pico = memoria.get(nombre, {}).get("pico", [])
+            retenida = memoria.get(nombre, {}).get("retenida", [])
+            media_pico = sum(pico) / len(pico) / 1024 if pico else 0.0
+            media_retenida = sum(retenida) / len(retenida) if retenida else 0.0
+            print(f"  {nombre:<28}{len(latencias):>9}{p[50] * 1000:>9.3f}{p[95] * 1000:>9.3f}{p[99] * 1000:>9.3f}"
+                  f"{bd / len(latencias) * 1000:>8.3f}{bd / total * 100 if total else 0:>6.1f}"
+                  f"{media_pico:>9.1f}{media_retenida:>11.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
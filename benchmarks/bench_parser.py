@@ -0,0 +1,95 @@
+"""
+Rendimiento del parser de DOCX sobre el corpus sintético de corpus_docx.py.
+
+Mide por separado:
+
+  - lectura: el texto de los párrafos (docx_reader) partido en líneas,
+  - clasificación: parse_docx con los párrafos ya en memoria, es decir, solo el
+    recorrido de las líneas y sus expresiones regulares,
+  - total: parse_docx desde el archivo.
+
+Con --referencia mide también el parser de otra revisión de git (el mismo que
+carga regresion_parser.py) para comparar. Uso:
+
+    python benchmarks/bench_parser.py --documentos 20 --preguntas 500 --referencia HEAD~1
+"""
+
+from __future__ import annotations
+
+import argparse
+import inspect
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from comun import ROOT_DIR  # noqa: E402
+from corpus_docx import generar_corpus  # noqa: E402
+from regresion_parser import cargar_parser  # noqa: E402
+
+sys.path.insert(0, str(ROOT_DIR))
+from extractor.docx_parser import parse_docx, _iter_lines  # noqa: E402
+from extractor.docx_reader import iter_paragraphs  # noqa: E402
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Throughput del parser de DOCX")
+    p.add_argument("--corpus", help="Directorio con un corpus ya generado (por defecto se genera uno temporal)")
+    p.add_argument("--documentos", type=int, default=20, help="Documentos del corpus generado")
+    p.add_argument("--preguntas", type=int, default=500, help="Preguntas por documento")
+    p.add_argument("--repeticiones", type=int, default=3, help="Pasadas por medida (se toma la mejor)")
+    p.add_argument("--referencia", help="Revisión de git con la que comparar (p. ej. HEAD~1)")
+    return p
+
+
+def mejor(funcion: Callable[[], None], repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def medir(nombre: str, parser: Callable, documentos: List[Path], parrafos: Dict[Path, List[str]],
+          lineas: int, preguntas: int, repeticiones: int) -> None:
+    total = mejor(lambda: [parser(d) for d in documentos], repeticiones)
+    # Solo la clasificación: el parser recibe los párrafos ya leídos (si admite reader=)
+    clasificacion = None
+    if "reader" in inspect.signature(parser).parameters:
+        clasificacion = mejor(lambda: [parser(d, reader=parrafos.__getitem__) for d in documentos], repeticiones)
+    texto = (f"clasificación {clasificacion:.3f} s ({lineas / clasificacion / 1e3:,.0f} mil líneas/s), "
+             if clasificacion else "")
+    print(f"  {nombre:<12} {texto}total {total:.3f} s ({len(documentos) / total:.1f} documentos/s, "
+          f"{preguntas / total:,.0f} preguntas/s)")
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    logging.getLogger("docx_parser").setLevel(logging.ERROR)
+
+    if args.corpus:
+        documentos = sorted(Path(args.corpus).glob("*.docx"))
+    else:
+        print(f"Generando {args.documentos} documentos de {args.preguntas} preguntas...")
+        documentos = generar_corpus(tempfile.mkdtemp(prefix="corpus_docx_"), args.documentos, args.preguntas)
+
+    parrafos = {d: list(iter_paragraphs(d)) for d in documentos}
+    lineas = sum(sum(1 for _ in _iter_lines(p)) for p in parrafos.values())
+    preguntas = sum(len(parse_docx(d)["preguntas"]) for d in documentos)
+    lectura = mejor(lambda: [sum(1 for _ in _iter_lines(iter_paragraphs(d))) for d in documentos], args.repeticiones)
+    print(f"{len(documentos)} documentos, {lineas} líneas, {preguntas} preguntas")
+    print(f"  {'lectura':<12} {lectura:.3f} s ({lineas / lectura / 1e3:,.0f} mil líneas/s)")
+
+    medir("actual", parse_docx, documentos, parrafos, lineas, preguntas, args.repeticiones)
+    if args.referencia:
+        medir(args.referencia, cargar_parser(args.referencia), documentos, parrafos, lineas, preguntas,
+              args.repeticiones)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
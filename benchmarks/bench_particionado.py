@@ -0,0 +1,97 @@
+"""
+Benchmark del modo multiproceso: throughput frente a número de procesos trabajadores.
+
+Cada alumno virtual completa sus tests en bucle cerrado (no envía el siguiente
+update hasta ver la respuesta del bot), contra una API de Telegram falsa con
+latencia configurable. Uso:
+
+    python benchmarks/bench_particionado.py --usuarios 200 --procesos 1 2 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import queue
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from comun import preparar_entorno, generar_banco, PeticionFalsa, EstudianteVirtual  # noqa: E402
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Throughput del bot según el número de procesos")
+    p.add_argument("--usuarios", type=int, default=200, help="Alumnos virtuales simultáneos")
+    p.add_argument("--tests", type=int, default=1, help="Tests que completa cada alumno")
+    p.add_argument("--preguntas", type=int, default=2000, help="Tamaño del banco sintético")
+    p.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4], help="Números de procesos a medir")
+    p.add_argument("--latencia", type=float, default=0.002, help="Latencia simulada por llamada a la API (s)")
+    return p
+
+
+def medir(procesos: int, args, registrar_handlers) -> tuple[int, float]:
+    from particionado import Ingreso
+
+    salidas = multiprocessing.get_context("fork").Queue()
+    ingreso = Ingreso(procesos, lambda: PeticionFalsa(args.latencia, salidas), registrar_handlers)
+    ingreso.iniciar()
+
+    alumnos = {uid: EstudianteVirtual(uid, args.tests) for uid in range(1, args.usuarios + 1)}
+    update_id = 0
+    inicio = time.perf_counter()
+    for alumno in alumnos.values():
+        update_id += 1
+        ingreso.enviar(alumno.inicio(update_id))
+
+    activos = len(alumnos)
+    while activos:
+        try:
+            chat_id, message_id, texto, teclado = salidas.get(timeout=30)
+        except queue.Empty:
+            print(f"  ¡Sin respuesta del bot durante 30 s con {activos} alumnos activos!")
+            break
+        alumno = alumnos.get(chat_id)
+        if alumno is None or alumno.terminado:
+            continue
+        update_id += 1
+        siguiente = alumno.reaccionar(update_id, message_id, texto, teclado)
+        if siguiente is None:
+            update_id -= 1
+            activos -= 1
+            continue
+        ingreso.enviar(siguiente)
+    duracion = time.perf_counter() - inicio
+
+    ingreso.detener()
+    return update_id, duracion
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    directorio = tempfile.mkdtemp(prefix="bench_particionado_")
+    preparar_entorno(directorio)
+    generar_banco(Path(directorio) / "preguntas.json", args.preguntas)
+
+    from bot import registrar_handlers
+    logging.getLogger().setLevel(logging.WARNING)
+    warnings.filterwarnings("ignore", message="If 'per_message=False'")
+
+    print(f"{args.usuarios} alumnos × {args.tests} test(s), banco de {args.preguntas} preguntas, "
+          f"latencia API {args.latencia * 1000:.1f} ms")
+    base = None
+    for procesos in args.procesos:
+        updates, duracion = medir(procesos, args, registrar_handlers)
+        throughput = updates / duracion
+        base = base or throughput
+        print(f"  {procesos} proceso(s): {updates} updates en {duracion:.2f} s → "
+              f"{throughput:.0f} updates/s (x{throughput / base:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
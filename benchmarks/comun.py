@@ -0,0 +1,183 @@
+"""
+Piezas comunes de los benchmarks: entorno aislado, banco sintético,
+API de Telegram falsa y alumnos virtuales.
+
+Ningún benchmark necesita red ni un token real.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BOT_DIR = ROOT_DIR / "bot"
+
+ASIGNATURAS_BANCO = ["Bases de Datos", "Entornos de Desarrollo", "Programación",
+                     "Lenguaje de Marcas y Sistema de Gestión de la Información"]
+
+
+def preparar_entorno(directorio: str | Path) -> None:
+    """Apunta el bot a *directorio* como carpeta de datos. Debe llamarse antes de importar sus módulos."""
+    os.environ["BOT_DATA_DIR"] = str(directorio)
+    os.environ.setdefault("TELEGRAM_TOKEN", "123456:BENCHMARK")
+    os.environ.setdefault("METRICAS_PUERTO", "0")
+    # Los alumnos virtuales pulsan mucho más rápido que una persona: sin límite por usuario
+    os.environ.setdefault("LIMITE_USUARIO_RAFAGA", "1000000")
+    os.environ.setdefault("LIMITE_USUARIO_POR_SEGUNDO", "1000000")
+    Path(directorio, "logs").mkdir(parents=True, exist_ok=True)
+    if str(BOT_DIR) not in sys.path:
+        sys.path.insert(0, str(BOT_DIR))
+
+
+def generar_banco(ruta: str | Path, n_preguntas: int, semilla: int = 1) -> None:
+    """Escribe en *ruta* un preguntas.json sintético con *n_preguntas* repartidas entre asignaturas."""
+    rnd = random.Random(semilla)
+    preguntas = []
+    for i in range(n_preguntas):
+        asignatura = ASIGNATURAS_BANCO[i % len(ASIGNATURAS_BANCO)]
+        letras = "ABCD" if i % 3 else "ABCDE"
+        preguntas.append({
+            "id": f"BENCH_{i:06d}",
+            "asignatura": asignatura,
+            "origen": "Sintético",
+            "enunciado": f"Pregunta sintética número {i} sobre {asignatura}: ¿cuál es la opción correcta?",
+            "opciones": [{"letra": l, "texto": f"Texto de la opción {l} de la pregunta {i}"} for l in letras],
+            "respuesta_correcta": rnd.choice(letras),
+            "explicacion": f"Explicación de la pregunta {i}. " * 3,
+            "referencia": f"UT{i % 9 + 1}, pág. {i % 200}",
+        })
+    Path(ruta).write_text(json.dumps({"preguntas": preguntas}, ensure_ascii=False), encoding="utf-8")
+
+
+class PeticionFalsa:
+    """
+    Sustituto de telegram.utils.request.Request que responde como la API de Telegram.
+
+    *latencia* simula el tiempo de ida y vuelta de cada llamada; si se indica
+    *salidas*, cada mensaje enviado o editado se publica ahí como
+    (chat_id, message_id, texto, reply_markup) para que un alumno virtual reaccione.
+    """
+
+    con_pool_size = 8
+
+    def __init__(self, latencia: float = 0.0, salidas=None):
+        self.latencia = latencia
+        self.salidas = salidas
+        self.llamadas: Dict[str, int] = {}
+        self._siguiente_mensaje = 1000
+        self._siguiente_encuesta = 1
+
+    def post(self, url: str, data: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        metodo = url.rsplit("/", 1)[1]
+        data = data or {}
+        self.llamadas[metodo] = self.llamadas.get(metodo, 0) + 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        if metodo == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if metodo in ("sendMessage", "editMessageText", "sendPoll"):
+            chat_id = int(data.get("chat_id", 0))
+            message_id = data.get("message_id")
+            if message_id is None:
+                self._siguiente_mensaje += 1
+                message_id = self._siguiente_mensaje
+            if self.salidas is not None:
+                self.salidas.put((chat_id, message_id, data.get("text", ""), data.get("reply_markup")))
+            mensaje = {"message_id": message_id, "date": int(time.time()),
+                       "chat": {"id": chat_id, "type": "private"}, "text": data.get("text", "")}
+            if metodo == "sendPoll":
+                self._siguiente_encuesta += 1
+                mensaje["poll"] = {
+                    "id": str(self._siguiente_encuesta), "question": data["question"],
+                    "options": [{"text": o, "voter_count": 0} for o in data["options"]],
+                    "total_voter_count": 0, "is_closed": False, "is_anonymous": False,
+                    "type": "quiz", "allows_multiple_answers": False,
+                }
+            return mensaje
+        # answerCallbackQuery, deleteWebhook y el resto devuelven True
+        return True
+
+    def stop(self) -> None:
+        pass
+
+
+class EstudianteVirtual:
+    """
+    Alumno simulado: empieza con /start, elige test global con la menor cantidad de
+    preguntas, responde al azar y pulsa "Siguiente" hasta completar *tests* tests.
+    """
+
+    def __init__(self, user_id: int, tests: int = 1, semilla: Optional[int] = None):
+        self.user_id = user_id
+        self.tests_pendientes = tests
+        self.terminado = False
+        self.rnd = random.Random(semilla if semilla is not None else user_id)
+        self._ultimo_texto = ""
+
+    def _usuario(self) -> Dict[str, Any]:
+        return {"id": self.user_id, "is_bot": False, "first_name": f"Alumno{self.user_id}"}
+
+    def inicio(self, update_id: int) -> Dict[str, Any]:
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": 1, "date": int(time.time()), "text": "/start",
+                "chat": {"id": self.user_id, "type": "private"}, "from": self._usuario(),
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        }
+
+    def pulsar(self, update_id: int, message_id: int, data: str) -> Dict[str, Any]:
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id), "from": self._usuario(), "chat_instance": str(self.user_id),
+                "data": data,
+                "message": {"message_id": message_id, "date": int(time.time()), "text": self._ultimo_texto,
+                            "chat": {"id": self.user_id, "type": "private"}},
+            },
+        }
+
+    def reaccionar(self, update_id: int, message_id: int, texto: str,
+                   reply_markup: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Decide el siguiente update a partir del último mensaje del bot (None si no hay nada que pulsar)."""
+        self._ultimo_texto = texto
+        if not reply_markup:
+            return None
+        teclado = json.loads(reply_markup) if isinstance(reply_markup, str) else reply_markup
+        botones = [b["callback_data"] for fila in teclado.get("inline_keyboard", []) for b in fila]
+        if not botones:
+            return None
+
+        if "nuevo_test" in botones:
+            self.tests_pendientes -= 1
+            if self.tests_pendientes <= 0:
+                self.terminado = True
+                return None
+            return self.pulsar(update_id, message_id, "nuevo_test")
+        if "menu_global" in botones:
+            return self.pulsar(update_id, message_id, "menu_global")
+        cantidades = [b for b in botones if b.startswith("cant_")]
+        if cantidades:
+            return self.pulsar(update_id, message_id, cantidades[0])
+        respuestas = [b for b in botones if b.startswith("resp_")]
+        if respuestas:
+            return self.pulsar(update_id, message_id, self.rnd.choice(respuestas))
+        if "siguiente" in botones:
+            return self.pulsar(update_id, message_id, "siguiente")
+        return None
+
+
+def percentiles(valores: List[float], puntos=(50, 90, 95, 99)) -> Dict[int, float]:
+    """Percentiles por el método del rango más cercano (valores vacíos → 0)."""
+    if not valores:
+        return {p: 0.0 for p in puntos}
+    ordenados = sorted(valores)
+    return {p: ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))] for p in puntos}
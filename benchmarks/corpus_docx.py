@@ -0,0 +1,163 @@
+"""
+Corpus sintético de DOCX para el parser del extractor.
+
+Cada documento mezcla los dos formatos que reconoce `parse_docx` y las
+variantes que aparecen en los simulacros reales:
+
+  - clásico: "OPCIÓN 1 (A): …" con «:», «.» o «–», "Opcion" sin tilde, minúsculas,
+  - lista: "• A) …", "- A) …" o "A) …",
+  - respuesta como "B", "Opción 2 (B)", "B) texto" o "RESPUESTA CORRECTA - (B)",
+  - opciones separadas por saltos blandos (Shift+Enter) dentro de un párrafo,
+  - párrafos vacíos, texto suelto y tablas que se ignoran,
+  - preguntas mal formadas (dos opciones, respuesta fuera de las opciones) que se descartan.
+
+Junto a cada `simulacro_NNN.docx` se escribe `simulacro_NNN.esperado.json` con
+lo que debe devolver `parse_docx`. Uso:
+
+    python benchmarks/corpus_docx.py --documentos 50 --preguntas 100 --salida /tmp/corpus
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from docx import Document
+
+ASIGNATURAS = ["Bases de Datos", "Entornos de Desarrollo", "Programación", "Sistemas Informáticos"]
+PALABRAS = ("índice clave tabla consulta transacción bloqueo vista disparador cursor esquema "
+            "clase objeto herencia interfaz excepción compilador depurador prueba versión rama").split()
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Genera un corpus de DOCX sintéticos con su salida esperada")
+    p.add_argument("--documentos", type=int, default=20, help="Documentos a generar")
+    p.add_argument("--preguntas", type=int, default=100, help="Preguntas por documento")
+    p.add_argument("--semilla", type=int, default=1, help="Semilla del generador")
+    p.add_argument("--salida", required=True, help="Directorio de salida")
+    return p
+
+
+def _frase(rnd: random.Random, n: int) -> str:
+    return " ".join(rnd.choice(PALABRAS) for _ in range(n))
+
+
+def _pregunta(rnd: random.Random, doc, numero: int) -> Dict[str, Any] | None:
+    """Escribe una pregunta en *doc* y devuelve lo que debe extraerse (None si debe descartarse)."""
+    letras = "ABCD"[:rnd.choice((3, 4))]
+    descartada = rnd.random() < 0.05
+    if descartada and rnd.random() < 0.5:
+        letras = "AB"  # solo dos opciones
+    opciones = [{"letra": l, "texto": f"{_frase(rnd, rnd.randint(2, 8))} {numero}{l}"} for l in letras]
+    correcta = rnd.choice(letras)
+    if descartada and len(letras) > 2:
+        correcta = "D" if len(letras) == 3 else ""  # fuera de las opciones o ausente
+    enunciado = f"¿{_frase(rnd, rnd.randint(5, 20)).capitalize()} ({numero})?"
+    explicacion = _frase(rnd, rnd.randint(0, 25)).capitalize() if rnd.random() < 0.8 else ""
+    referencia = f"UT{rnd.randint(1, 9)}, pág. {rnd.randint(1, 300)}" if rnd.random() < 0.6 else ""
+
+    cabecera = rnd.choice(("PREGUNTA", "Pregunta", "pregunta"))
+    doc.add_paragraph(f"{cabecera} {numero}{rnd.choice((':', '.', ' :'))} {enunciado}")
+
+    clasico = rnd.random() < 0.5
+    lineas = []
+    for i, o in enumerate(opciones, 1):
+        if clasico:
+            palabra = rnd.choice(("OPCIÓN", "OPCION", "Opción", "opción"))
+            lineas.append(f"{palabra} {i} ({o['letra']}){rnd.choice((':', '.', ' –'))} {o['texto']}")
+        else:
+            lineas.append(f"{rnd.choice(('• ', '- ', ''))}{o['letra']}) {o['texto']}")
+    if rnd.random() < 0.2:
+        # Opciones en un solo párrafo separadas por saltos blandos
+        p = doc.add_paragraph(lineas[0])
+        for linea in lineas[1:]:
+            run = p.add_run()
+            run.add_break()
+            run.add_text(linea)
+    else:
+        for linea in lineas:
+            doc.add_paragraph(linea)
+
+    if rnd.random() < 0.05:
+        doc.add_paragraph(_frase(rnd, 6))  # texto suelto que se ignora
+
+    if correcta:
+        indice = letras.index(correcta) + 1 if correcta in letras else 4
+        forma = rnd.random()
+        if forma < 0.4:
+            doc.add_paragraph(f"RESPUESTA CORRECTA: {correcta}")
+        elif forma < 0.7:
+            doc.add_paragraph(f"RESPUESTA CORRECTA: Opción {indice} ({correcta})")
+        elif forma < 0.9:
+            doc.add_paragraph(f"Respuesta correcta. {correcta}) {_frase(rnd, 3)}")
+        else:
+            doc.add_paragraph(f"RESPUESTA CORRECTA - ({correcta})")
+    if explicacion:
+        doc.add_paragraph(f"{rnd.choice(('EXPLICACIÓN', 'Explicación', 'EXPLICACION'))}: {explicacion}")
+    if referencia:
+        doc.add_paragraph(f"{rnd.choice(('REFERENCIA', 'Referencia'))}{rnd.choice((':', '.'))} {referencia}")
+    if rnd.random() < 0.3:
+        doc.add_paragraph("")
+
+    if len(opciones) < 3 or not correcta or correcta not in letras:
+        return None
+    return {
+        "enunciado": enunciado,
+        "opciones": opciones,
+        "respuesta_correcta": correcta,
+        "explicacion": explicacion,
+        "referencia": referencia,
+    }
+
+
+def generar_documento(ruta: Path, indice: int, n_preguntas: int, semilla: int = 1) -> Dict[str, Any]:
+    """Escribe un DOCX en *ruta* y devuelve el resultado esperado de parse_docx."""
+    rnd = random.Random(semilla * 100_003 + indice)
+    asignatura = ASIGNATURAS[indice % len(ASIGNATURAS)]
+    origen = f"Simulacro {indice:03d}"
+
+    doc = Document()
+    doc.add_paragraph(f"ASIGNATURA{rnd.choice((':', '.'))} {asignatura}")
+    doc.add_paragraph(f"ORIGEN: {origen}")
+    doc.add_paragraph("")
+    if rnd.random() < 0.5:
+        tabla = doc.add_table(rows=1, cols=2)
+        tabla.cell(0, 0).text = "PREGUNTA 0: dentro de una tabla"
+        tabla.cell(0, 1).text = "A) no se lee"
+
+    preguntas: List[Dict[str, Any]] = []
+    for numero in range(1, n_preguntas + 1):
+        esperada = _pregunta(rnd, doc, numero)
+        if esperada is not None:
+            preguntas.append(esperada)
+    doc.save(str(ruta))
+    return {"asignatura": asignatura, "origen": origen, "preguntas": preguntas}
+
+
+def generar_corpus(directorio: str | Path, n_documentos: int, n_preguntas: int, semilla: int = 1) -> List[Path]:
+    """Genera el corpus en *directorio*; devuelve las rutas de los DOCX."""
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for indice in range(n_documentos):
+        ruta = directorio / f"simulacro_{indice:03d}.docx"
+        esperado = generar_documento(ruta, indice, n_preguntas, semilla)
+        ruta.with_suffix(".esperado.json").write_text(json.dumps(esperado, ensure_ascii=False, indent=1),
+                                                      encoding="utf-8")
+        rutas.append(ruta)
+    return rutas
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    rutas = generar_corpus(args.salida, args.documentos, args.preguntas, args.semilla)
+    print(f"{len(rutas)} documentos de {args.preguntas} preguntas en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
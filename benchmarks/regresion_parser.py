@@ -0,0 +1,107 @@
+"""
+Comprobación de regresión del parser de DOCX sobre el corpus sintético.
+
+Genera el corpus de corpus_docx.py (o usa uno ya generado con --corpus) y
+comprueba que `parse_docx` devuelve exactamente lo esperado para cada documento.
+Con --referencia compara además con el parser de otra revisión de git, para
+cambios que no deben alterar la salida. Termina con código 1 ante cualquier
+diferencia. Uso:
+
+    python benchmarks/regresion_parser.py --documentos 30 --preguntas 200 --referencia HEAD~1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import types
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from comun import ROOT_DIR  # noqa: E402
+from corpus_docx import generar_corpus  # noqa: E402
+
+sys.path.insert(0, str(ROOT_DIR))
+from extractor.docx_parser import parse_docx  # noqa: E402
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Salida del parser frente a la esperada (y a otra revisión)")
+    p.add_argument("--corpus", help="Directorio con un corpus ya generado (por defecto se genera uno temporal)")
+    p.add_argument("--documentos", type=int, default=30, help="Documentos del corpus generado")
+    p.add_argument("--preguntas", type=int, default=200, help="Preguntas por documento")
+    p.add_argument("--semilla", type=int, default=1, help="Semilla del corpus")
+    p.add_argument("--referencia", help="Revisión de git cuyo parser debe dar la misma salida (p. ej. HEAD~1)")
+    return p
+
+
+def cargar_parser(revision: str) -> Callable[..., Dict[str, Any]]:
+    """parse_docx de extractor/docx_parser.py en *revision*, cargado sin tocar el árbol de trabajo."""
+    codigo = subprocess.check_output(["git", "show", f"{revision}:extractor/docx_parser.py"],
+                                     cwd=ROOT_DIR, text=True)
+    modulo = types.ModuleType("extractor._docx_parser_referencia")
+    modulo.__package__ = "extractor"
+    exec(compile(codigo, f"{revision}:extractor/docx_parser.py", "exec"), modulo.__dict__)
+    return modulo.parse_docx
+
+
+def primera_diferencia(a: Any, b: Any, ruta: str = "") -> Optional[str]:
+    """Ruta y valores del primer punto en que difieren *a* y *b* (None si son iguales)."""
+    if type(a) is not type(b):
+        return f"{ruta or '/'}: {a!r} != {b!r}"
+    if isinstance(a, dict):
+        for clave in sorted(set(a) | set(b)):
+            diferencia = primera_diferencia(a.get(clave), b.get(clave), f"{ruta}/{clave}")
+            if diferencia:
+                return diferencia
+        return None
+    if isinstance(a, list):
+        for i, (x, y) in enumerate(zip(a, b)):
+            diferencia = primera_diferencia(x, y, f"{ruta}[{i}]")
+            if diferencia:
+                return diferencia
+        return f"{ruta}: {len(a)} elementos != {len(b)}" if len(a) != len(b) else None
+    return None if a == b else f"{ruta or '/'}: {a!r} != {b!r}"
+
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+    # Las preguntas mal formadas del corpus se descartan a propósito: sin avisos
+    logging.getLogger("docx_parser").setLevel(logging.ERROR)
+
+    if args.corpus:
+        documentos = sorted(Path(args.corpus).glob("*.docx"))
+    else:
+        directorio = tempfile.mkdtemp(prefix="corpus_docx_")
+        documentos = generar_corpus(directorio, args.documentos, args.preguntas, args.semilla)
+    referencia = cargar_parser(args.referencia) if args.referencia else None
+
+    fallos = 0
+    preguntas = 0
+    for documento in documentos:
+        resultado = parse_docx(documento)
+        preguntas += len(resultado["preguntas"])
+        esperado = json.loads(documento.with_suffix(".esperado.json").read_text(encoding="utf-8"))
+        diferencia = primera_diferencia(resultado, esperado)
+        if diferencia:
+            fallos += 1
+            print(f"✗ {documento.name} (esperado): {diferencia}")
+        if referencia is not None:
+            diferencia = primera_diferencia(resultado, referencia(documento))
+            if diferencia:
+                fallos += 1
+                print(f"✗ {documento.name} ({args.referencia}): {diferencia}")
+
+    comparado = "la salida esperada" + (f" y con {args.referencia}" if referencia else "")
+    print(f"{len(documentos)} documentos, {preguntas} preguntas comparadas con {comparado}: "
+          + ("sin diferencias" if not fallos else f"{fallos} diferencias"))
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
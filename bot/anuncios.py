@@ -0,0 +1,238 @@
+# app/anuncios.py
+
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+from telegram import Bot, Update
+from telegram.error import RetryAfter, Unauthorized, BadRequest, NetworkError, TelegramError
+from telegram.ext import CallbackContext
+from telegram.utils.request import Request
+
+from config import (
+    ADMIN_IDS, ANUNCIOS_MENSAJES_POR_SEGUNDO, ANUNCIOS_CONCURRENCIA, ANUNCIOS_TAMANO_LOTE,
+    ANUNCIOS_REINTENTOS_BD, ANUNCIOS_REINTENTOS_RED, ANUNCIOS_ESPERA_REINTENTO, ANUNCIOS_INTERVALO_COMPROBACION
+)
+from utils import (
+    crear_anuncio, obtener_anuncios_en_curso, obtener_destinatarios_pendientes,
+    registrar_envios_anuncio, finalizar_anuncio
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LimitadorTasa:
+    """
+    Cubo de fichas compartido por todos los hilos de envío.
+
+    Cuando Telegram responde con RetryAfter se pausa el cubo entero, porque el
+    límite que se ha superado es global al bot y no a un destinatario.
+    """
+
+    def __init__(self, por_segundo: float):
+        self.por_segundo = por_segundo
+        self._fichas = 1.0
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self) -> None:
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.por_segundo, self._fichas + (ahora - self._ultimo) * self.por_segundo)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.por_segundo
+            time.sleep(espera)
+
+    def pausar(self, segundos: float) -> None:
+        with self._lock:
+            # Fichas negativas: nadie envía hasta que se recuperen
+            self._fichas = -segundos * self.por_segundo
+
+
+# Un solo cubo para todos los anuncios: el límite de Telegram es del bot, no de cada difusión
+limitador = LimitadorTasa(ANUNCIOS_MENSAJES_POR_SEGUNDO)
+
+
+class DifusionAnuncio:
+    """
+    Envía un anuncio a todos los usuarios registrados.
+
+    Guarda el estado de cada lote en la base de datos, así que si se interrumpe
+    (reinicio o base de datos caída) se continúa desde el último lote guardado.
+    """
+
+    def __init__(self, bot: Bot, anuncio_id: int, texto: str, autor_id: int):
+        self.bot = bot
+        self.anuncio_id = anuncio_id
+        self.texto = texto
+        self.autor_id = autor_id
+
+    def _enviar(self, user_id: int) -> Tuple[int, str]:
+        intento = 1
+        espera = ANUNCIOS_ESPERA_REINTENTO
+        while True:
+            limitador.esperar()
+            try:
+                self.bot.send_message(chat_id=user_id, text=self.texto)
+                return user_id, 'enviado'
+            except RetryAfter as e:
+                logger.warning(f"Anuncio {self.anuncio_id}: límite de Telegram, pausa de {e.retry_after}s")
+                limitador.pausar(e.retry_after)
+            except Unauthorized:
+                # El usuario ha bloqueado el bot o ha borrado su cuenta
+                return user_id, 'bloqueado'
+            except BadRequest as e:
+                if "chat not found" in str(e).lower():
+                    return user_id, 'bloqueado'
+                logger.error(f"Anuncio {self.anuncio_id}: error enviando a {user_id}: {e}")
+                return user_id, 'error'
+            except NetworkError as e:
+                # Un corte de red no debe dejar sin anuncio a los usuarios de ese momento: un 'error' ya
+                # no se reintenta. Con TimedOut el mensaje pudo llegar; mejor repetido que perdido
+                if intento == ANUNCIOS_REINTENTOS_RED:
+                    logger.error(f"Anuncio {self.anuncio_id}: error de red enviando a {user_id}: {e}")
+                    return user_id, 'error'
+                logger.warning(f"Anuncio {self.anuncio_id}: error de red enviando a {user_id} ({e}), "
+                               f"reintento {intento} en {espera:.1f}s")
+                time.sleep(espera)
+                intento += 1
+                espera *= 2
+            except TelegramError as e:
+                logger.error(f"Anuncio {self.anuncio_id}: error enviando a {user_id}: {e}")
+                return user_id, 'error'
+
+    def _bd(self, funcion: Callable[..., Any], *args) -> Any:
+        """Llama a *funcion* reintentando con espera creciente si la base de datos falla (p. ej. bloqueada)."""
+        espera = ANUNCIOS_ESPERA_REINTENTO
+        for intento in range(1, ANUNCIOS_REINTENTOS_BD + 1):
+            try:
+                return funcion(*args)
+            except sqlite3.Error as e:
+                if intento == ANUNCIOS_REINTENTOS_BD:
+                    raise
+                logger.warning(f"Anuncio {self.anuncio_id}: error de base de datos en {funcion.__name__} "
+                               f"({e}), reintento {intento} en {espera:.1f}s")
+                time.sleep(espera)
+                espera *= 2
+
+    def avisar_autor(self, texto: str) -> None:
+        try:
+            self.bot.send_message(chat_id=self.autor_id, text=texto)
+        except TelegramError as e:
+            logger.error(f"No se pudo avisar del anuncio {self.anuncio_id}: {e}")
+
+    def ejecutar(self) -> bool:
+        """Difunde el anuncio hasta el final; False si la base de datos lo ha interrumpido."""
+        logger.info(f"Iniciando difusión del anuncio {self.anuncio_id}")
+        ultimo_user_id = 0
+        try:
+            with ThreadPoolExecutor(max_workers=ANUNCIOS_CONCURRENCIA,
+                                    thread_name_prefix=f"anuncio-{self.anuncio_id}") as executor:
+                while True:
+                    lote = self._bd(obtener_destinatarios_pendientes, self.anuncio_id, ultimo_user_id,
+                                    ANUNCIOS_TAMANO_LOTE)
+                    if not lote:
+                        break
+                    envios: List[Tuple[int, str]] = list(executor.map(self._enviar, lote))
+                    self._bd(registrar_envios_anuncio, self.anuncio_id, envios)
+                    ultimo_user_id = lote[-1]
+
+            resumen = self._bd(finalizar_anuncio, self.anuncio_id)
+        except sqlite3.Error as e:
+            # Sin finalizar: el anuncio sigue 'en_curso' y continúa desde el último lote guardado
+            logger.error(f"Anuncio {self.anuncio_id} interrumpido por la base de datos: {e}")
+            return False
+
+        logger.info(f"Anuncio {self.anuncio_id} completado: {resumen}")
+        self.avisar_autor(f"📣 Anuncio #{self.anuncio_id} completado.\n"
+                           f"Enviados: {resumen.get('enviado', 0)}\n"
+                           f"Bloqueados: {resumen.get('bloqueado', 0)}\n"
+                           f"Errores: {resumen.get('error', 0)}")
+        return True
+
+
+class Difusor(threading.Thread):
+    """
+    Único hilo de difusión: envía los anuncios 'en_curso' de uno en uno, por orden de creación.
+
+    Un anuncio nuevo espera a que termine el anterior, así que dos /anunciar nunca
+    suman su ritmo por encima del límite global de Telegram. Usa su propio Bot (y por
+    tanto su propio pool de conexiones) para no competir con las respuestas a los
+    alumnos. Al arrancar continúa los anuncios interrumpidos; uno que falla por la
+    base de datos se reintenta en la siguiente comprobación.
+    """
+
+    def __init__(self, token: str, base_url: str):
+        super().__init__(name="difusor-anuncios", daemon=True)
+        self.bot = Bot(token, base_url=base_url, request=Request(con_pool_size=ANUNCIOS_CONCURRENCIA))
+        self._aviso = threading.Event()
+        self._interrumpidos: Set[int] = set()
+
+    def avisar(self) -> None:
+        """Hay un anuncio nuevo: comprobar sin esperar al intervalo."""
+        self._aviso.set()
+
+    def run(self) -> None:
+        while True:
+            self._aviso.clear()
+            for anuncio in obtener_anuncios_en_curso():
+                difusion = DifusionAnuncio(self.bot, anuncio['id'], anuncio['texto'], anuncio['autor_id'])
+                if difusion.ejecutar():
+                    self._interrumpidos.discard(anuncio['id'])
+                elif anuncio['id'] not in self._interrumpidos:
+                    self._interrumpidos.add(anuncio['id'])
+                    difusion.avisar_autor(f"⚠️ Anuncio #{anuncio['id']} interrumpido por un error de la base "
+                                           "de datos. Se reintentará automáticamente.")
+            self._aviso.wait(ANUNCIOS_INTERVALO_COMPROBACION)
+
+
+# Solo en el proceso que difunde (el único, o el trabajador 0 en modo multiproceso)
+_difusor: Optional[Difusor] = None
+
+
+def iniciar_difusor(bot: Bot) -> Difusor:
+    """Arranca el hilo de difusión, que empieza por los anuncios que quedaron a medias."""
+    global _difusor
+    _difusor = Difusor(bot.token, bot.base_url[:-len(bot.token)])
+    _difusor.start()
+    return _difusor
+
+
+def anunciar(update: Update, context: CallbackContext) -> None:
+    user = update.effective_user
+    if user.id not in ADMIN_IDS:
+        logger.warning(f"Usuario {user.id} sin permisos ha intentado usar /anunciar")
+        update.message.reply_text("Comando no reconocido. Usa /start para reiniciar el bot.")
+        return
+
+    # split() sin separador admite tanto "/anunciar texto" como anuncios en varias líneas
+    partes = update.message.text.split(maxsplit=1)
+    texto = partes[1].strip() if len(partes) > 1 else ""
+    if not texto:
+        update.message.reply_text("Uso: /anunciar <texto del anuncio>")
+        return
+
+    anuncio_id = crear_anuncio(texto, user.id)
+    if anuncio_id is None:
+        update.message.reply_text("No se pudo registrar el anuncio. Revisa los logs.")
+        return
+
+    if _difusor is not None:
+        _difusor.avisar()
+    anteriores = sum(1 for anuncio in obtener_anuncios_en_curso() if anuncio['id'] < anuncio_id)
+    if anteriores:
+        update.message.reply_text(
+            f"📣 Anuncio #{anuncio_id} en cola: empezará cuando terminen los {anteriores} anteriores. "
+            "Te avisaré cuando termine."
+        )
+    else:
+        update.message.reply_text(
+            f"📣 Anuncio #{anuncio_id} en difusión. Te avisaré cuando termine."
+        )
@@ -0,0 +1,63 @@
+# app/arranque.py
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from config import ARRANQUE_OBJETIVO_SEGUNDOS
+from metricas import ARRANQUE, LISTO
+
+logger = logging.getLogger(__name__)
+
+
+class Arranque:
+    """
+    Fases cronometradas del arranque y señal de disponibilidad.
+
+    El reloj empieza al importar este módulo, que es lo primero que importa bot.py,
+    así que la fase 'importaciones' recoge el coste de cargar telegram y el resto
+    de módulos. `listo` solo se activa cuando la base de datos, el banco y sus
+    índices están preparados y el bot ya está pidiendo updates.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases: List[Tuple[str, float]] = []
+        self.listo = threading.Event()
+        self.segundos: Optional[float] = None
+        LISTO.set(0)
+
+    def anotar(self, nombre: str, inicio: float) -> None:
+        """Registra la fase *nombre* como el tiempo transcurrido desde *inicio* (perf_counter)."""
+        duracion = time.perf_counter() - inicio
+        self.fases.append((nombre, duracion))
+        ARRANQUE.set(duracion, fase=nombre)
+        logger.info(f"Arranque: fase '{nombre}' en {duracion * 1000:.0f} ms")
+
+    @contextmanager
+    def fase(self, nombre: str) -> Iterator[None]:
+        """Cronometra el bloque como la fase *nombre* del arranque."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.anotar(nombre, inicio)
+
+    def marcar_listo(self) -> None:
+        """Activa la señal de disponibilidad y deja en el log el tiempo total de arranque."""
+        self.segundos = time.perf_counter() - self.inicio
+        ARRANQUE.set(self.segundos, fase="total")
+        LISTO.set(1)
+        self.listo.set()
+
+        detalle = ", ".join(f"{nombre} {duracion * 1000:.0f} ms" for nombre, duracion in self.fases)
+        if self.segundos > ARRANQUE_OBJETIVO_SEGUNDOS:
+            logger.warning(f"Bot listo en {self.segundos:.2f} s, por encima del objetivo de "
+                           f"{ARRANQUE_OBJETIVO_SEGUNDOS:.1f} s ({detalle})")
+        else:
+            logger.info(f"Bot listo en {self.segundos:.2f} s ({detalle})")
+
+
+arranque = Arranque()
@@ -0,0 +1,172 @@
+# app/banco_sqlite.py
+
+import logging
+import os
+import random
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import PREGUNTAS_DB
+from consultas import conectar
+
+logger = logging.getLogger(__name__)
+
+
+class BancoSqlite:
+    """
+    Banco de preguntas consultado en la base SQLite que publica el extractor (--sqlite).
+
+    Nada se carga en memoria: conteos, muestras aleatorias y búsquedas son consultas
+    por índice (ver extractor/sqlite_store.py para el esquema). El extractor nunca
+    modifica la base en su sitio, la sustituye entera; cada hilo mantiene su conexión
+    de solo lectura y la reabre cuando cambia el archivo, así que un banco nuevo se
+    ve en la siguiente consulta sin hilo de recarga y sin mezclar versiones dentro
+    de una consulta.
+    """
+
+    def __init__(self, ruta: str = PREGUNTAS_DB):
+        self.ruta = ruta
+        self._local = threading.local()
+
+    def conteo(self) -> Dict[str, int]:
+        """
+        Preguntas por asignatura (en el orden del banco) y en total.
+
+        Returns:
+            Dict[str, int]: Conteo por código de asignatura más la clave "global".
+        """
+        filas = self._conexion().execute(
+            "SELECT asignatura, SUM(preguntas) FROM sources GROUP BY asignatura ORDER BY MIN(id)"
+        ).fetchall()
+        conteo = {asignatura: total for asignatura, total in filas}
+        conteo["global"] = sum(conteo.values())
+        return conteo
+
+    def muestra(self, cantidad: int, asignatura: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Preguntas aleatorias sin repetición, de una asignatura o de todo el banco.
+
+        Las posiciones se eligen en Python entre 1 y el número de preguntas y se leen
+        con el índice (asignatura, pos_asignatura) o con la clave primaria.
+
+        Args:
+            cantidad (int): Preguntas a seleccionar (como mucho las disponibles).
+            asignatura (str, optional): Código de asignatura; None para el test global.
+
+        Returns:
+            List[Dict[str, Any]]: Preguntas con el mismo formato que en el JSON, en orden aleatorio.
+        """
+        conexion = self._conexion()
+        if asignatura is None:
+            total = conexion.execute("SELECT MAX(pos) FROM questions").fetchone()[0] or 0
+        else:
+            total = conexion.execute(
+                "SELECT SUM(preguntas) FROM sources WHERE asignatura = ?", (asignatura,)
+            ).fetchone()[0] or 0
+        posiciones = random.sample(range(1, total + 1), min(cantidad, total))
+        if not posiciones:
+            return []
+
+        if asignatura is not None:
+            # Posición dentro de la asignatura → posición global (el índice cubre la consulta)
+            globales = dict(conexion.execute(
+                "SELECT pos_asignatura, pos FROM questions "
+                f"WHERE asignatura = ? AND pos_asignatura IN ({','.join('?' * len(posiciones))})",
+                [asignatura, *posiciones]
+            ).fetchall())
+            posiciones = [globales[p] for p in posiciones if p in globales]
+        return self._leer(conexion, posiciones)
+
+    def pregunta(self, pregunta_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca una pregunta por su id.
+
+        Args:
+            pregunta_id (str): Id de la pregunta (ej: "BD_SE_001").
+
+        Returns:
+            Optional[Dict[str, Any]]: La pregunta, o None si no existe.
+        """
+        conexion = self._conexion()
+        fila = conexion.execute("SELECT pos FROM questions WHERE id = ?", (pregunta_id,)).fetchone()
+        return self._leer(conexion, [fila[0]])[0] if fila else None
+
+    def buscar(self, texto: str, limite: int = 20) -> List[Dict[str, Any]]:
+        """
+        Preguntas cuyo enunciado, opciones, explicación o referencia contienen todas las palabras de *texto*.
+
+        Cada palabra se busca tal cual (sin sintaxis de FTS5) y sin distinguir acentos;
+        los resultados van por relevancia.
+
+        Args:
+            texto (str): Palabras a buscar.
+            limite (int): Número máximo de resultados.
+
+        Returns:
+            List[Dict[str, Any]]: Preguntas encontradas (vacía si la base no tiene búsqueda de texto).
+        """
+        consulta = " ".join('"' + palabra.replace('"', '""') + '"' for palabra in texto.split())
+        if not consulta:
+            return []
+        conexion = self._conexion()
+        try:
+            encontradas = [fila[0] for fila in conexion.execute(
+                "SELECT rowid FROM questions_fts WHERE questions_fts MATCH ? ORDER BY rank LIMIT ?",
+                (consulta, limite)
+            ).fetchall()]
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Búsqueda de texto no disponible en {self.ruta}: {e}")
+            return []
+        return self._leer(conexion, encontradas)
+
+    def version(self) -> Optional[int]:
+        """Versión del banco publicada por el extractor."""
+        fila = self._conexion().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(fila[0]) if fila else None
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Conexión de solo lectura de este hilo, reabierta si el extractor ha publicado otra base."""
+        estado = os.stat(self.ruta)
+        firma = (estado.st_ino, estado.st_mtime_ns)
+        local = self._local
+        if getattr(local, 'firma', None) != firma:
+            if getattr(local, 'conexion', None) is not None:
+                local.conexion.close()
+            # as_uri escapa lo que SQLite leería como parte de la URI ('?', '#', '%', espacios)
+            local.conexion = conectar(Path(self.ruta).resolve().as_uri() + "?mode=ro", uri=True)
+            local.firma = firma
+        return local.conexion
+
+    @staticmethod
+    def _leer(conexion: sqlite3.Connection, posiciones: List[int]) -> List[Dict[str, Any]]:
+        """Preguntas en esas posiciones (y en ese orden), con el formato del JSON."""
+        if not posiciones:
+            return []
+        marcas = ",".join("?" * len(posiciones))
+        preguntas = {}
+        for pos, pregunta_id, asignatura, origen, enunciado, respuesta, explicacion, referencia in conexion.execute(
+            "SELECT q.pos, q.id, q.asignatura, s.origen, q.enunciado, q.respuesta_correcta, q.explicacion, "
+            f"q.referencia FROM questions q JOIN sources s ON s.id = q.source_id WHERE q.pos IN ({marcas})",
+            posiciones
+        ).fetchall():
+            preguntas[pos] = {
+                'id': pregunta_id,
+                'asignatura': asignatura,
+                'origen': origen,
+                'enunciado': enunciado,
+                'opciones': [],
+                'respuesta_correcta': respuesta,
+                'explicacion': explicacion,
+                'referencia': referencia,
+            }
+        for pos, letra, texto in conexion.execute(
+            f"SELECT question, letra, texto FROM options WHERE question IN ({marcas}) ORDER BY question, letra",
+            posiciones
+        ).fetchall():
+            preguntas[pos]['opciones'].append({'letra': letra, 'texto': texto})
+        return [preguntas[pos] for pos in posiciones if pos in preguntas]
+
+
+banco_sqlite = BancoSqlite()
@@ -1,18 +1,35 @@
 # app/bot.py
 
 import logging
-import os
+# Primero: pone en marcha el reloj del arranque antes de importar telegram
+from arranque import arranque
 from telegram.ext import (
     Updater, CommandHandler, MessageHandler, CallbackQueryHandler,
-    Filters, ConversationHandler, TypeHandler
+    Filters, ConversationHandler, TypeHandler, PollAnswerHandler, Dispatcher
 )
 from telegram import Update
+from telegram.error import TelegramError
+from telegram.utils.request import Request
 from config import (
-    BOT_TOKEN, LOGS_DIR,
+    BOT_TOKEN, TELEGRAM_BASE_URL, validar_configuracion,
     MENU_PRINCIPAL, SELECCION_ASIGNATURA, SELECCION_CANTIDAD,
-    REALIZANDO_TEST, VER_HISTORIAL
+    REALIZANDO_TEST, VER_HISTORIAL, INTERVALO_GUARDADO_ENCUESTAS, PROCESOS_BOT, METRICAS_PUERTO
 )
-from utils import inicializar_base_datos
+from utils import inicializar_base_datos, cargar_banco, precalentar_banco
+from anuncios import anunciar, iniciar_difusor
+from perfilado import perfil, instalar_senal_perfil
+from recarga import recarga_banco
+from consultas import consultas
+from estado import estado
+from control_entrada import FiltroEntrada
+from encuestas import indice_encuestas
+from instrumentacion import (
+    BotInstrumentado, iniciar_medicion_update, finalizar_medicion_update,
+    configurar_conversacion, contar_sesiones_activas
+)
+from metricas import SESIONES, iniciar_servidor_http
+from salud import salud
+from registro import configurar_logging, depuracion_activa
 
 from message_handler import (
     enviar_mensaje_bienvenida,
@@ -20,43 +37,37 @@ from message_handler import (
     manejar_seleccion_asignatura,
     manejar_seleccion_cantidad,
     manejar_respuesta,
-    mostrar_historial
+    mostrar_historial,
+    alternar_modo_rapido,
+    alternar_modo_encuesta,
+    manejar_respuesta_encuesta
 )
 
-# Asegurar que existe el directorio de logs
-os.makedirs(LOGS_DIR, exist_ok=True)
-
-# Configurar logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.DEBUG,  # Cambiar a DEBUG para ver más información
-    handlers=[
-        logging.FileHandler(os.path.join(LOGS_DIR, "bot.log")),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 def log_all_updates(update: Update, context) -> None:
-    """Registra todos los updates recibidos para depuración."""
+    """Registra todos los updates recibidos para depuración (solo los que salen en el muestreo)."""
+    if not depuracion_activa(logger):
+        return
     if update.message:
-        logger.debug(f"[DEPURACIÓN] Mensaje recibido: '{update.message.text}' de {update.effective_user.id}")
+        logger.debug("[DEPURACIÓN] Mensaje recibido: '%s'", update.message.text)
     elif update.callback_query:
-        logger.debug(f"[DEPURACIÓN] Callback recibido: '{update.callback_query.data}' de {update.effective_user.id}")
+        logger.debug("[DEPURACIÓN] Callback recibido: '%s'", update.callback_query.data)
     else:
-        logger.debug(f"[DEPURACIÓN] Update recibido de tipo desconocido: {update}")
+        logger.debug("[DEPURACIÓN] Update recibido de tipo desconocido: %s", update)
 
-def main() -> None:
-    """Función principal que inicia el bot."""
-    # Inicializar base de datos
-    inicializar_base_datos()
+def registrar_handlers(dp: Dispatcher) -> None:
+    """Registra todos los handlers del bot en *dp* (compartido por el modo normal y el multiproceso)."""
+    # Medición de cada update: latencia y llamadas a la API (abre antes que nada y cierra al final)
+    dp.add_handler(TypeHandler(Update, iniciar_medicion_update), group=-2)
+    dp.add_handler(TypeHandler(Update, finalizar_medicion_update), group=99)
+    SESIONES.funcion = lambda: contar_sesiones_activas(dp.user_data)
 
-    # Crear el Updater y pasarle el token de tu bot
-    updater = Updater(BOT_TOKEN)
+    # Descartar clics repetidos y ráfagas; si no se descarta, el update se registra
+    filtro_entrada = FiltroEntrada()
+    dp.add_handler(filtro_entrada, group=-1)
+    dp.job_queue.run_repeating(filtro_entrada.purgar_cubos, interval=300)
 
-    # Obtener el Dispatcher para registrar los handlers
-    dp = updater.dispatcher
-    
     # Añadir handler para registrar todos los updates
     dp.add_handler(TypeHandler(Update, log_all_updates), group=-1)
 
@@ -86,6 +97,12 @@ def main() -> None:
         },
         fallbacks=[
             CommandHandler('start', enviar_mensaje_bienvenida),
+            CommandHandler('rapido', alternar_modo_rapido),
+            CommandHandler('encuestas', alternar_modo_encuesta),
+            CommandHandler('anunciar', anunciar),
+            CommandHandler('perfil', perfil),
+            CommandHandler('consultas', consultas),
+            CommandHandler('estado', estado),
             MessageHandler(Filters.all, lambda update, context: MENU_PRINCIPAL)  # Fallback para mensajes no esperados
         ],
         allow_reentry=True,
@@ -94,17 +111,95 @@ def main() -> None:
 
     # Añadir ConversationHandler al Dispatcher
     dp.add_handler(conv_handler)
+    configurar_conversacion(conv_handler)
     
+    # Comandos de opciones y administración también fuera de una conversación activa
+    dp.add_handler(CommandHandler('rapido', alternar_modo_rapido))
+    dp.add_handler(CommandHandler('encuestas', alternar_modo_encuesta))
+    dp.add_handler(CommandHandler('anunciar', anunciar))
+    dp.add_handler(CommandHandler('perfil', perfil))
+    dp.add_handler(CommandHandler('consultas', consultas))
+    dp.add_handler(CommandHandler('estado', estado))
+
+    # Respuestas a las encuestas tipo quiz (no llevan chat, así que quedan fuera de la conversación)
+    dp.add_handler(PollAnswerHandler(manejar_respuesta_encuesta))
+
     # Manejador para comandos desconocidos
     dp.add_handler(MessageHandler(Filters.command, lambda update, context: update.message.reply_text(
         "Comando no reconocido. Usa /start para reiniciar el bot."
     )))
 
-    # Iniciar el bot
-    updater.start_polling()
+    # Volcar periódicamente el índice de encuestas
+    dp.job_queue.run_repeating(
+        lambda context: indice_encuestas.guardar(),
+        interval=INTERVALO_GUARDADO_ENCUESTAS
+    )
+
+
+def main() -> None:
+    """Función principal que inicia el bot."""
+    arranque.anotar('importaciones', arranque.inicio)
+
+    with arranque.fase('config'):
+        # Los registros se escriben en un hilo de fondo, fuera del camino de los handlers
+        configurar_logging()
+        validar_configuracion()
+
+    if PROCESOS_BOT > 1:
+        # multiprocessing y el reparto solo se cargan si se usan
+        from particionado import ejecutar_particionado
+        ejecutar_particionado(PROCESOS_BOT, registrar_handlers)
+        return
+
+    # Métricas, /salud y /listo en local desde el principio: /listo responde 503 hasta terminar
+    iniciar_servidor_http(METRICAS_PUERTO)
+
+    with arranque.fase('bd'):
+        # Inicializar base de datos (crea tablas y aplica migraciones)
+        inicializar_base_datos()
+
+    with arranque.fase('banco'):
+        cargar_banco()
+
+    with arranque.fase('cache'):
+        # Índices por asignatura y encuestas pendientes, antes de que llegue el primer usuario
+        precalentar_banco()
+        indice_encuestas.cargar()
+
+    with arranque.fase('red'):
+        # Crear el Updater con un bot que contabiliza las llamadas a la API.
+        # Al pasar un bot propio hay que dimensionar el pool de conexiones (workers + 4).
+        bot = BotInstrumentado(BOT_TOKEN, base_url=TELEGRAM_BASE_URL, request=Request(con_pool_size=8))
+        try:
+            # Comprueba el token y deja abierta la conexión que usará el primer update
+            bot.get_me()
+        except TelegramError as e:
+            logger.warning(f"No se pudo contactar con Telegram al arrancar ({e}); el sondeo lo reintentará")
+        updater = Updater(bot=bot)
+        salud.configurar(updater.dispatcher.update_queue.qsize)
+
+        # Registrar los handlers en el Dispatcher
+        registrar_handlers(updater.dispatcher)
+
+        # kill -USR1 <pid> perfila los próximos updates (resultado en data/logs)
+        instalar_senal_perfil()
+
+        # Iniciar el bot
+        updater.start_polling()
+
+    arranque.marcar_listo()
     logger.info("Bot iniciado correctamente. Esperando mensajes...")
+
+    # Banco nuevo publicado por el extractor → se carga sin reiniciar
+    recarga_banco.iniciar()
+
+    # Difusión de anuncios, empezando por los interrumpidos por un reinicio
+    iniciar_difusor(updater.bot)
     updater.idle()
 
+    # Guardar las encuestas pendientes antes de salir
+    indice_encuestas.guardar()
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
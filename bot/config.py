@@ -6,23 +6,111 @@ import os
 from dotenv import load_dotenv
 
 
-# Configuración del bot
+# Configuración del bot (el token se comprueba al arrancar, en validar_configuracion)
 load_dotenv()
 BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
-if not BOT_TOKEN:
-    raise ValueError("TELEGRAM_TOKEN no está configurado en el archivo .env")
+
+# URL base de la Bot API (sin el token); permite apuntar el bot a un servidor local de pruebas
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL") or None
+
+# Usuarios con acceso a los comandos de administración (IDs separados por comas)
+ADMIN_IDS = {int(uid) for uid in os.getenv("ADMIN_IDS", "").split(",") if uid.strip()}
 
 # Rutas de archivos
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_DIR = os.getenv("BOT_DATA_DIR", os.path.join(BASE_DIR, "data"))
 PREGUNTAS_JSON = os.path.join(DATA_DIR, "preguntas.json")
+PREGUNTAS_DB = os.getenv("PREGUNTAS_DB", os.path.join(DATA_DIR, "preguntas.db"))
 LOGS_DIR = os.path.join(DATA_DIR, "logs")
 DB_PATH = os.path.join(DATA_DIR, "resultados.db")
+ENCUESTAS_INDICE_JSON = os.path.join(DATA_DIR, "encuestas_indice.json")
 
 # Configuración de los tests
 PREGUNTAS_POR_TEST_DEFAULT = 10  # Número de preguntas por defecto en cada test
 MAX_PREGUNTAS_POR_TEST = 70  # Límite máximo de preguntas que un usuario puede seleccionar
 OPCIONES_CANTIDAD_PREGUNTAS = [10, 20, 30, 40, 50, 60, 70]  # Opciones para seleccionar cantidad de preguntas
+# Modo rápido: al responder se muestra el resultado y la siguiente pregunta en una sola edición
+MODO_RAPIDO_POR_DEFECTO = os.getenv("MODO_RAPIDO", "0") == "1"
+# Modo encuesta: las preguntas se envían como encuestas tipo quiz de Telegram
+MODO_ENCUESTA_POR_DEFECTO = os.getenv("MODO_ENCUESTA", "0") == "1"
+MAX_ENCUESTAS_INDICE = 50000  # Encuestas pendientes que se recuerdan como máximo
+INTERVALO_GUARDADO_ENCUESTAS = 60  # Segundos entre volcados del índice de encuestas
+
+# Puerto local de métricas Prometheus (0 para desactivarlas); en modo multiproceso
+# cada trabajador usa el siguiente: METRICAS_PUERTO + 1 + índice del trabajador
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", "9108"))
+
+# Logging: nivel del logger raíz, fracción de updates cuyos mensajes DEBUG se conservan
+# y rotación de data/logs/bot.log (JSON por línea)
+LOG_NIVEL = os.getenv("LOG_NIVEL", "DEBUG").upper()
+LOG_MUESTREO_DEPURACION = float(os.getenv("LOG_MUESTREO_DEPURACION", "0.05"))
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_COPIAS = 5
+
+# Trazas por update (formato Trace Event de Chrome): las lentas se guardan siempre,
+# el resto con probabilidad TRAZAS_MUESTREO
+TRAZAS_ARCHIVO = os.path.join(LOGS_DIR, "trazas.json")
+TRAZAS_MUESTREO = float(os.getenv("TRAZAS_MUESTREO", "0.01"))
+TRAZAS_UMBRAL_LENTO = float(os.getenv("TRAZAS_UMBRAL_LENTO_MS", "500")) / 1000
+TRAZAS_MAX_BYTES = 50 * 1024 * 1024
+
+# Perfilado bajo demanda (/perfil y SIGUSR1): valores por defecto de cada captura
+PERFIL_UPDATES = 200  # Updates perfilados como máximo
+PERFIL_SEGUNDOS = 60  # Duración máxima de la captura
+PERFIL_MUESTREO = 1  # Se perfila uno de cada N updates
+PERFIL_TOP = 15  # Funciones incluidas en el resumen
+
+# Registro de consultas SQL: las que superan el umbral se registran con su plan de ejecución
+CONSULTAS_UMBRAL_LENTO = float(os.getenv("CONSULTAS_UMBRAL_LENTO_MS", "50")) / 1000
+CONSULTAS_TOP = 10  # Sentencias mostradas por /consultas
+CONSULTAS_VENTANA_SEGUNDOS = 3600  # Las estadísticas cubren entre una y dos ventanas
+CONSULTAS_LENTAS_GUARDADAS = 50  # Últimas ejecuciones lentas que se recuerdan
+
+# Control de entrada: clics repetidos y ráfagas por usuario
+DEDUP_VENTANA_SEGUNDOS = 3  # Un mismo clic repetido dentro de esta ventana se descarta
+LIMITE_USUARIO_RAFAGA = int(os.getenv("LIMITE_USUARIO_RAFAGA", "6"))  # Updates seguidos que se permiten a un usuario
+LIMITE_USUARIO_POR_SEGUNDO = float(os.getenv("LIMITE_USUARIO_POR_SEGUNDO", "2"))  # Ritmo sostenido de updates por usuario
+
+# Arranque: tiempo objetivo hasta estar listo (se avisa en el log si se supera)
+ARRANQUE_OBJETIVO_SEGUNDOS = float(os.getenv("ARRANQUE_OBJETIVO_SEGUNDOS", "2"))
+
+# Comprobaciones de salud (/salud y /listo en el puerto de métricas)
+SALUD_CACHE_BD_SEGUNDOS = float(os.getenv("SALUD_CACHE_BD_SEGUNDOS", "10"))  # La prueba de escritura se repite como mucho con este intervalo
+SALUD_MAX_SIN_PROCESAR = float(os.getenv("SALUD_MAX_SIN_PROCESAR", "120"))  # Segundos con updates en cola sin procesar ninguno antes de darse por bloqueado
+
+# Recarga del banco en caliente: cada cuánto se comprueba si el extractor ha publicado uno nuevo (kill -HUP lo adelanta)
+BANCO_RECARGA_SEGUNDOS = float(os.getenv("BANCO_RECARGA_SEGUNDOS", "5"))
+
+# Consultar el banco en la base SQLite que publica el extractor (--sqlite) en vez de cargar el JSON en memoria
+BANCO_SQLITE = os.getenv("BANCO_SQLITE", "0") == "1"
+
+# Procesos que atienden updates; con más de uno se reparten los usuarios por user_id
+PROCESOS_BOT = int(os.getenv("BOT_PROCESOS", "1"))
+ESCRITURAS_ESPERA_MAXIMA = 30  # Segundos que un trabajador espera la confirmación del proceso escritor
+
+# Configuración de los anuncios (/anunciar)
+ANUNCIOS_MENSAJES_POR_SEGUNDO = 20  # Por debajo del límite global de Telegram (~30/s) para no frenar los tests
+ANUNCIOS_CONCURRENCIA = 8  # Envíos simultáneos como máximo
+ANUNCIOS_TAMANO_LOTE = 500  # Destinatarios leídos de la base de datos en cada consulta
+ANUNCIOS_REINTENTOS_BD = 6  # Intentos de cada consulta o escritura de la difusión si la base de datos falla
+ANUNCIOS_REINTENTOS_RED = 4  # Intentos de cada envío si falla la red o Telegram no responde a tiempo
+ANUNCIOS_ESPERA_REINTENTO = 0.5  # Segundos antes del primer reintento; se duplica en cada uno
+ANUNCIOS_INTERVALO_COMPROBACION = 10  # Segundos entre búsquedas de anuncios pendientes (p. ej. creados en otro proceso)
+
+
+def validar_configuracion() -> None:
+    """
+    Comprueba la configuración obligatoria antes de arrancar el bot.
+
+    Importar este módulo no falla aunque falte el token, para que las herramientas
+    y benchmarks que solo necesitan rutas o constantes no tengan que definirlo.
+
+    Raises:
+        ValueError: Si TELEGRAM_TOKEN no está configurado.
+    """
+    if not BOT_TOKEN:
+        raise ValueError("TELEGRAM_TOKEN no está configurado en el archivo .env")
+
 
 # Mensajes del bot
 MENSAJE_BIENVENIDA = """
@@ -38,6 +126,8 @@ Espero que os sirva para aprobar a todos. Pablo Laya os desea suerte!
 - Responde a las preguntas seleccionando una opción
 - Recibe feedback inmediato sobre tus respuestas
 - Consulta tu historial de resultados
+- Usa /rapido para pasar directamente a la siguiente pregunta al responder
+- Usa /encuestas para recibir las preguntas como encuestas tipo quiz
 
 ¡Comencemos! Usa el comando /start para iniciar.
 """
@@ -91,6 +181,35 @@ CREATE TABLE IF NOT EXISTS usuarios (
     apellido TEXT,
     nombre_usuario TEXT,
     fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    ultimo_acceso TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ultimo_acceso TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    bloqueado INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+TABLA_ANUNCIOS = """
+CREATE TABLE IF NOT EXISTS anuncios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    texto TEXT NOT NULL,
+    autor_id INTEGER NOT NULL,
+    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    estado TEXT NOT NULL DEFAULT 'en_curso'
+)
+"""
+
+TABLA_ANUNCIOS_ENVIOS = """
+CREATE TABLE IF NOT EXISTS anuncios_envios (
+    anuncio_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    estado TEXT NOT NULL,
+    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (anuncio_id, user_id)
 )
-"""
\ No newline at end of file
+"""
+
+# Una sola fila que reescribe la comprobación de salud para medir la latencia de escritura
+TABLA_SALUD = """
+CREATE TABLE IF NOT EXISTS salud (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    fecha TIMESTAMP NOT NULL
+)
+"""
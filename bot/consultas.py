@@ -0,0 +1,299 @@
+# app/consultas.py
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import CallbackContext
+
+from config import (
+    ADMIN_IDS, DB_PATH, CONSULTAS_UMBRAL_LENTO, CONSULTAS_TOP, CONSULTAS_VENTANA_SEGUNDOS, CONSULTAS_LENTAS_GUARDADAS
+)
+from trazas import registrar_tramo
+
+logger = logging.getLogger(__name__)
+
+MAX_MENSAJE = 4000  # Margen bajo el límite de 4096 caracteres de Telegram
+MAX_SQL_MOSTRADO = 160  # Caracteres de cada sentencia en el resumen y en el log
+
+# Sentencias con plan de ejecución (EXPLAIN QUERY PLAN no admite PRAGMA, CREATE, ALTER...)
+CON_PLAN = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+
+class EstadisticaSentencia:
+    """Llamadas, tiempo total y máximo de una sentencia, y el plan de su ejecución lenta más reciente."""
+
+    __slots__ = ('llamadas', 'total', 'maximo', 'lentas', 'plan')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.lentas = 0
+        self.plan: Optional[str] = None
+
+
+class RegistroConsultas:
+    """
+    Tiempos por sentencia SQL en una ventana deslizante y registro de las lentas.
+
+    Las estadísticas se agrupan por el texto de la sentencia (con los espacios
+    normalizados): cada helper de utils.py usa SQL fijo con parámetros, así que hay
+    una entrada por consulta distinta. Para que la ventana deslice sin guardar cada
+    ejecución, se conservan dos generaciones que rotan cada CONSULTAS_VENTANA_SEGUNDOS
+    y el resumen suma ambas.
+    """
+
+    def __init__(self, umbral: float = CONSULTAS_UMBRAL_LENTO, ventana: float = CONSULTAS_VENTANA_SEGUNDOS):
+        self.umbral = umbral
+        self.ventana = ventana
+        self._actual: Dict[str, EstadisticaSentencia] = {}
+        self._anterior: Dict[str, EstadisticaSentencia] = {}
+        self._rotacion = time.monotonic() + ventana
+        self._normalizadas: Dict[str, str] = {}
+        self.lentas: Deque[Tuple[datetime, float, str, str]] = deque(maxlen=CONSULTAS_LENTAS_GUARDADAS)
+        self._lock = threading.Lock()
+
+    def normalizar(self, sql: str) -> str:
+        # Las sentencias son literales: se normaliza cada texto una sola vez
+        normalizada = self._normalizadas.get(sql)
+        if normalizada is None:
+            normalizada = self._normalizadas[sql] = " ".join(sql.split())
+        return normalizada
+
+    def observar(self, sql: str, duracion: float, acumulado: float, nueva: bool) -> EstadisticaSentencia:
+        """
+        Suma *duracion* a la sentencia; *nueva* indica una ejecución (y no la lectura de sus filas).
+
+        *acumulado* es lo que lleva la ejecución en curso (ejecución más lecturas) y
+        alimenta el máximo.
+
+        Returns:
+            EstadisticaSentencia: Entrada de la sentencia en la generación actual.
+        """
+        clave = self.normalizar(sql)
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora >= self._rotacion:
+                self._anterior, self._actual = self._actual, {}
+                self._rotacion = ahora + self.ventana
+            estadistica = self._actual.get(clave)
+            if estadistica is None:
+                estadistica = self._actual[clave] = EstadisticaSentencia()
+            if nueva:
+                estadistica.llamadas += 1
+            estadistica.total += duracion
+            if acumulado > estadistica.maximo:
+                estadistica.maximo = acumulado
+            return estadistica
+
+    def registrar_lenta(self, conexion: sqlite3.Connection, sql: str, parametros: Any,
+                        duracion: float, estadistica: EstadisticaSentencia) -> None:
+        """Anota una ejecución lenta con su plan de ejecución y la deja en el log."""
+        clave = self.normalizar(sql)
+        plan = explicar(conexion, sql, parametros)
+        with self._lock:
+            estadistica.lentas += 1
+            if plan is not None:
+                estadistica.plan = plan
+            self.lentas.append((datetime.now(), duracion, clave, plan or ""))
+        logger.warning("Consulta lenta (%.1f ms): %s | parámetros %.200r | plan: %s",
+                       duracion * 1000, clave[:MAX_SQL_MOSTRADO], parametros, plan or "-")
+
+    def top(self, n: int = CONSULTAS_TOP) -> List[Tuple[str, EstadisticaSentencia]]:
+        """Las *n* sentencias con más tiempo acumulado en la ventana."""
+        with self._lock:
+            combinadas: Dict[str, EstadisticaSentencia] = {}
+            for generacion in (self._anterior, self._actual):
+                for clave, e in generacion.items():
+                    suma = combinadas.get(clave)
+                    if suma is None:
+                        suma = combinadas[clave] = EstadisticaSentencia()
+                    suma.llamadas += e.llamadas
+                    suma.total += e.total
+                    suma.maximo = max(suma.maximo, e.maximo)
+                    suma.lentas += e.lentas
+                    suma.plan = e.plan or suma.plan
+        return sorted(combinadas.items(), key=lambda item: -item[1].total)[:n]
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._actual, self._anterior = {}, {}
+            self._rotacion = time.monotonic() + self.ventana
+            self.lentas.clear()
+
+
+def explicar(conexion: sqlite3.Connection, sql: str, parametros: Any) -> Optional[str]:
+    """
+    Plan de ejecución de *sql* en una línea (p. ej. "SCAN resultados; USE TEMP B-TREE FOR ORDER BY").
+
+    Returns:
+        Optional[str]: El plan, o None si la sentencia no tiene plan o no se ha podido obtener.
+    """
+    if not sql.lstrip().upper().startswith(CON_PLAN):
+        return None
+    try:
+        # Cursor base: la consulta del plan no pasa por la medición
+        filas = sqlite3.Cursor(conexion).execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+    except sqlite3.Error as e:
+        logger.debug("No se pudo obtener el plan de %s: %s", sql[:MAX_SQL_MOSTRADO], e)
+        return None
+    return "; ".join(fila[3] for fila in filas)
+
+
+class CursorCronometrado(sqlite3.Cursor):
+    """
+    Cursor que mide cada sentencia: la ejecución y la lectura de sus filas.
+
+    En SQLite buena parte del trabajo de un SELECT ocurre al leer las filas, así que
+    el tiempo de fetchone/fetchall/fetchmany se suma a la sentencia que las produjo
+    y la ejecución se considera lenta si lo acumulado supera el umbral.
+    """
+
+    def execute(self, sql, parametros=()):
+        self._sql = sql
+        self._parametros = parametros
+        self._acumulado = 0.0
+        self._lenta = False
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._medir(inicio, nueva=True)
+
+    def executemany(self, sql, secuencia):
+        # La secuencia puede ser un generador: se guarda la primera fila para el plan
+        secuencia = list(secuencia)
+        self._sql = sql
+        self._parametros = secuencia[0] if secuencia else ()
+        self._acumulado = 0.0
+        self._lenta = False
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, secuencia)
+        finally:
+            self._medir(inicio, nueva=True)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._medir(inicio, nueva=False)
+
+    def fetchmany(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().fetchmany(*args, **kwargs)
+        finally:
+            self._medir(inicio, nueva=False)
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._medir(inicio, nueva=False)
+
+    def _medir(self, inicio: float, nueva: bool) -> None:
+        sql = getattr(self, '_sql', None)
+        if sql is None:
+            return
+        duracion = time.perf_counter() - inicio
+        self._acumulado += duracion
+        estadistica = registro_consultas.observar(sql, duracion, self._acumulado, nueva)
+        registrar_tramo(registro_consultas.normalizar(sql)[:MAX_SQL_MOSTRADO], 'sql', inicio, duracion)
+        if not self._lenta and self._acumulado >= registro_consultas.umbral:
+            self._lenta = True
+            registro_consultas.registrar_lenta(self.connection, sql, self._parametros, self._acumulado, estadistica)
+
+
+class ConexionCronometrada(sqlite3.Connection):
+    """Conexión cuyos cursores (también los de execute/executemany directos) y commits se miden."""
+
+    def cursor(self, factory=CursorCronometrado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, secuencia):
+        return self.cursor().executemany(sql, secuencia)
+
+    def commit(self):
+        # El commit (fsync incluido) suele ser lo más caro de una escritura
+        inicio = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            duracion = time.perf_counter() - inicio
+            estadistica = registro_consultas.observar("COMMIT", duracion, duracion, nueva=True)
+            registrar_tramo("COMMIT", 'sql', inicio, duracion)
+            if duracion >= registro_consultas.umbral:
+                registro_consultas.registrar_lenta(self, "COMMIT", (), duracion, estadistica)
+
+
+def conectar(ruta: str = DB_PATH, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect con medición de cada sentencia (mismos argumentos)."""
+    return sqlite3.connect(ruta, factory=ConexionCronometrada, **kwargs)
+
+
+def resumir_consultas(n: int = CONSULTAS_TOP) -> str:
+    """
+    Resumen legible: sentencias con más tiempo en la ventana y últimas ejecuciones lentas.
+
+    Args:
+        n (int): Sentencias a incluir.
+
+    Returns:
+        str: Texto del resumen.
+    """
+    top = registro_consultas.top(n)
+    if not top:
+        return "Aún no se ha ejecutado ninguna consulta en este proceso."
+
+    lineas = [f"Top {len(top)} consultas por tiempo total (llamadas, ms total, ms medio, ms máx., lentas):"]
+    for clave, e in top:
+        medio = e.total / e.llamadas * 1000 if e.llamadas else 0.0
+        lineas.append(f"• {clave[:MAX_SQL_MOSTRADO]}")
+        lineas.append(f"  {e.llamadas}, {e.total * 1000:.1f}, {medio:.2f}, {e.maximo * 1000:.1f}, {e.lentas}"
+                      + (f" | plan: {e.plan}" if e.plan else ""))
+
+    lentas = list(registro_consultas.lentas)[-5:]
+    if lentas:
+        lineas.append("")
+        lineas.append(f"Últimas consultas lentas (umbral {registro_consultas.umbral * 1000:.0f} ms):")
+        for instante, duracion, clave, plan in reversed(lentas):
+            lineas.append(f"{instante:%H:%M:%S} {duracion * 1000:.1f} ms: {clave[:MAX_SQL_MOSTRADO]}"
+                          + (f" | {plan}" if plan else ""))
+    return "\n".join(lineas)
+
+
+registro_consultas = RegistroConsultas()
+
+
+def consultas(update: Update, context: CallbackContext) -> None:
+    """/consultas [n] | /consultas reiniciar (solo administradores)."""
+    user = update.effective_user
+    if user.id not in ADMIN_IDS:
+        logger.warning(f"Usuario {user.id} sin permisos ha intentado usar /consultas")
+        update.message.reply_text("Comando no reconocido. Usa /start para reiniciar el bot.")
+        return
+
+    argumentos = context.args or []
+    if argumentos and argumentos[0] == "reiniciar":
+        registro_consultas.reiniciar()
+        update.message.reply_text("Estadísticas de consultas reiniciadas.")
+        return
+
+    try:
+        n = int(argumentos[0]) if argumentos else CONSULTAS_TOP
+    except ValueError:
+        update.message.reply_text("Uso: /consultas [n] o /consultas reiniciar")
+        return
+    update.message.reply_text(resumir_consultas(n)[:MAX_MENSAJE])
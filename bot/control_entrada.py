@@ -0,0 +1,115 @@
+# app/control_entrada.py
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import CallbackContext, DispatcherHandlerStop, Handler
+
+from config import DEDUP_VENTANA_SEGUNDOS, LIMITE_USUARIO_RAFAGA, LIMITE_USUARIO_POR_SEGUNDO
+from instrumentacion import finalizar_medicion_update
+
+logger = logging.getLogger(__name__)
+
+MAX_CLAVES_RECIENTES = 20000  # Cota de memoria para la detección de duplicados
+
+
+class FiltroEntrada(Handler):
+    """
+    Descarta, antes de llegar a la conversación, los clics repetidos y las ráfagas de un usuario.
+
+    Solo "atiende" los updates que hay que descartar: el resto no coincide y sigue su
+    camino hacia el siguiente handler del mismo grupo (el registro de updates) y los demás grupos.
+
+    * Duplicados: mismo usuario, mismo mensaje (tal y como se veía al pulsar) y mismo
+      callback_data dentro de *ventana* segundos.
+    * Ráfagas: cubo de fichas por usuario con capacidad *rafaga* y *por_segundo* fichas por segundo.
+
+    Los callbacks rechazados se responden con answerCallbackQuery para quitar el reloj
+    del botón; no se toca la base de datos ni el estado del test.
+    """
+
+    def __init__(self, ventana: float = DEDUP_VENTANA_SEGUNDOS, rafaga: int = LIMITE_USUARIO_RAFAGA,
+                 por_segundo: float = LIMITE_USUARIO_POR_SEGUNDO):
+        super().__init__(self._rechazar)
+        self.ventana = ventana
+        self.rafaga = rafaga
+        self.por_segundo = por_segundo
+        # El Dispatcher procesa los updates en un único hilo, así que no hace falta lock
+        # (purgar_cubos trabaja sobre una copia y, si pierde una carrera, solo rellena un cubo)
+        self._recientes: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._cubos: Dict[int, Tuple[float, float]] = {}
+        self.descartados = {'duplicado': 0, 'limite': 0}
+
+    def _clave_duplicado(self, update: Update) -> Optional[Hashable]:
+        query = update.callback_query
+        if not query or not query.message:
+            return None
+        mensaje = query.message
+        # edit_date y el texto distinguen dos pulsaciones legítimas del mismo botón
+        # (p. ej. "siguiente") sobre versiones distintas del mensaje
+        return (query.from_user.id, mensaje.chat_id, mensaje.message_id, query.data,
+                mensaje.edit_date, hash(mensaje.text))
+
+    def _es_duplicado(self, clave: Hashable, ahora: float) -> bool:
+        recientes = self._recientes
+        while recientes:
+            instante = next(iter(recientes.values()))
+            if ahora - instante < self.ventana and len(recientes) < MAX_CLAVES_RECIENTES:
+                break
+            recientes.popitem(last=False)
+
+        if clave in recientes:
+            return True
+        recientes[clave] = ahora
+        return False
+
+    def _consumir_ficha(self, user_id: int, ahora: float) -> bool:
+        fichas, ultimo = self._cubos.get(user_id, (self.rafaga, ahora))
+        fichas = min(self.rafaga, fichas + (ahora - ultimo) * self.por_segundo)
+        if fichas < 1:
+            self._cubos[user_id] = (fichas, ahora)
+            return False
+        self._cubos[user_id] = (fichas - 1, ahora)
+        return True
+
+    def purgar_cubos(self, context: Optional[CallbackContext] = None) -> None:
+        """Olvida los cubos ya llenos (usuarios inactivos); pensado para ejecutarse como job periódico."""
+        ahora = time.monotonic()
+        llenado = self.rafaga / self.por_segundo
+        self._cubos = {uid: (fichas, ultimo) for uid, (fichas, ultimo) in list(self._cubos.items())
+                       if ahora - ultimo < llenado}
+
+    def check_update(self, update: object) -> Optional[str]:
+        if not isinstance(update, Update) or not update.effective_user:
+            return None
+        # Las respuestas a encuestas no se pueden repetir: Telegram solo admite un voto
+        if update.poll_answer:
+            return None
+
+        ahora = time.monotonic()
+        clave = self._clave_duplicado(update)
+        if clave is not None and self._es_duplicado(clave, ahora):
+            return 'duplicado'
+        if not self._consumir_ficha(update.effective_user.id, ahora):
+            return 'limite'
+        return None
+
+    def handle_update(self, update: Update, dispatcher, check_result: str,
+                      context: Optional[CallbackContext] = None) -> None:
+        self._rechazar(update, check_result, context)
+
+    def _rechazar(self, update: Update, motivo: str, context: Optional[CallbackContext] = None) -> None:
+        self.descartados[motivo] += 1
+        logger.debug("Update %s de %s descartado (%s)", update.update_id, update.effective_user.id, motivo)
+
+        if update.callback_query:
+            if motivo == 'limite':
+                update.callback_query.answer(text="Vas muy rápido, espera un momento")
+            else:
+                update.callback_query.answer()
+        # Ningún otro grupo (ni la conversación, ni el cierre de la medición) llega a ver el update
+        finalizar_medicion_update(update, context, estado='descartado')
+        raise DispatcherHandlerStop()
@@ -0,0 +1,164 @@
+# app/encuestas.py
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from telegram.constants import MAX_POLL_QUESTION_LENGTH, MAX_POLL_OPTION_LENGTH
+
+from config import ENCUESTAS_INDICE_JSON, MAX_ENCUESTAS_INDICE
+
+logger = logging.getLogger(__name__)
+
+# Límite de Telegram para la explicación de una encuesta tipo quiz
+MAX_EXPLICACION_ENCUESTA = 200
+
+# Entrada del índice: (user_id, chat_id, índice de la pregunta en el test, opción correcta)
+EntradaEncuesta = Tuple[int, int, int, int]
+
+# Test en modo encuesta de un usuario: (tipo_test, pregunta_actual, correctas, poll_id pendiente, ids de las preguntas)
+TestEncuesta = Tuple[str, int, int, str, List[str]]
+
+
+def _recortar(texto: str, limite: int) -> str:
+    """Recorta *texto* a *limite* caracteres añadiendo puntos suspensivos si hace falta."""
+    return texto if len(texto) <= limite else texto[:limite - 1] + "…"
+
+
+def construir_encuesta(pregunta: Dict[str, Any], num_pregunta: int, total_preguntas: int) -> Optional[Dict[str, Any]]:
+    """
+    Prepara los parámetros de una encuesta tipo quiz a partir de una pregunta.
+
+    Args:
+        pregunta (Dict[str, Any]): Pregunta del banco.
+        num_pregunta (int): Número de la pregunta dentro del test (empieza en 1).
+        total_preguntas (int): Total de preguntas del test.
+
+    Returns:
+        Optional[Dict[str, Any]]: Argumentos para `send_poll` o None si la pregunta no tiene respuesta válida.
+    """
+    opciones = pregunta.get("opciones", [])
+    letras = [opcion.get('letra') for opcion in opciones]
+    respuesta_correcta = pregunta.get("respuesta_correcta", "")
+    if respuesta_correcta not in letras:
+        return None
+
+    enunciado = f"{num_pregunta}/{total_preguntas}. {pregunta.get('enunciado', '')}"
+    return {
+        'question': _recortar(enunciado, MAX_POLL_QUESTION_LENGTH),
+        'options': [_recortar(f"{opcion.get('letra')}) {opcion.get('texto', '')}", MAX_POLL_OPTION_LENGTH)
+                    for opcion in opciones],
+        'correct_option_id': letras.index(respuesta_correcta),
+        'explanation': _recortar(pregunta.get("explicacion", ""), MAX_EXPLICACION_ENCUESTA) or None,
+    }
+
+
+class IndiceEncuestas:
+    """
+    Índice acotado poll_id → pregunta pendiente de respuesta.
+
+    Guarda tuplas de enteros (no objetos de Telegram) y descarta las entradas más antiguas
+    al superar *max_entradas*. Junto a las encuestas guarda el test en modo encuesta de cada
+    usuario (sus ids de pregunta, la pregunta actual y los aciertos), así que tras un reinicio
+    la respuesta a la última encuesta enviada continúa el test. Todo se persiste en un JSON.
+    """
+
+    def __init__(self, ruta: str, max_entradas: int):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[Union[int, str], EntradaEncuesta]" = OrderedDict()
+        self._tests: "OrderedDict[int, TestEncuesta]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._modificado = False
+
+    @staticmethod
+    def _clave(poll_id: str) -> Union[int, str]:
+        # Los poll_id son cadenas numéricas largas; como int ocupan mucho menos
+        return int(poll_id) if poll_id.isdigit() else poll_id
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def registrar(self, poll_id: str, user_id: int, chat_id: int, indice: int, opcion_correcta: int) -> None:
+        with self._lock:
+            self._entradas[self._clave(poll_id)] = (user_id, chat_id, indice, opcion_correcta)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+            self._modificado = True
+
+    def extraer(self, poll_id: str) -> Optional[EntradaEncuesta]:
+        """Devuelve y elimina la entrada de *poll_id* (una encuesta quiz solo se responde una vez)."""
+        with self._lock:
+            entrada = self._entradas.pop(self._clave(poll_id), None)
+            if entrada is not None:
+                self._modificado = True
+            return entrada
+
+    def guardar_test(self, user_id: int, tipo_test: str, pregunta_actual: int, correctas: int,
+                     poll_id: str, ids: List[str]) -> None:
+        """Recuerda el estado del test de *user_id* tras enviarle la encuesta *poll_id*."""
+        with self._lock:
+            self._tests[user_id] = (tipo_test, pregunta_actual, correctas, poll_id, ids)
+            self._tests.move_to_end(user_id)
+            while len(self._tests) > self.max_entradas:
+                self._tests.popitem(last=False)
+            self._modificado = True
+
+    def test(self, user_id: int, poll_id: str) -> Optional[TestEncuesta]:
+        """Test guardado de *user_id* si *poll_id* es la encuesta que tiene pendiente."""
+        with self._lock:
+            test = self._tests.get(user_id)
+        return test if test is not None and test[3] == poll_id else None
+
+    def terminar_test(self, user_id: int) -> None:
+        with self._lock:
+            if self._tests.pop(user_id, None) is not None:
+                self._modificado = True
+
+    def cargar(self) -> None:
+        if not os.path.exists(self.ruta):
+            return
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as file:
+                datos = json.load(file)
+        except Exception as e:
+            logger.error(f"Error al cargar el índice de encuestas: {e}")
+            return
+
+        # Los índices antiguos eran solo la lista de encuestas
+        if isinstance(datos, list):
+            datos = {'encuestas': datos, 'tests': []}
+        with self._lock:
+            for poll_id, *entrada in datos['encuestas'][-self.max_entradas:]:
+                self._entradas[self._clave(str(poll_id))] = tuple(entrada)
+            for user_id, tipo_test, pregunta_actual, correctas, poll_id, ids in datos['tests'][-self.max_entradas:]:
+                self._tests[user_id] = (tipo_test, pregunta_actual, correctas, poll_id, ids)
+            self._modificado = False
+        logger.info(f"Índice de encuestas cargado: {len(self._entradas)} encuestas pendientes, "
+                    f"{len(self._tests)} tests en curso")
+
+    def guardar(self) -> None:
+        """Vuelca el índice a disco si ha cambiado desde el último guardado."""
+        with self._lock:
+            if not self._modificado:
+                return
+            datos = {
+                'encuestas': [[poll_id, *entrada] for poll_id, entrada in self._entradas.items()],
+                'tests': [[user_id, *test] for user_id, test in self._tests.items()],
+            }
+            self._modificado = False
+
+        try:
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as file:
+                json.dump(datos, file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temporal, self.ruta)
+        except Exception as e:
+            logger.error(f"Error al guardar el índice de encuestas: {e}")
+
+
+# Índice compartido por los handlers y el guardado periódico
+indice_encuestas = IndiceEncuestas(ENCUESTAS_INDICE_JSON, MAX_ENCUESTAS_INDICE)
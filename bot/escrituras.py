@@ -0,0 +1,107 @@
+# app/escrituras.py
+
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import ESCRITURAS_ESPERA_MAXIMA
+
+logger = logging.getLogger(__name__)
+
+# Tarea sin más efecto que su confirmación: todo lo encolado antes ya está escrito
+SINCRONIZAR = 'sincronizar'
+
+# (nombre de la escritura, argumentos, (trabajador, petición) a confirmar o None)
+Tarea = Tuple[str, tuple, Optional[Tuple[int, int]]]
+
+
+class ClienteEscritor:
+    """
+    Lado del trabajador de la cola del proceso escritor.
+
+    `encolar` no espera a la escritura; `ejecutar` espera su resultado (y recibe su
+    excepción). Como la cola conserva el orden de cada proceso, una confirmación
+    implica que todo lo que este proceso encoló antes ya está en la base de datos:
+    `sincronizar` lo aprovecha para que una lectura posterior vea las escrituras
+    propias (p. ej. el historial justo después de guardar un resultado).
+    """
+
+    def __init__(self, cola, respuestas, indice: int):
+        self.cola = cola
+        self.respuestas = respuestas
+        self.indice = indice
+        self._peticiones = itertools.count(1)
+        self._pendientes: Dict[int, Future] = {}
+        self._encoladas = 0      # Escrituras sin confirmación encoladas hasta ahora
+        self._confirmadas = 0    # De ellas, las que ya constan como hechas
+        self._lock = threading.Lock()
+        self._receptor = threading.Thread(target=self._recibir, name="respuestas-escritor", daemon=True)
+        self._receptor.start()
+
+    def encolar(self, nombre: str, args: tuple) -> None:
+        with self._lock:
+            self._encoladas += 1
+            self.cola.put((nombre, args, None))
+
+    def ejecutar(self, nombre: str, args: tuple = ()) -> Any:
+        """
+        Encola la escritura y espera a que el escritor la haga; devuelve su resultado o lanza su excepción.
+
+        Si no hay respuesta en ESCRITURAS_ESPERA_MAXIMA segundos lanza TimeoutError.
+        """
+        futuro: Future = Future()
+        with self._lock:
+            peticion = next(self._peticiones)
+            self._pendientes[peticion] = futuro
+            anteriores = self._encoladas
+            self.cola.put((nombre, args, (self.indice, peticion)))
+        try:
+            resultado = futuro.result(timeout=ESCRITURAS_ESPERA_MAXIMA)
+        finally:
+            with self._lock:
+                self._pendientes.pop(peticion, None)
+        with self._lock:
+            self._confirmadas = max(self._confirmadas, anteriores)
+        return resultado
+
+    def sincronizar(self) -> None:
+        """Espera a que estén escritas las escrituras encoladas por este proceso (nada si no hay)."""
+        if self._confirmadas < self._encoladas:
+            self.ejecutar(SINCRONIZAR)
+
+    def profundidad(self) -> int:
+        return self.cola.qsize()
+
+    def _recibir(self) -> None:
+        while True:
+            peticion, resultado, error = self.respuestas.get()
+            with self._lock:
+                futuro = self._pendientes.pop(peticion, None)
+            if futuro is None:
+                continue
+            if error is not None:
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(resultado)
+
+
+def atender_escrituras(cola, respuestas: List, escrituras: Dict[str, Callable[..., Any]]) -> None:
+    """Bucle del escritor: ejecuta las tareas en orden y confirma las que lo piden a su trabajador."""
+    while True:
+        tarea: Optional[Tarea] = cola.get()
+        if tarea is None:
+            break
+        nombre, args, confirmar = tarea
+        resultado = error = None
+        try:
+            if nombre != SINCRONIZAR:
+                resultado = escrituras[nombre](*args)
+        except Exception as e:
+            error = e
+            if confirmar is None:
+                logger.error(f"Error en la escritura {nombre}: {e}")
+        if confirmar is not None:
+            indice, peticion = confirmar
+            respuestas[indice].put((peticion, resultado, error))
@@ -0,0 +1,100 @@
+# app/estado.py
+
+import logging
+import os
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import CallbackContext
+
+from config import ADMIN_IDS, ASIGNATURAS, DB_PATH, PROCESOS_BOT
+from metricas import TASA_UPDATES, LATENCIAS_RECIENTES, PREGUNTAS_HOY
+from instrumentacion import contar_sesiones_activas
+from utils import contar_preguntas_por_asignatura, profundidad_cola_escrituras
+
+logger = logging.getLogger(__name__)
+
+
+def memoria_rss() -> Optional[int]:
+    """
+    Memoria residente del proceso en bytes.
+
+    Returns:
+        Optional[int]: RSS actual (de /proc en Linux) o el máximo alcanzado si /proc no existe.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss: KB en Linux, bytes en macOS; solo se llega aquí fuera de Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, OSError):
+        return None
+
+
+def tamano_base_datos() -> int:
+    """Bytes de la base de datos en disco, incluido el WAL si lo hay."""
+    total = 0
+    for ruta in (DB_PATH, f"{DB_PATH}-wal"):
+        try:
+            total += os.path.getsize(ruta)
+        except OSError:
+            pass
+    return total
+
+
+def _ms(valor: Optional[float]) -> str:
+    return f"{valor * 1000:.1f} ms" if valor is not None else "-"
+
+
+def _mb(valor: Optional[int]) -> str:
+    return f"{valor / (1024 * 1024):.1f} MB" if valor is not None else "-"
+
+
+def resumir_estado(context: CallbackContext) -> str:
+    """
+    Cifras en vivo de este proceso a partir de contadores y anillos en memoria.
+
+    Nada de lo que se muestra recorre `resultados` ni los logs: son contadores
+    actualizados por instrumentacion.py y message_handler.py, los índices del banco
+    ya cacheados y un par de stat del sistema de archivos.
+
+    Args:
+        context (CallbackContext): Contexto del comando (para el Dispatcher y sus user_data).
+
+    Returns:
+        str: Texto del mensaje.
+    """
+    dispatcher = context.dispatcher
+    latencias = LATENCIAS_RECIENTES.percentiles((50, 95))
+    cola_escrituras = profundidad_cola_escrituras()
+    conteo = contar_preguntas_por_asignatura()
+
+    lineas = [f"📈 Estado del bot (pid {os.getpid()}"
+              + (f", uno de {PROCESOS_BOT} trabajadores" if PROCESOS_BOT > 1 else "") + ")"]
+    lineas.append(f"Updates: {TASA_UPDATES.total()}/min · en cola {dispatcher.update_queue.qsize()}")
+    lineas.append(f"Latencia de los handlers (5 min): p50 {_ms(latencias[50])} · p95 {_ms(latencias[95])}")
+    lineas.append(f"Tests en curso: {contar_sesiones_activas(dispatcher.user_data)}")
+    lineas.append(f"Preguntas servidas hoy: {PREGUNTAS_HOY.valor()}")
+    lineas.append(f"Base de datos: {_mb(tamano_base_datos())} · escrituras en cola: "
+                  + (str(cola_escrituras) if cola_escrituras is not None else "ninguna (directas)"))
+    lineas.append(f"Banco: {conteo.get('global', 0)} preguntas")
+    for codigo, cantidad in sorted(conteo.items()):
+        if codigo != "global":
+            lineas.append(f"  • {ASIGNATURAS.get(codigo, codigo)}: {cantidad}")
+    lineas.append(f"Memoria RSS: {_mb(memoria_rss())}")
+    return "\n".join(lineas)
+
+
+def estado(update: Update, context: CallbackContext) -> None:
+    """/estado: cifras en vivo del bot (solo administradores)."""
+    user = update.effective_user
+    if user.id not in ADMIN_IDS:
+        logger.warning(f"Usuario {user.id} sin permisos ha intentado usar /estado")
+        update.message.reply_text("Comando no reconocido. Usa /start para reiniciar el bot.")
+        return
+
+    update.message.reply_text(resumir_estado(context))
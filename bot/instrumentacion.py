@@ -0,0 +1,187 @@
+# app/instrumentacion.py
+
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from telegram import Bot, Update
+from telegram.error import TelegramError
+from telegram.ext import CallbackContext, ConversationHandler
+from telegram.utils.helpers import DEFAULT_NONE
+
+from config import (
+    MENU_PRINCIPAL, SELECCION_ASIGNATURA, SELECCION_CANTIDAD, REALIZANDO_TEST, VER_EXPLICACION, VER_HISTORIAL
+)
+from metricas import LATENCIA_HANDLERS, UPDATES, LATENCIA_API, ERRORES_API, TASA_UPDATES, LATENCIAS_RECIENTES
+from perfilado import perfilador
+from registro import iniciar_contexto_update, finalizar_contexto_update
+from trazas import iniciar_traza, finalizar_traza, registrar_tramo
+from test_handler import test_completado
+
+logger = logging.getLogger(__name__)
+
+# Estado por hilo: el Dispatcher procesa cada update en un único hilo, así que
+# las llamadas a la API hechas mientras se atiende un update quedan asociadas a él.
+_estado_hilo = threading.local()
+
+# ConversationHandler cuyo estado se usa para etiquetar la latencia de cada update
+_conversacion: Optional[ConversationHandler] = None
+
+# Instante (time.monotonic) en que terminó de procesarse el último update; lo consulta salud.py
+ultimo_update: Optional[float] = None
+
+NOMBRES_ESTADOS = {
+    MENU_PRINCIPAL: 'MENU_PRINCIPAL',
+    SELECCION_ASIGNATURA: 'SELECCION_ASIGNATURA',
+    SELECCION_CANTIDAD: 'SELECCION_CANTIDAD',
+    REALIZANDO_TEST: 'REALIZANDO_TEST',
+    VER_EXPLICACION: 'VER_EXPLICACION',
+    VER_HISTORIAL: 'VER_HISTORIAL',
+}
+
+TIPOS_UPDATE = ('message', 'callback_query', 'poll_answer', 'edited_message', 'my_chat_member', 'inline_query')
+
+
+class BotInstrumentado(Bot):
+    """
+    Bot que contabiliza y cronometra cada llamada a la API de Telegram.
+
+    Todas las peticiones de python-telegram-bot pasan por `_post`, por lo que
+    basta con interceptar ese método para conocer cuántas llamadas genera cada update.
+    """
+
+    def _post(self, endpoint, data=None, timeout=DEFAULT_NONE, api_kwargs=None):
+        contador = getattr(_estado_hilo, 'contador', None)
+        if contador is not None:
+            contador[endpoint] += 1
+
+        inicio = time.perf_counter()
+        try:
+            return super()._post(endpoint, data, timeout, api_kwargs)
+        except TelegramError as e:
+            ERRORES_API.inc(metodo=endpoint, error=type(e).__name__)
+            raise
+        finally:
+            # getUpdates es un long polling: su duración no es latencia de la API
+            if endpoint != 'getUpdates':
+                duracion = time.perf_counter() - inicio
+                LATENCIA_API.observar(duracion, metodo=endpoint)
+                registrar_tramo(endpoint, 'api', inicio, duracion)
+
+
+def configurar_conversacion(conversacion: ConversationHandler) -> None:
+    """Registra la conversación principal y envuelve su handle_update en un tramo de la traza."""
+    global _conversacion
+    _conversacion = conversacion
+    handle_update = conversacion.handle_update
+
+    def handle_update_trazado(update, dispatcher, check_result, context=None):
+        inicio = time.perf_counter()
+        try:
+            return handle_update(update, dispatcher, check_result, context)
+        finally:
+            # check_result es (clave, handler elegido, resultado de su check_update)
+            registrar_tramo(getattr(check_result[1].callback, '__name__', 'handler'), 'handler',
+                            inicio, time.perf_counter() - inicio)
+
+    conversacion.handle_update = handle_update_trazado
+
+
+def tipo_update(update: Update) -> str:
+    for tipo in TIPOS_UPDATE:
+        if getattr(update, tipo) is not None:
+            return tipo
+    return 'otro'
+
+
+def estado_conversacion(update: Update) -> str:
+    """Nombre del estado de la conversación en el que está el usuario antes de procesar *update*."""
+    if _conversacion is None or not update.effective_chat or not update.effective_user:
+        return 'SIN_CONVERSACION'
+    estado = _conversacion.conversations.get((update.effective_chat.id, update.effective_user.id))
+    return NOMBRES_ESTADOS.get(estado, 'SIN_CONVERSACION')
+
+
+def nombre_handler(update: Update, context: CallbackContext) -> str:
+    """
+    Nombre del callback que va a atender *update* en el grupo principal (solo se usa al perfilar).
+
+    Returns:
+        str: Nombre de la función, o el tipo de update si ningún handler coincide.
+    """
+    for handler in context.dispatcher.handlers.get(0, []):
+        resultado = handler.check_update(update)
+        if resultado is None or resultado is False:
+            continue
+        if isinstance(handler, ConversationHandler):
+            handler = resultado[1]
+        return getattr(handler.callback, '__name__', 'desconocido')
+    return f"sin_handler:{tipo_update(update)}"
+
+
+def contar_sesiones_activas(user_data: Dict[int, Dict[str, Any]]) -> int:
+    """Número de usuarios con un test empezado y sin terminar."""
+    return sum(1 for datos in list(user_data.values())
+               if datos.get('estado_test') and not test_completado(datos['estado_test']))
+
+
+def iniciar_medicion_update(update: Update, context: CallbackContext) -> None:
+    """Pone a cero el contador de llamadas a la API y arranca el cronómetro del update que empieza."""
+    _estado_hilo.contador = Counter()
+    _estado_hilo.inicio = time.perf_counter()
+    _estado_hilo.estado = estado_conversacion(update)
+    UPDATES.inc(tipo=tipo_update(update))
+    TASA_UPDATES.inc()
+    iniciar_contexto_update(update.update_id, update.effective_user.id if update.effective_user else None)
+    iniciar_traza()
+    # Sin captura en curso el perfilado solo cuesta esta comprobación
+    _estado_hilo.perfilando = perfilador.activo
+    if _estado_hilo.perfilando:
+        perfilador.empezar_update(nombre_handler(update, context))
+
+
+def finalizar_medicion_update(update: Update, context: CallbackContext, estado: Optional[str] = None) -> None:
+    """
+    Registra la latencia del update y cuántas llamadas a la API ha generado.
+
+    Un handler que corta el update con DispatcherHandlerStop (el grupo 99 ya no
+    se ejecuta) lo cierra él mismo, con *estado* como etiqueta (p. ej. 'descartado').
+    """
+    global ultimo_update
+    contador = getattr(_estado_hilo, 'contador', None)
+    _estado_hilo.contador = None
+    if contador is None:
+        return
+    if estado is not None:
+        _estado_hilo.estado = estado
+    if _estado_hilo.perfilando:
+        perfilador.terminar_update()
+    finalizar_traza(f"{tipo_update(update)} {_estado_hilo.estado}", {
+        'update_id': update.update_id,
+        'user_id': update.effective_user.id if update.effective_user else None,
+        'datos': update.callback_query.data if update.callback_query else None,
+    })
+    duracion = time.perf_counter() - _estado_hilo.inicio
+    LATENCIA_HANDLERS.observar(duracion, estado=_estado_hilo.estado)
+    LATENCIAS_RECIENTES.observar(duracion)
+    ultimo_update = time.monotonic()
+
+    total = sum(contador.values())
+    logger.debug("%d llamadas a la API %s", total, contador)
+    if update.callback_query and total > 2:
+        logger.warning("Update %s (%s) ha necesitado %d llamadas a la API: %s",
+                       update.update_id, update.callback_query.data, total, dict(contador))
+    finalizar_contexto_update()
+
+
+def obtener_contador_api() -> Optional[Dict[str, int]]:
+    """
+    Devuelve las llamadas a la API realizadas hasta ahora en el update actual.
+
+    Returns:
+        Optional[Dict[str, int]]: Llamadas por método o None si no hay update en curso.
+    """
+    contador = getattr(_estado_hilo, 'contador', None)
+    return dict(contador) if contador is not None else None
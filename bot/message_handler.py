@@ -1,7 +1,7 @@
 
 import logging
-from typing import Dict, List, Any
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, ParseMode
+from typing import Dict, List, Any, Optional
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, ParseMode, Poll
 from telegram.ext import CallbackContext
 from telegram.error import BadRequest  # Importación específica del error
 
@@ -9,12 +9,12 @@ from config import (
     EMOJI_CORRECTO, EMOJI_INCORRECTO, EMOJI_PREGUNTA, EMOJI_EXPLICACION,
     EMOJI_SIGUIENTE, EMOJI_HISTORIAL, EMOJI_TEST, EMOJI_MENU,
     OPCION_TEST_ASIGNATURA, OPCION_TEST_GLOBAL, OPCION_HISTORIAL, OPCION_AYUDA,
-    MENSAJE_BIENVENIDA, ASIGNATURAS, OPCIONES_CANTIDAD_PREGUNTAS,
+    MENSAJE_BIENVENIDA, ASIGNATURAS, OPCIONES_CANTIDAD_PREGUNTAS, MODO_RAPIDO_POR_DEFECTO,
+    MODO_ENCUESTA_POR_DEFECTO,
     MENU_PRINCIPAL, SELECCION_ASIGNATURA, SELECCION_CANTIDAD, REALIZANDO_TEST, VER_HISTORIAL
 )
 from utils import (
-    cargar_preguntas, filtrar_preguntas_por_asignatura, seleccionar_preguntas_aleatorias,
-    obtener_todas_asignaturas, guardar_resultado_test,
+    asignaturas_disponibles, preguntas_para_test, preguntas_por_id, guardar_resultado_test,
     obtener_historial_usuario, obtener_estadisticas_usuario, registrar_usuario,
     contar_preguntas_por_asignatura
 )
@@ -22,6 +22,8 @@ from test_handler import (
     inicializar_test, obtener_pregunta_actual, verificar_respuesta as verificar_respuesta_test,
     avanzar_pregunta, test_completado, calcular_resultados
 )
+from encuestas import construir_encuesta, indice_encuestas
+from metricas import PREGUNTAS_HOY
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +42,7 @@ def enviar_mensaje_bienvenida(update: Update, context: CallbackContext) -> int:
         reply_markup=teclado,
         parse_mode=ParseMode.MARKDOWN
     )
-    logger.info(f"Usuario {user.id} iniciando bot. Estado: MENU_PRINCIPAL")
+    logger.info("Usuario %s iniciando bot. Estado: MENU_PRINCIPAL", user.id)
     return MENU_PRINCIPAL
 
 
@@ -106,26 +108,23 @@ def enviar_seleccion_cantidad_preguntas(update: Update, context: CallbackContext
 
 
 def manejar_seleccion_menu_principal(update: Update, context: CallbackContext) -> int:
-    logger.info("Entrando a manejar_seleccion_menu_principal")
-    
     # Detectar si viene de mensaje normal o de callback query
     if update.message:
         seleccion = update.message.text
-        logger.info(f"Selección del menú (mensaje): {seleccion}")
+        logger.debug("Selección del menú (mensaje): %s", seleccion)
     elif update.callback_query:
         query = update.callback_query
         query.answer()
         seleccion = query.data
-        logger.info(f"Selección del menú (callback): {seleccion}")
+        logger.debug("Selección del menú (callback): %s", seleccion)
     else:
         logger.warning("Tipo de update no reconocido")
         return MENU_PRINCIPAL
 
     # Para el nuevo enfoque de InlineKeyboardMarkup
     if seleccion == "menu_asignatura" or seleccion == OPCION_TEST_ASIGNATURA:
-        logger.info("Opción seleccionada: Test por asignatura")
-        preguntas = cargar_preguntas()
-        asignaturas = obtener_todas_asignaturas(preguntas)
+        logger.debug("Opción seleccionada: Test por asignatura")
+        asignaturas = asignaturas_disponibles()
         conteo = contar_preguntas_por_asignatura()
 
         if update.message:
@@ -141,17 +140,17 @@ def manejar_seleccion_menu_principal(update: Update, context: CallbackContext) -
         return SELECCION_ASIGNATURA
 
     elif seleccion == "menu_global" or seleccion == OPCION_TEST_GLOBAL:
-        logger.info("Opción seleccionada: Test global")
+        logger.debug("Opción seleccionada: Test global")
         enviar_seleccion_cantidad_preguntas(update, context, "global")
         return SELECCION_CANTIDAD
 
     elif seleccion == "menu_historial" or seleccion == OPCION_HISTORIAL:
-        logger.info("Opción seleccionada: Historial")
+        logger.debug("Opción seleccionada: Historial")
         mostrar_historial(update, context)
         return VER_HISTORIAL
 
     elif seleccion == "menu_ayuda" or seleccion == OPCION_AYUDA:
-        logger.info("Opción seleccionada: Ayuda")
+        logger.debug("Opción seleccionada: Ayuda")
         mensaje_ayuda = (
             "Este bot te permite realizar tests educativos de diferentes asignaturas.\n\n"
             "Puedes elegir entre realizar un test de una asignatura específica o "
@@ -173,7 +172,7 @@ def manejar_seleccion_menu_principal(update: Update, context: CallbackContext) -
         return MENU_PRINCIPAL
     
     elif seleccion == "volver_menu":
-        logger.info("Opción seleccionada: Volver al menú")
+        logger.debug("Opción seleccionada: Volver al menú")
         if update.callback_query:
             try:
                 update.callback_query.edit_message_text(
@@ -205,7 +204,7 @@ def manejar_seleccion_asignatura(update: Update, context: CallbackContext) -> in
     query.answer()
 
     callback_data = query.data
-    logger.info(f"Recibida selección de asignatura: {callback_data}")
+    logger.debug("Recibida selección de asignatura: %s", callback_data)
 
     if callback_data == "volver_menu":
         query.edit_message_text(
@@ -228,7 +227,7 @@ def manejar_seleccion_cantidad(update: Update, context: CallbackContext) -> int:
     query.answer()
 
     callback_data = query.data
-    logger.info(f"Recibida selección de cantidad: {callback_data}")
+    logger.debug("Recibida selección de cantidad: %s", callback_data)
 
     if callback_data == "volver_menu":
         query.edit_message_text(
@@ -238,8 +237,7 @@ def manejar_seleccion_cantidad(update: Update, context: CallbackContext) -> int:
         return MENU_PRINCIPAL
 
     if callback_data == "volver_asignaturas":
-        preguntas = cargar_preguntas()
-        asignaturas = obtener_todas_asignaturas(preguntas)
+        asignaturas = asignaturas_disponibles()
         conteo = contar_preguntas_por_asignatura()
 
         query.edit_message_text(
@@ -253,55 +251,165 @@ def manejar_seleccion_cantidad(update: Update, context: CallbackContext) -> int:
         tipo_test = context.user_data.get('tipo_test', 'global')
         context.user_data['cantidad_preguntas'] = cantidad
 
-        # Añadir logs para depuración
-        logger.info(f"Tipo de test seleccionado: {tipo_test}")
-        
-        preguntas = cargar_preguntas()
-        
-        # Añadir logs para depuración
-        logger.info(f"Número total de preguntas cargadas: {len(preguntas)}")
-        if preguntas:
-            logger.info(f"Ejemplo de pregunta cargada: {preguntas[0]}")
-            logger.info(f"Campo asignatura: {preguntas[0].get('asignatura')}")
-        
-        if tipo_test != "global":
-            # Añadir logs para depuración
-            logger.info(f"Filtrando preguntas por asignatura: {tipo_test}")
-            preguntas = filtrar_preguntas_por_asignatura(preguntas, tipo_test)
-            logger.info(f"Preguntas filtradas: {len(preguntas)}")
-            if preguntas:
-                logger.info(f"Ejemplo de pregunta filtrada: {preguntas[0]}")
-                logger.info(f"Campo asignatura después de filtrar: {preguntas[0].get('asignatura')}")
-
-        if len(preguntas) < cantidad:
-            cantidad = len(preguntas)
+        preguntas_seleccionadas = preguntas_para_test(tipo_test, cantidad)
+        if len(preguntas_seleccionadas) < cantidad:
+            cantidad = len(preguntas_seleccionadas)
             context.user_data['cantidad_preguntas'] = cantidad
 
-        # Añadir logs para depuración
-        logger.info(f"Seleccionando {cantidad} preguntas aleatorias")
-        preguntas_seleccionadas = seleccionar_preguntas_aleatorias(preguntas, cantidad)
-        
-        # Añadir logs para depuración
-        if preguntas_seleccionadas:
-            logger.info(f"Ejemplo de pregunta seleccionada: {preguntas_seleccionadas[0]}")
-            logger.info(f"Campo asignatura después de selección: {preguntas_seleccionadas[0].get('asignatura')}")
-        
         estado_test = inicializar_test(preguntas_seleccionadas)
         context.user_data['estado_test'] = estado_test
-        
-        # Añadir logs para depuración
-        pregunta_actual = obtener_pregunta_actual(estado_test)
-        if pregunta_actual:
-            logger.info(f"Primera pregunta del test: {pregunta_actual}")
-            logger.info(f"Campo asignatura de primera pregunta: {pregunta_actual.get('asignatura')}")
-
-        enviar_siguiente_pregunta(update, context)
+        # Un test en modo encuesta anterior ya no se puede retomar
+        indice_encuestas.terminar_test(update.effective_user.id)
+        logger.debug("Seleccionadas %d preguntas; primera: %s", cantidad,
+                     preguntas_seleccionadas[0].get('id') if preguntas_seleccionadas else None)
+
+        if es_modo_encuesta(context):
+            query.edit_message_text(
+                f"{EMOJI_TEST} Test de {cantidad} preguntas en modo encuesta. "
+                "Responde a cada encuesta para recibir la siguiente."
+            )
+            enviar_siguiente_encuesta(update, context, update.effective_chat.id)
+        else:
+            enviar_siguiente_pregunta(update, context)
         return REALIZANDO_TEST
 
     query.edit_message_text("Opción no válida. Por favor, selecciona nuevamente.")
     return SELECCION_CANTIDAD
 
-def enviar_siguiente_pregunta(update: Update, context: CallbackContext) -> None:
+def es_modo_rapido(context: CallbackContext) -> bool:
+    return context.user_data.get('modo_rapido', MODO_RAPIDO_POR_DEFECTO)
+
+
+def alternar_modo_rapido(update: Update, context: CallbackContext) -> None:
+    modo_rapido = not es_modo_rapido(context)
+    context.user_data['modo_rapido'] = modo_rapido
+    logger.info(f"Usuario {update.effective_user.id} cambia modo rápido a {modo_rapido}")
+
+    if modo_rapido:
+        mensaje = (f"{EMOJI_SIGUIENTE} Modo rápido activado: al responder verás el resultado "
+                   "junto con la siguiente pregunta.")
+    else:
+        mensaje = f"{EMOJI_EXPLICACION} Modo rápido desactivado: verás el feedback de cada respuesta antes de continuar."
+    update.message.reply_text(mensaje)
+    # None mantiene el estado actual de la conversación
+
+
+def es_modo_encuesta(context: CallbackContext) -> bool:
+    return context.user_data.get('modo_encuesta', MODO_ENCUESTA_POR_DEFECTO)
+
+
+def alternar_modo_encuesta(update: Update, context: CallbackContext) -> None:
+    modo_encuesta = not es_modo_encuesta(context)
+    context.user_data['modo_encuesta'] = modo_encuesta
+    logger.info(f"Usuario {update.effective_user.id} cambia modo encuesta a {modo_encuesta}")
+
+    if modo_encuesta:
+        mensaje = f"{EMOJI_PREGUNTA} Modo encuesta activado: tus próximos tests usarán encuestas tipo quiz."
+    else:
+        mensaje = f"{EMOJI_PREGUNTA} Modo encuesta desactivado: volverás a ver las preguntas con botones."
+    update.message.reply_text(mensaje)
+
+
+def enviar_siguiente_encuesta(update: Update, context: CallbackContext, chat_id: int) -> None:
+    estado_test = context.user_data.get('estado_test')
+
+    # Se quitan del test las preguntas sin respuesta válida (una encuesta quiz necesita la opción
+    # correcta): ni cuentan en el total de los resultados ni se guardan para retomarlo
+    while not test_completado(estado_test):
+        pregunta = obtener_pregunta_actual(estado_test)
+        encuesta = construir_encuesta(pregunta, estado_test['pregunta_actual'] + 1, len(estado_test['preguntas']))
+        if encuesta:
+            break
+        logger.warning(f"Pregunta {pregunta.get('id')} sin respuesta válida, no se puede enviar como encuesta")
+        del estado_test['preguntas'][estado_test['pregunta_actual']]
+        if 'ids' in estado_test:
+            del estado_test['ids'][estado_test['pregunta_actual']]
+    else:
+        indice_encuestas.terminar_test(update.effective_user.id)
+        resultados = calcular_resultados(estado_test)
+        enviar_resultados_test(update, context, resultados)
+        return
+
+    mensaje = context.bot.send_poll(
+        chat_id=chat_id,
+        type=Poll.QUIZ,
+        is_anonymous=False,
+        **encuesta
+    )
+    indice_encuestas.registrar(
+        mensaje.poll.id,
+        update.effective_user.id,
+        chat_id,
+        estado_test['pregunta_actual'],
+        encuesta['correct_option_id']
+    )
+    # Lo necesario para retomar el test si el bot se reinicia antes de la respuesta
+    if 'ids' not in estado_test:
+        estado_test['ids'] = [pregunta.get('id') for pregunta in estado_test['preguntas']]
+    indice_encuestas.guardar_test(
+        update.effective_user.id,
+        context.user_data.get('tipo_test', 'global'),
+        estado_test['pregunta_actual'],
+        estado_test['correctas'],
+        mensaje.poll.id,
+        estado_test['ids']
+    )
+    PREGUNTAS_HOY.inc()
+
+
+def restaurar_test_encuesta(context: CallbackContext, user_id: int, poll_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Reconstruye en user_data el test en modo encuesta guardado en el índice (p. ej. tras un reinicio).
+
+    Solo si *poll_id* es la encuesta que el usuario tenía pendiente y sus preguntas siguen en el banco.
+    """
+    test = indice_encuestas.test(user_id, poll_id)
+    if test is None:
+        return None
+    tipo_test, pregunta_actual, correctas, _, ids = test
+    preguntas = preguntas_por_id(ids)
+    if preguntas is None:
+        logger.warning(f"No se puede retomar el test de {user_id}: alguna pregunta ya no está en el banco")
+        indice_encuestas.terminar_test(user_id)
+        return None
+
+    estado_test = inicializar_test(preguntas)
+    estado_test.update(pregunta_actual=pregunta_actual, correctas=correctas, ids=ids)
+    context.user_data['estado_test'] = estado_test
+    context.user_data['tipo_test'] = tipo_test
+    context.user_data['modo_encuesta'] = True
+    logger.info(f"Test en modo encuesta de {user_id} retomado en la pregunta {pregunta_actual + 1}/{len(ids)}")
+    return estado_test
+
+
+def manejar_respuesta_encuesta(update: Update, context: CallbackContext) -> None:
+    respuesta = update.poll_answer
+    entrada = indice_encuestas.extraer(respuesta.poll_id)
+    if entrada is None:
+        logger.info(f"Respuesta a encuesta desconocida {respuesta.poll_id}, se ignora")
+        return
+
+    user_id, chat_id, indice, opcion_correcta = entrada
+    estado_test = context.user_data.get('estado_test')
+    if not estado_test and user_id == respuesta.user.id:
+        # Tras un reinicio user_data está vacío: el test sigue si esta era su encuesta pendiente
+        estado_test = restaurar_test_encuesta(context, user_id, respuesta.poll_id)
+    if (user_id != respuesta.user.id or not estado_test
+            or estado_test['pregunta_actual'] != indice or not respuesta.option_ids):
+        # Encuesta de un test anterior: ya no hay estado que actualizar
+        logger.info(f"Respuesta a encuesta {respuesta.poll_id} fuera del test activo de {respuesta.user.id}")
+        if not estado_test:
+            context.bot.send_message(chat_id=chat_id, text="No hay un test activo. Usa /start para comenzar.")
+        return
+
+    # Telegram ya ha mostrado el feedback y la explicación en el cliente
+    if respuesta.option_ids[0] == opcion_correcta:
+        estado_test['correctas'] += 1
+    avanzar_pregunta(estado_test)
+    enviar_siguiente_encuesta(update, context, chat_id)
+
+
+def enviar_siguiente_pregunta(update: Update, context: CallbackContext, encabezado: str = "") -> None:
     estado_test = context.user_data.get('estado_test')
     if not estado_test:
         if update.callback_query:
@@ -312,7 +420,7 @@ def enviar_siguiente_pregunta(update: Update, context: CallbackContext) -> None:
 
     if test_completado(estado_test):
         resultados = calcular_resultados(estado_test)
-        enviar_resultados_test(update, context, resultados)
+        enviar_resultados_test(update, context, resultados, encabezado)
         return
 
     pregunta = obtener_pregunta_actual(estado_test)
@@ -321,18 +429,14 @@ def enviar_siguiente_pregunta(update: Update, context: CallbackContext) -> None:
         context,
         pregunta,
         estado_test['pregunta_actual'] + 1,
-        len(estado_test['preguntas'])
+        len(estado_test['preguntas']),
+        encabezado
     )
 
 
 def enviar_pregunta(update: Update, context: CallbackContext, pregunta: Dict[str, Any],
-                   num_pregunta: int, total_preguntas: int) -> None:
-    logger.info(f"Dentro de enviar_pregunta: {pregunta.get('id')}")
-    logger.info(f"Asignatura recibida: {pregunta.get('asignatura')}")
-    
+                   num_pregunta: int, total_preguntas: int, encabezado: str = "") -> None:
     asignatura = pregunta.get("asignatura", "Desconocida")
-    logger.info(f"Asignatura después de get: {asignatura}")
-    
     origen = pregunta.get("origen", "Desconocido")
     enunciado = pregunta.get("enunciado", "")
     
@@ -355,8 +459,11 @@ def enviar_pregunta(update: Update, context: CallbackContext, pregunta: Dict[str
                       f"Origen: {origen}\n\n"
                       f"{enunciado}\n\n"
                       f"{opciones_formateadas}")
-    
-    logger.info(f"Texto generado para pregunta: {texto_pregunta[:50]}...")
+    if encabezado:
+        # En modo rápido el feedback de la respuesta anterior va en la misma edición
+        texto_pregunta = f"{encabezado}\n\n{texto_pregunta}"
+
+    logger.debug("Enviando pregunta %s (%d/%d)", pregunta.get('id'), num_pregunta, total_preguntas)
 
     teclado = [[InlineKeyboardButton(opcion.get('letra'), callback_data=f"resp_{pregunta['id']}_{opcion.get('letra')}")]
                for opcion in pregunta.get("opciones", [])]
@@ -380,20 +487,24 @@ def enviar_pregunta(update: Update, context: CallbackContext, pregunta: Dict[str
             text=texto_pregunta,
             reply_markup=InlineKeyboardMarkup(teclado)
         )
+    PREGUNTAS_HOY.inc()
 
 
 def manejar_respuesta(update: Update, context: CallbackContext) -> int:
+    # Cada rama responde al callback una sola vez: las respuestas a preguntas lo hacen
+    # con el texto del feedback para no necesitar una segunda llamada a la API.
     query = update.callback_query
-    query.answer()
     callback_data = query.data
-    logger.info(f"Recibida respuesta: {callback_data}")
+    logger.debug("Recibida respuesta: %s", callback_data)
 
     if callback_data == "siguiente":
+        query.answer()
         avanzar_pregunta(context.user_data['estado_test'])
         enviar_siguiente_pregunta(update, context)
         return REALIZANDO_TEST
 
     if callback_data == "nuevo_test":
+        query.answer()
         query.edit_message_text(
             "Selecciona una opción:",
             reply_markup=crear_teclado_menu_principal()
@@ -401,6 +512,7 @@ def manejar_respuesta(update: Update, context: CallbackContext) -> int:
         return MENU_PRINCIPAL
 
     if callback_data == "ver_historial":
+        query.answer()
         mostrar_historial(update, context)
         return VER_HISTORIAL
 
@@ -409,29 +521,31 @@ def manejar_respuesta(update: Update, context: CallbackContext) -> int:
         pregunta_id = "_".join(partes[1:-1])  # Toma todo excepto 'resp' y la letra de respuesta
         respuesta = partes[-1]  # La última parte es la letra de respuesta
 
-        logger.info(f"ID pregunta: {pregunta_id}, Respuesta: {respuesta}")
-
         estado_test = context.user_data.get('estado_test')
         if not estado_test:
+            query.answer()
             query.edit_message_text("No hay un test activo. Usa /start para comenzar.")
             return MENU_PRINCIPAL
 
         pregunta = obtener_pregunta_actual(estado_test)
         if not pregunta:
+            query.answer()
             query.edit_message_text("Error al obtener la pregunta actual.")
             return MENU_PRINCIPAL
 
         # Comparar el ID de la pregunta, independientemente del formato
         pregunta_actual_id = str(pregunta.get("id", ""))
-        logger.info(f"ID pregunta actual: {pregunta_actual_id}, ID callback: {pregunta_id}")
-
         if pregunta_actual_id != pregunta_id:
+            logger.debug("Respuesta a la pregunta %s con la %s en curso", pregunta_id, pregunta_actual_id)
+            query.answer()
             query.edit_message_text("Error al procesar la respuesta. Por favor, inicia un nuevo test.")
             return MENU_PRINCIPAL
 
         es_correcta = verificar_respuesta_test(estado_test, respuesta)
 
-        if es_correcta:
+        if es_modo_rapido(context):
+            enviar_respuesta_rapida(update, context, pregunta, respuesta, es_correcta)
+        elif es_correcta:
             enviar_respuesta_correcta(update, context, pregunta)
         else:
             enviar_respuesta_incorrecta(update, context, pregunta, respuesta)
@@ -439,6 +553,7 @@ def manejar_respuesta(update: Update, context: CallbackContext) -> int:
         return REALIZANDO_TEST
 
     if callback_data.startswith("expl_"):
+        query.answer()
         pregunta_id = callback_data.split("_", 1)[1]  # Toma todo después del primer '_'
         preguntas = context.user_data.get('estado_test', {}).get('preguntas', [])
         
@@ -456,6 +571,7 @@ def manejar_respuesta(update: Update, context: CallbackContext) -> int:
 
         return REALIZANDO_TEST
 
+    query.answer()
     query.edit_message_text("Opción no válida. Por favor, intenta de nuevo.")
     return REALIZANDO_TEST
 
@@ -466,11 +582,7 @@ def enviar_respuesta_correcta(update: Update, context: CallbackContext, pregunta
         [InlineKeyboardButton(f"{EMOJI_SIGUIENTE} Siguiente pregunta", callback_data="siguiente")]
     ]
 
-    context.bot.answer_callback_query(
-        callback_query_id=update.callback_query.id,
-        text="¡Respuesta correcta!",
-        show_alert=True
-    )
+    update.callback_query.answer(text="¡Respuesta correcta!", show_alert=True)
 
     # Eliminar formato Markdown del texto original para evitar errores
     texto_original = update.callback_query.message.text
@@ -523,11 +635,7 @@ def enviar_respuesta_incorrecta(update: Update, context: CallbackContext, pregun
 
     teclado = [[InlineKeyboardButton(f"{EMOJI_SIGUIENTE} Siguiente pregunta", callback_data="siguiente")]]
 
-    context.bot.answer_callback_query(
-        callback_query_id=update.callback_query.id,
-        text="Respuesta incorrecta",
-        show_alert=True
-    )
+    update.callback_query.answer(text="Respuesta incorrecta", show_alert=True)
 
     try:
         update.callback_query.edit_message_text(
@@ -544,6 +652,28 @@ def enviar_respuesta_incorrecta(update: Update, context: CallbackContext, pregun
         )
 
 
+def enviar_respuesta_rapida(update: Update, context: CallbackContext, pregunta: Dict[str, Any],
+                            respuesta_usuario: str, es_correcta: bool) -> None:
+    respuesta_correcta = pregunta.get("respuesta_correcta", "")
+
+    if es_correcta:
+        update.callback_query.answer(text="¡Respuesta correcta!")
+        encabezado = f"{EMOJI_CORRECTO} ¡Correcto! (anterior: {respuesta_usuario})"
+    else:
+        update.callback_query.answer(text=f"Respuesta incorrecta. Era la {respuesta_correcta}")
+        texto_respuesta_correcta = next((opcion.get('texto') for opcion in pregunta.get("opciones", []) if opcion.get('letra') == respuesta_correcta), "")
+        explicacion = pregunta.get("explicacion", "")
+        encabezado = (f"{EMOJI_INCORRECTO} ¡Incorrecto! Respondiste {respuesta_usuario}, "
+                      f"la correcta era {respuesta_correcta}) {texto_respuesta_correcta}")
+        if explicacion:
+            encabezado += f"\n{EMOJI_EXPLICACION} {explicacion}"
+        encabezado = encabezado.replace("*", "\\*").replace("_", "\\_").replace("`", "\\`")
+
+    # Se avanza directamente: el feedback y la siguiente pregunta van en una única edición
+    avanzar_pregunta(context.user_data['estado_test'])
+    enviar_siguiente_pregunta(update, context, encabezado)
+
+
 def enviar_explicacion(update: Update, context: CallbackContext, pregunta: Dict[str, Any]) -> None:
     respuesta_correcta = pregunta.get("respuesta_correcta", "")
     texto_respuesta_correcta = next((opcion.get('texto') for opcion in pregunta.get("opciones", []) if opcion.get('letra') == respuesta_correcta), "")
@@ -585,7 +715,8 @@ def enviar_explicacion(update: Update, context: CallbackContext, pregunta: Dict[
             reply_markup=InlineKeyboardMarkup(teclado)
         )
 
-def enviar_resultados_test(update: Update, context: CallbackContext, resultados: Dict[str, Any]) -> None:
+def enviar_resultados_test(update: Update, context: CallbackContext, resultados: Dict[str, Any],
+                           encabezado: str = "") -> None:
     porcentaje = resultados["porcentaje"]
     user = update.effective_user
     tipo_test = context.user_data.get('tipo_test', 'global')
@@ -613,6 +744,9 @@ def enviar_resultados_test(update: Update, context: CallbackContext, resultados:
     else:
         mensaje += "No te desanimes. 💪 Con práctica mejorarás tus resultados."
 
+    if encabezado:
+        mensaje = f"{encabezado}\n\n{mensaje}"
+
     teclado = [
         [InlineKeyboardButton(f"{EMOJI_TEST} Realizar otro test", callback_data="nuevo_test")],
         [InlineKeyboardButton(f"{EMOJI_HISTORIAL} Ver mi historial", callback_data="ver_historial")]
@@ -625,8 +759,10 @@ def enviar_resultados_test(update: Update, context: CallbackContext, resultados:
             parse_mode=ParseMode.MARKDOWN
         )
     else:
+        # Las respuestas a encuestas no traen chat: en privado el chat coincide con el usuario
+        chat_id = update.effective_chat.id if update.effective_chat else user.id
         context.bot.send_message(
-            chat_id=update.effective_chat.id,
+            chat_id=chat_id,
             text=mensaje,
             reply_markup=InlineKeyboardMarkup(teclado),
             parse_mode=ParseMode.MARKDOWN
@@ -639,16 +775,15 @@ def mostrar_historial(update: Update, context: CallbackContext) -> int:
     # Si proviene de un callback específico, verificar si es para volver al menú
     if callback_query and callback_query.data in ["volver_menu", "nuevo_test_desde_historial"]:
         if callback_query.data == "volver_menu":
-            logger.info("Volviendo al menú principal desde historial")
+            logger.debug("Volviendo al menú principal desde historial")
             callback_query.edit_message_text(
                 "Selecciona una opción:",
                 reply_markup=crear_teclado_menu_principal()
             )
             return MENU_PRINCIPAL
         elif callback_query.data == "nuevo_test_desde_historial":
-            logger.info("Iniciando nuevo test desde historial")
-            preguntas = cargar_preguntas()
-            asignaturas = obtener_todas_asignaturas(preguntas)
+            logger.debug("Iniciando nuevo test desde historial")
+            asignaturas = asignaturas_disponibles()
             conteo = contar_preguntas_por_asignatura()
             
             callback_query.edit_message_text(
@@ -0,0 +1,288 @@
+# app/metricas.py
+
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from trazas import registrar_tramo
+
+logger = logging.getLogger(__name__)
+
+# Límites (en segundos) de los histogramas de latencia
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+def _formatear_etiquetas(etiquetas: Etiquetas, extra: str = "") -> str:
+    partes = [f'{clave}="{valor}"' for clave, valor in etiquetas]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Contador:
+    """Contador monótono con etiquetas (formato Prometheus `counter`)."""
+
+    def __init__(self, nombre: str, ayuda: str):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._valores: Dict[Etiquetas, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad: float = 1, **etiquetas: str) -> None:
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def valores(self) -> Dict[Etiquetas, float]:
+        with self._lock:
+            return dict(self._valores)
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        for etiquetas, valor in self.valores().items():
+            lineas.append(f"{self.nombre}{_formatear_etiquetas(etiquetas)} {valor}")
+        return lineas
+
+
+class Medidor:
+    """Valor instantáneo (formato Prometheus `gauge`); puede calcularse al exportar con *funcion*."""
+
+    def __init__(self, nombre: str, ayuda: str, funcion: Optional[Callable[[], float]] = None):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self._valores: Dict[Etiquetas, float] = {}
+
+    def set(self, valor: float, **etiquetas: str) -> None:
+        self._valores[tuple(sorted(etiquetas.items()))] = valor
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        if self.funcion is not None:
+            try:
+                self._valores[()] = self.funcion()
+            except Exception as e:
+                logger.error(f"Error calculando la métrica {self.nombre}: {e}")
+        for etiquetas, valor in list(self._valores.items()):
+            lineas.append(f"{self.nombre}{_formatear_etiquetas(etiquetas)} {valor}")
+        return lineas
+
+
+class Histograma:
+    """
+    Histograma de buckets fijos (formato Prometheus `histogram`).
+
+    Observar cuesta una búsqueda binaria y un incremento bajo lock, así que puede
+    quedarse activo en producción.
+    """
+
+    def __init__(self, nombre: str, ayuda: str, buckets: Tuple[float, ...] = BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = buckets
+        # etiquetas -> [cuentas por bucket (+Inf al final), suma, total]
+        self._series: Dict[Etiquetas, List] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, **etiquetas: str) -> None:
+        clave = tuple(sorted(etiquetas.items()))
+        posicion = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def series(self) -> Dict[Etiquetas, List]:
+        with self._lock:
+            return {clave: [list(cuentas), suma, total] for clave, (cuentas, suma, total) in self._series.items()}
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for etiquetas, (cuentas, suma, total) in self.series().items():
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets, cuentas):
+                acumulado += cuenta
+                etiquetas_bucket = _formatear_etiquetas(etiquetas, 'le="%s"' % limite)
+                lineas.append(f"{self.nombre}_bucket{etiquetas_bucket} {acumulado}")
+            etiquetas_bucket = _formatear_etiquetas(etiquetas, 'le="+Inf"')
+            lineas.append(f"{self.nombre}_bucket{etiquetas_bucket} {total}")
+            lineas.append(f"{self.nombre}_sum{_formatear_etiquetas(etiquetas)} {suma}")
+            lineas.append(f"{self.nombre}_count{_formatear_etiquetas(etiquetas)} {total}")
+        return lineas
+
+
+class Tasa:
+    """
+    Eventos en los últimos *segundos* segundos, en un anillo con un contador por segundo.
+
+    Registrar un evento cuesta un incremento bajo lock; las casillas de segundos
+    pasados se reutilizan al dar la vuelta, sin purgas.
+    """
+
+    def __init__(self, segundos: int = 60):
+        self.segundos = segundos
+        self._cuentas = [0] * segundos
+        self._marcas = [0] * segundos
+        self._lock = threading.Lock()
+
+    def inc(self) -> None:
+        ahora = int(time.monotonic())
+        casilla = ahora % self.segundos
+        with self._lock:
+            if self._marcas[casilla] != ahora:
+                self._marcas[casilla] = ahora
+                self._cuentas[casilla] = 0
+            self._cuentas[casilla] += 1
+
+    def total(self) -> int:
+        ahora = int(time.monotonic())
+        with self._lock:
+            return sum(cuenta for cuenta, marca in zip(self._cuentas, self._marcas) if ahora - marca < self.segundos)
+
+
+class Recientes:
+    """Últimas *capacidad* observaciones con su instante, para percentiles de los últimos minutos."""
+
+    def __init__(self, capacidad: int = 2048):
+        # deque.append es atómico: no hace falta lock para registrar
+        self._valores: Deque[Tuple[float, float]] = deque(maxlen=capacidad)
+
+    def observar(self, valor: float) -> None:
+        self._valores.append((time.monotonic(), valor))
+
+    def percentiles(self, puntos: Tuple[int, ...] = (50, 95), ventana: float = 300) -> Dict[int, Optional[float]]:
+        """
+        Percentiles (rango más cercano) de las observaciones de los últimos *ventana* segundos.
+
+        Returns:
+            Dict[int, Optional[float]]: Valor de cada percentil, o None si no hay observaciones.
+        """
+        limite = time.monotonic() - ventana
+        valores = sorted(valor for instante, valor in list(self._valores) if instante >= limite)
+        if not valores:
+            return {punto: None for punto in puntos}
+        return {punto: valores[min(len(valores) - 1, max(0, -(-punto * len(valores) // 100) - 1))]
+                for punto in puntos}
+
+
+class ContadorDiario:
+    """Contador que vuelve a cero al cambiar la fecha local."""
+
+    def __init__(self):
+        self._dia = date.today()
+        self._valor = 0
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad: int = 1) -> None:
+        hoy = date.today()
+        with self._lock:
+            if hoy != self._dia:
+                self._dia, self._valor = hoy, 0
+            self._valor += cantidad
+
+    def valor(self) -> int:
+        with self._lock:
+            return self._valor if self._dia == date.today() else 0
+
+
+# --------------------------------------------------------------------------- #
+#  Métricas del bot                                                           #
+# --------------------------------------------------------------------------- #
+LATENCIA_HANDLERS = Histograma("bot_handler_segundos", "Tiempo de proceso de cada update por estado de la conversación")
+UPDATES = Contador("bot_updates_total", "Updates recibidos por tipo")
+LATENCIA_API = Histograma("bot_telegram_api_segundos", "Latencia de las llamadas a la API de Telegram por método")
+ERRORES_API = Contador("bot_telegram_api_errores_total", "Errores de la API de Telegram por método y tipo")
+LATENCIA_BD = Histograma("bot_bd_segundos", "Duración de cada función de acceso a SQLite")
+CARGA_BANCO = Medidor("bot_banco_carga_segundos", "Duración de la última carga del banco de preguntas")
+TAMANO_BANCO = Medidor("bot_banco_preguntas", "Preguntas en el banco cargado")
+RECARGAS_BANCO = Contador("bot_banco_recargas_total", "Recargas del banco en caliente por resultado")
+SESIONES = Medidor("bot_sesiones_activas", "Tests en curso en este proceso")
+ARRANQUE = Medidor("bot_arranque_segundos", "Duración de cada fase del arranque (fase=total hasta estar listo)")
+LISTO = Medidor("bot_listo", "1 cuando el bot ha terminado de arrancar y atiende updates")
+
+# Contadores en memoria para /estado (no se exportan a Prometheus)
+TASA_UPDATES = Tasa(60)
+LATENCIAS_RECIENTES = Recientes()
+PREGUNTAS_HOY = ContadorDiario()
+
+METRICAS = [LATENCIA_HANDLERS, UPDATES, LATENCIA_API, ERRORES_API, LATENCIA_BD, CARGA_BANCO, TAMANO_BANCO,
+            RECARGAS_BANCO, SESIONES, ARRANQUE, LISTO]
+
+
+def cronometrar_bd(funcion: Callable) -> Callable:
+    """Decorador para las funciones de utils.py que acceden a SQLite (métrica y tramo de la traza)."""
+    nombre = funcion.__name__
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            duracion = time.perf_counter() - inicio
+            LATENCIA_BD.observar(duracion, funcion=nombre)
+            registrar_tramo(nombre, 'bd', inicio, duracion)
+
+    return envoltura
+
+
+def exportar() -> str:
+    """Devuelve todas las métricas en el formato de texto de Prometheus."""
+    lineas: List[str] = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exponer())
+    return "\n".join(lineas) + "\n"
+
+
+# --------------------------------------------------------------------------- #
+#  Servidor HTTP                                                              #
+# --------------------------------------------------------------------------- #
+# ruta -> función que devuelve (código HTTP, content-type, cuerpo)
+RUTAS: Dict[str, Callable[[], Tuple[int, str, str]]] = {
+    "/metrics": lambda: (200, "text/plain; version=0.0.4; charset=utf-8", exportar()),
+}
+
+
+class _ManejadorHTTP(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        ruta = RUTAS.get(self.path.split("?", 1)[0])
+        if ruta is None:
+            codigo, tipo, cuerpo = 404, "text/plain; charset=utf-8", "No encontrado\n"
+        else:
+            codigo, tipo, cuerpo = ruta()
+        datos = cuerpo.encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, format: str, *args) -> None:
+        # Las consultas periódicas del monitor no deben llenar el log
+        pass
+
+
+def iniciar_servidor_http(puerto: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Sirve RUTAS en un hilo de fondo; con *puerto* 0 no se inicia nada."""
+    if not puerto:
+        return None
+    try:
+        servidor = ThreadingHTTPServer((host, puerto), _ManejadorHTTP)
+    except OSError as e:
+        logger.error(f"No se pudo abrir el puerto de métricas {puerto}: {e}")
+        return None
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="servidor-http", daemon=True).start()
+    logger.info(f"Métricas disponibles en http://{host}:{puerto}/metrics")
+    return servidor
@@ -0,0 +1,270 @@
+# app/particionado.py
+
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from queue import Queue
+from typing import Any, Callable, Dict, List, Optional
+
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import Dispatcher, JobQueue
+from telegram.utils.request import Request
+
+from config import BOT_TOKEN, TELEGRAM_BASE_URL, ENCUESTAS_INDICE_JSON, METRICAS_PUERTO, TRAZAS_ARCHIVO
+from utils import (
+    inicializar_base_datos, activar_modo_wal, cargar_banco, precalentar_banco, configurar_escritor, ESCRITURAS
+)
+from arranque import arranque
+from anuncios import iniciar_difusor
+from encuestas import indice_encuestas
+from escrituras import ClienteEscritor, atender_escrituras
+from instrumentacion import BotInstrumentado
+from metricas import iniciar_servidor_http
+from salud import salud
+from perfilado import instalar_senal_perfil
+from recarga import recarga_banco
+from registro import configurar_logging_trabajador, detener_logging
+from trazas import escritor as escritor_trazas
+
+logger = logging.getLogger(__name__)
+
+# Tipos de update y dónde está el usuario que lo origina
+_CAMPOS_USUARIO = (
+    ('message', 'from'), ('edited_message', 'from'), ('callback_query', 'from'),
+    ('inline_query', 'from'), ('chosen_inline_result', 'from'), ('poll_answer', 'user'),
+    ('my_chat_member', 'from'), ('chat_member', 'from'), ('chat_join_request', 'from'),
+    ('shipping_query', 'from'), ('pre_checkout_query', 'from'),
+)
+
+
+def obtener_user_id(datos: Dict[str, Any]) -> Optional[int]:
+    """
+    Extrae el user_id de un update en formato JSON sin construir el objeto Update.
+
+    Args:
+        datos (Dict[str, Any]): Update tal y como lo devuelve getUpdates.
+
+    Returns:
+        Optional[int]: ID del usuario o None si el update no tiene usuario (p. ej. canales).
+    """
+    for campo, campo_usuario in _CAMPOS_USUARIO:
+        contenido = datos.get(campo)
+        if contenido and campo_usuario in contenido:
+            return contenido[campo_usuario]['id']
+    return None
+
+
+def particion_usuario(user_id: int, procesos: int) -> int:
+    """Asigna un usuario a un proceso (hash multiplicativo para repartir IDs consecutivos)."""
+    return ((user_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) % procesos
+
+
+def proceso_trabajador(indice: int, cola, latido, cola_escrituras, respuestas_escritor,
+                       crear_peticion: Callable[[], Request],
+                       registrar_handlers: Callable[[Dispatcher], None]) -> None:
+    """
+    Atiende los updates de los usuarios asignados a este proceso.
+
+    Cada trabajador tiene su propio Dispatcher, y con él sus conversaciones y user_data:
+    como un usuario siempre cae en el mismo proceso, su sesión nunca se comparte. Tras
+    cada update anota en *latido* (memoria compartida) el instante en que lo terminó,
+    para el /salud del proceso principal.
+    """
+    # El proceso principal coordina la parada con un None en la cola
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    instalar_senal_perfil()
+
+    # Cada proceso escribe su propio archivo: la rotación no admite varios escritores
+    configurar_logging_trabajador(indice)
+    escritor_trazas.reiniciar(TRAZAS_ARCHIVO.replace('.json', f'_{indice}.json'))
+    # Todas las escrituras en SQLite (usuarios, resultados, anuncios, salud) las hace el proceso principal
+    configurar_escritor(ClienteEscritor(cola_escrituras, respuestas_escritor, indice))
+    indice_encuestas.ruta = ENCUESTAS_INDICE_JSON.replace('.json', f'_{indice}.json')
+    indice_encuestas.cargar()
+
+    bot = BotInstrumentado(BOT_TOKEN, base_url=TELEGRAM_BASE_URL, request=crear_peticion())
+    job_queue = JobQueue()
+    dp = Dispatcher(bot, Queue(), job_queue=job_queue)
+    job_queue.set_dispatcher(dp)
+    registrar_handlers(dp)
+    job_queue.start()
+    if METRICAS_PUERTO:
+        iniciar_servidor_http(METRICAS_PUERTO + 1 + indice)
+
+    salud.configurar(cola.qsize)
+    # Cada trabajador tiene su copia del banco y la recarga por su cuenta
+    recarga_banco.iniciar()
+
+    if indice == 0:
+        # Un único difusor para todos los procesos: el límite de Telegram es del bot
+        iniciar_difusor(bot)
+
+    arranque.marcar_listo()
+    logger.info(f"Proceso trabajador {indice} listo")
+    while True:
+        datos = cola.get()
+        if datos is None:
+            break
+        dp.process_update(Update.de_json(datos, bot))
+        latido.value = time.monotonic()
+
+    job_queue.stop()
+    indice_encuestas.guardar()
+    logger.info(f"Proceso trabajador {indice} detenido")
+    # multiprocessing termina el hijo con os._exit, sin pasar por atexit
+    escritor_trazas.detener()
+    detener_logging()
+
+
+class Ingreso:
+    """
+    Reparte updates en JSON entre *procesos* trabajadores según el user_id.
+
+    El banco de preguntas y sus índices se preparan antes de crear los procesos para
+    que todos los compartan (fork + copy-on-write) sin volver a calcularlos.
+    """
+
+    def __init__(self, procesos: int, crear_peticion: Callable[[], Request],
+                 registrar_handlers: Callable[[Dispatcher], None]):
+        self.procesos = procesos
+        contexto = multiprocessing.get_context('fork')
+        self.cola_escrituras = contexto.Queue()
+        # Confirmaciones del escritor, una cola por trabajador
+        self.respuestas_escritor = [contexto.Queue() for _ in range(procesos)]
+        self.colas = [contexto.Queue() for _ in range(procesos)]
+        # time.monotonic() del último update terminado por cada trabajador (0 = ninguno aún)
+        self.latidos = [contexto.RawValue('d', 0.0) for _ in range(procesos)]
+        self.trabajadores: List[multiprocessing.Process] = [
+            contexto.Process(
+                target=proceso_trabajador,
+                args=(indice, self.colas[indice], self.latidos[indice], self.cola_escrituras,
+                      self.respuestas_escritor[indice],
+                      crear_peticion, registrar_handlers),
+                name=f"trabajador-{indice}",
+                daemon=True
+            )
+            for indice in range(procesos)
+        ]
+        # Único punto de escritura en la base de datos para los trabajadores
+        self.escritor = threading.Thread(target=atender_escrituras,
+                                         args=(self.cola_escrituras, self.respuestas_escritor, ESCRITURAS),
+                                         name="escritor-bd", daemon=True)
+
+    def iniciar(self) -> None:
+        with arranque.fase('bd'):
+            inicializar_base_datos()
+            activar_modo_wal()
+        with arranque.fase('banco'):
+            total_preguntas = cargar_banco()
+        with arranque.fase('cache'):
+            precalentar_banco()
+        logger.info(f"Banco compartido: {total_preguntas} preguntas")
+
+        with arranque.fase('procesos'):
+            # Los objetos ya creados pasan a la generación permanente: el GC de los hijos no
+            # los toca y sus páginas siguen compartidas con el padre
+            gc.freeze()
+            for trabajador in self.trabajadores:
+                trabajador.start()
+            # Los hilos del proceso principal se arrancan después del fork para que
+            # ningún hijo herede un lock tomado
+            self.escritor.start()
+
+    def enviar(self, datos: Dict[str, Any]) -> None:
+        user_id = obtener_user_id(datos)
+        indice = particion_usuario(user_id, self.procesos) if user_id is not None else 0
+        self.colas[indice].put(datos)
+
+    def ultimo_procesado(self) -> Optional[float]:
+        """
+        Último update terminado, para /salud: el del trabajador más atrasado entre los que
+        tienen updates en cola (None si alguno de ellos aún no ha terminado ninguno) o, si
+        ninguno tiene cola, el más reciente.
+        """
+        con_cola, terminados = [], []
+        for cola, latido in zip(self.colas, self.latidos):
+            ultimo = latido.value or None
+            terminados.append(ultimo)
+            if cola.qsize():
+                con_cola.append(ultimo)
+        if con_cola:
+            return None if None in con_cola else min(con_cola)
+        vistos = [ultimo for ultimo in terminados if ultimo is not None]
+        return max(vistos) if vistos else None
+
+    def detener(self) -> None:
+        for cola in self.colas:
+            cola.put(None)
+        for trabajador in self.trabajadores:
+            trabajador.join()
+        self.cola_escrituras.put(None)
+        self.escritor.join()
+
+
+def ejecutar_particionado(procesos: int, registrar_handlers: Callable[[Dispatcher], None]) -> None:
+    """Ejecuta el bot con *procesos* trabajadores; este proceso hace de sondeo y de escritor."""
+    ingreso = Ingreso(procesos, lambda: Request(con_pool_size=8), registrar_handlers)
+    principal = os.getpid()
+
+    def reenviar(signum, frame):
+        # Un trabajador recién creado hereda este handler hasta instalar el suyo: ahí se ignora
+        if os.getpid() != principal:
+            return
+        for trabajador in ingreso.trabajadores:
+            if trabajador.is_alive():
+                os.kill(trabajador.pid, signum)
+
+    # Antes de arrancar nada: con la acción por defecto un kill -HUP o -USR1 mataría el proceso.
+    # Cada trabajador recarga su banco (SIGHUP) y perfila sus propios updates (SIGUSR1)
+    for nombre in ('SIGHUP', 'SIGUSR1'):
+        if hasattr(signal, nombre):
+            signal.signal(getattr(signal, nombre), reenviar)
+    ingreso.iniciar()
+
+    # Este proceso no atiende updates: su /salud mira las colas de los trabajadores y sus latidos,
+    # así que un trabajador atascado con updates pendientes lo pone en 503
+    salud.configurar(lambda: sum(cola.qsize() for cola in ingreso.colas), ingreso.ultimo_procesado)
+
+    with arranque.fase('red'):
+        iniciar_servidor_http(METRICAS_PUERTO)
+        bot = BotInstrumentado(BOT_TOKEN, base_url=TELEGRAM_BASE_URL, request=Request(con_pool_size=1))
+        bot.delete_webhook()
+
+    parar = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: parar.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: parar.set())
+
+    arranque.marcar_listo()
+    logger.info(f"Bot iniciado en modo multiproceso con {procesos} trabajadores. Esperando mensajes...")
+    offset = 0
+    while not parar.is_set():
+        try:
+            # getUpdates en crudo: el reparto solo necesita el JSON, no los objetos Update
+            actualizaciones = bot.request.post(
+                f"{bot.base_url}/getUpdates",
+                data={'offset': offset, 'timeout': 10},
+                timeout=15
+            )
+        except TelegramError as e:
+            logger.error(f"Error al obtener updates: {e}")
+            parar.wait(1)
+            continue
+
+        for datos in actualizaciones:
+            offset = datos['update_id'] + 1
+            ingreso.enviar(datos)
+
+    # Confirmar a Telegram el último lote para que no se vuelva a entregar al reiniciar
+    try:
+        bot.request.post(f"{bot.base_url}/getUpdates", data={'offset': offset, 'timeout': 0}, timeout=5)
+    except TelegramError as e:
+        logger.error(f"Error al confirmar los últimos updates: {e}")
+
+    logger.info("Deteniendo trabajadores...")
+    ingreso.detener()
@@ -0,0 +1,265 @@
+# app/perfilado.py
+
+import io
+import logging
+import os
+import signal
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from telegram import Bot, Update
+from telegram.ext import CallbackContext
+
+from config import ADMIN_IDS, LOGS_DIR, PERFIL_UPDATES, PERFIL_SEGUNDOS, PERFIL_MUESTREO, PERFIL_TOP
+
+# cProfile, pstats y tracemalloc solo se importan al empezar una captura: no retrasan el arranque
+if TYPE_CHECKING:
+    import pstats
+
+logger = logging.getLogger(__name__)
+
+PROFUNDIDAD_TRACEMALLOC = 10  # Marcos de pila guardados por reserva de memoria
+MAX_MENSAJE = 4000  # Margen bajo el límite de 4096 caracteres de Telegram
+
+_estado_hilo = threading.local()
+
+
+class Perfilador:
+    """
+    Captura cProfile y tracemalloc de los próximos N updates o T segundos, lo que ocurra antes.
+
+    Mientras no hay captura, el único coste por update es leer `activo` en los handlers
+    de medición de instrumentacion.py. Durante la captura se perfila uno de cada
+    *muestreo* updates, con un cProfile por update que se agrega por handler.
+    """
+
+    def __init__(self):
+        self.activo = False
+        self._lock = threading.Lock()
+        self._temporizador: Optional[threading.Timer] = None
+
+    def iniciar(self, updates: int = PERFIL_UPDATES, segundos: float = PERFIL_SEGUNDOS,
+                muestreo: int = PERFIL_MUESTREO, bot: Optional[Bot] = None, chat_id: Optional[int] = None) -> bool:
+        """
+        Empieza una captura; el resumen se envía a *chat_id* si se indica.
+
+        Returns:
+            bool: False si ya había una captura en curso.
+        """
+        import tracemalloc
+
+        with self._lock:
+            if self.activo:
+                return False
+            self._restantes = updates
+            self._muestreo = max(1, muestreo)
+            self._vistos = 0
+            self._fin = time.monotonic() + segundos
+            self._inicio = datetime.now()
+            self._bot = bot
+            self._chat_id = chat_id
+            self._perfiles: Dict[str, "pstats.Stats"] = {}
+            self._medidas: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+            self._tracemalloc_propio = not tracemalloc.is_tracing()
+            if self._tracemalloc_propio:
+                tracemalloc.start(PROFUNDIDAD_TRACEMALLOC)
+            self._instantanea_inicial = tracemalloc.take_snapshot()
+
+            self._temporizador = threading.Timer(segundos, self.finalizar)
+            self._temporizador.daemon = True
+            self._temporizador.start()
+            self.activo = True
+        logger.info(f"Perfilado iniciado: {updates} updates o {segundos} s (1 de cada {self._muestreo})")
+        return True
+
+    def empezar_update(self, nombre: str) -> None:
+        """Arranca el perfil del update que empieza en este hilo (si le toca por muestreo)."""
+        _estado_hilo.perfil = None
+        with self._lock:
+            if not self.activo:
+                return
+            self._vistos += 1
+            if (self._vistos - 1) % self._muestreo:
+                return
+        import cProfile
+        import tracemalloc
+
+        perfil = cProfile.Profile()
+        tracemalloc.reset_peak()
+        _estado_hilo.perfil = (perfil, nombre, time.perf_counter(), tracemalloc.get_traced_memory()[0])
+        perfil.enable()
+
+    def terminar_update(self) -> None:
+        datos = getattr(_estado_hilo, 'perfil', None)
+        if datos is None:
+            return
+        _estado_hilo.perfil = None
+        import pstats
+        import tracemalloc
+
+        perfil, nombre, inicio, memoria_inicial = datos
+        perfil.disable()
+        duracion = time.perf_counter() - inicio
+        memoria, pico = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+
+        with self._lock:
+            if not self.activo:
+                return
+            if nombre in self._perfiles:
+                self._perfiles[nombre].add(perfil)
+            else:
+                self._perfiles[nombre] = pstats.Stats(perfil)
+            medidas = self._medidas[nombre]
+            medidas['updates'] += 1
+            medidas['segundos'] += duracion
+            medidas['memoria'] += memoria - memoria_inicial
+            medidas['pico'] = max(medidas['pico'], pico - memoria_inicial)
+            self._restantes -= 1
+            terminado = self._restantes <= 0 or time.monotonic() >= self._fin
+        if terminado:
+            self.finalizar()
+
+    def finalizar(self) -> None:
+        """Cierra la captura y vuelca los resultados en un hilo aparte (no bloquea al Dispatcher)."""
+        import tracemalloc
+
+        with self._lock:
+            if not self.activo:
+                return
+            self.activo = False
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+            instantanea = tracemalloc.take_snapshot()
+            if self._tracemalloc_propio:
+                tracemalloc.stop()
+            captura = (self._inicio, self._perfiles, dict(self._medidas), self._instantanea_inicial,
+                       instantanea, self._bot, self._chat_id)
+            self._instantanea_inicial = None
+        threading.Thread(target=self._volcar, args=captura, name="perfilado", daemon=True).start()
+
+    def _volcar(self, inicio: datetime, perfiles: Dict[str, "pstats.Stats"], medidas: Dict[str, Dict[str, float]],
+                instantanea_inicial, instantanea, bot: Optional[Bot], chat_id: Optional[int]) -> None:
+        import pstats
+
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        base = os.path.join(LOGS_DIR, f"perfil_{inicio:%Y%m%d_%H%M%S}_{os.getpid()}")
+        resumen = resumir_perfiles(perfiles, medidas)
+        try:
+            if perfiles:
+                pstats.Stats().add(*perfiles.values()).dump_stats(f"{base}.prof")
+
+            with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                f.write(resumen + "\n")
+                for nombre, stats in perfiles.items():
+                    salida = io.StringIO()
+                    stats.stream = salida
+                    stats.sort_stats('cumulative').print_stats(PERFIL_TOP * 2)
+                    f.write(f"\n===== {nombre} =====\n{salida.getvalue()}")
+                f.write("\n===== Memoria reservada durante la captura (por línea) =====\n")
+                for diferencia in instantanea.compare_to(instantanea_inicial, 'lineno')[:PERFIL_TOP * 2]:
+                    f.write(f"{diferencia}\n")
+            logger.info(f"Perfilado terminado: {base}.txt / {base}.prof")
+        except OSError as e:
+            logger.error(f"No se pudo guardar el perfil en {base}: {e}")
+
+        if bot is not None and chat_id is not None:
+            texto = f"{resumen}\n\nDetalle: {os.path.basename(base)}.txt / .prof en data/logs"
+            try:
+                bot.send_message(chat_id=chat_id, text=texto[:MAX_MENSAJE])
+            except Exception as e:
+                logger.error(f"No se pudo enviar el resumen del perfil: {e}")
+
+
+def _funcion(clave) -> str:
+    archivo, linea, nombre = clave
+    return f"{os.path.basename(archivo)}:{linea}({nombre})" if linea else nombre
+
+
+def resumir_perfiles(perfiles: Dict[str, "pstats.Stats"], medidas: Dict[str, Dict[str, float]]) -> str:
+    """
+    Resumen legible: updates, tiempo y memoria por handler y funciones con más tiempo propio.
+
+    Args:
+        perfiles (Dict[str, pstats.Stats]): Perfil agregado de cada handler.
+        medidas (Dict[str, Dict[str, float]]): Updates, segundos y memoria de cada handler.
+
+    Returns:
+        str: Texto del resumen.
+    """
+    if not medidas:
+        return "Perfil vacío: no se ha atendido ningún update durante la captura."
+
+    lineas = ["Perfil por handler (updates, ms medios, KB reservados netos/pico):"]
+    for nombre, m in sorted(medidas.items(), key=lambda item: -item[1]['segundos']):
+        n = int(m['updates'])
+        lineas.append(f"• {nombre}: {n}, {m['segundos'] / n * 1000:.2f} ms, "
+                      f"{m['memoria'] / n / 1024:.1f}/{m['pico'] / 1024:.1f} KB")
+
+    # Tiempo propio (tottime) de cada función sumado entre handlers
+    propio: Dict[Any, List[float]] = defaultdict(lambda: [0, 0.0])
+    for stats in perfiles.values():
+        for clave, (_, llamadas, tottime, _, _) in stats.stats.items():
+            propio[clave][0] += llamadas
+            propio[clave][1] += tottime
+    lineas.append("")
+    lineas.append(f"Top {PERFIL_TOP} funciones por tiempo propio (llamadas, ms):")
+    for clave, (llamadas, tottime) in sorted(propio.items(), key=lambda item: -item[1][1])[:PERFIL_TOP]:
+        lineas.append(f"{_funcion(clave)}: {llamadas}, {tottime * 1000:.2f}")
+    return "\n".join(lineas)
+
+
+perfilador = Perfilador()
+
+
+def perfil(update: Update, context: CallbackContext) -> None:
+    """/perfil [updates] [segundos] | /perfil parar (solo administradores)."""
+    user = update.effective_user
+    if user.id not in ADMIN_IDS:
+        logger.warning(f"Usuario {user.id} sin permisos ha intentado usar /perfil")
+        update.message.reply_text("Comando no reconocido. Usa /start para reiniciar el bot.")
+        return
+
+    argumentos = context.args or []
+    if argumentos and argumentos[0] == "parar":
+        if perfilador.activo:
+            perfilador.finalizar()
+            update.message.reply_text("Perfilado detenido; enseguida llega el resumen.")
+        else:
+            update.message.reply_text("No hay ningún perfilado en curso.")
+        return
+
+    try:
+        updates = int(argumentos[0]) if len(argumentos) > 0 else PERFIL_UPDATES
+        segundos = float(argumentos[1]) if len(argumentos) > 1 else PERFIL_SEGUNDOS
+    except ValueError:
+        update.message.reply_text("Uso: /perfil [updates] [segundos] o /perfil parar")
+        return
+
+    if perfilador.iniciar(updates, segundos, bot=context.bot, chat_id=update.effective_chat.id):
+        update.message.reply_text(
+            f"🔬 Perfilando los próximos {updates} updates o {segundos:.0f} s. Te enviaré el resumen."
+        )
+    else:
+        update.message.reply_text("Ya hay un perfilado en curso. Usa /perfil parar para terminarlo.")
+
+
+def instalar_senal_perfil() -> None:
+    """SIGUSR1 inicia (o, si hay uno en curso, termina) un perfilado con los valores por defecto."""
+    if not hasattr(signal, 'SIGUSR1'):
+        return
+
+    def alternar() -> None:
+        if perfilador.activo:
+            perfilador.finalizar()
+        else:
+            perfilador.iniciar()
+
+    def manejar(signum, frame) -> None:
+        # La señal puede llegar con el lock del perfilador tomado por este mismo hilo
+        threading.Thread(target=alternar, name="senal-perfil", daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, manejar)
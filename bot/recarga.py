@@ -0,0 +1,56 @@
+# app/recarga.py
+
+import logging
+import signal
+import threading
+import time
+from typing import Optional
+
+from config import BANCO_RECARGA_SEGUNDOS, BANCO_SQLITE
+from utils import recargar_banco, activar_recarga_en_segundo_plano, estado_banco
+
+logger = logging.getLogger(__name__)
+
+
+class RecargaBanco:
+    """
+    Hilo que sustituye el banco en memoria cuando el extractor publica uno nuevo.
+
+    El extractor escribe preguntas.json en un temporal y lo renombra, así que cada
+    comprobación (un stat cada BANCO_RECARGA_SEGUNDOS) ve el archivo anterior o el
+    nuevo completo, nunca uno a medias. La lectura y los índices se hacen en este
+    hilo: los handlers siguen sirviendo el banco anterior hasta que el nuevo está
+    listo. `kill -HUP <pid>` adelanta la comprobación.
+    """
+
+    def __init__(self, intervalo: float = BANCO_RECARGA_SEGUNDOS):
+        self.intervalo = intervalo
+        self._despertar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        """Arranca el hilo y, desde el hilo principal, instala la señal SIGHUP."""
+        # El banco SQLite se consulta en disco y cada conexión se reabre sola al cambiar el archivo
+        if self._hilo is not None or self.intervalo <= 0 or BANCO_SQLITE:
+            return
+        activar_recarga_en_segundo_plano()
+        if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, lambda signum, frame: self._despertar.set())
+        self._hilo = threading.Thread(target=self._bucle, name="recarga-banco", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self) -> None:
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            inicio = time.perf_counter()
+            try:
+                if recargar_banco():
+                    banco = estado_banco()
+                    logger.info(f"Banco recargado: versión {banco['version']}, {banco['preguntas']} preguntas "
+                                f"en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+            except Exception as e:
+                logger.error(f"Error en la recarga del banco: {e}")
+
+
+recarga_banco = RecargaBanco()
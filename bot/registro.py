@@ -0,0 +1,162 @@
+# app/registro.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional, Union
+
+from config import LOGS_DIR, LOG_NIVEL, LOG_MUESTREO_DEPURACION, LOG_MAX_BYTES, LOG_COPIAS
+
+# Update que está procesando cada hilo del Dispatcher: sus ids se añaden a cada
+# registro y decide si se conservan sus mensajes de depuración
+_contexto = threading.local()
+
+_listener: Optional[QueueListener] = None
+
+FORMATO_CONSOLA = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Solo para convertir en texto las excepciones antes de encolarlas
+_FORMATO_EXCEPCION = logging.Formatter()
+
+
+def iniciar_contexto_update(update_id: int, user_id: Optional[int],
+                            muestreo: float = LOG_MUESTREO_DEPURACION) -> None:
+    """Asocia los registros del hilo actual a un update y sortea si se guarda su depuración."""
+    _contexto.update_id = update_id
+    _contexto.user_id = user_id
+    _contexto.depuracion = muestreo >= 1 or random.random() < muestreo
+
+
+def finalizar_contexto_update() -> None:
+    _contexto.update_id = None
+    _contexto.user_id = None
+    _contexto.depuracion = True
+
+
+def depuracion_activa(logger: logging.Logger) -> bool:
+    """
+    Indica si merece la pena construir un mensaje de depuración en el hilo actual.
+
+    Args:
+        logger (logging.Logger): Logger que emitiría el mensaje.
+
+    Returns:
+        bool: False si el nivel lo descarta o el update en curso no ha salido en el muestreo.
+    """
+    return logger.isEnabledFor(logging.DEBUG) and getattr(_contexto, 'depuracion', True)
+
+
+class _HandlerCola(QueueHandler):
+    """
+    QueueHandler que aplica el muestreo antes de formatear nada.
+
+    Primero se añaden los ids del update en curso y se descartan los mensajes de
+    depuración de los updates que no han salido en el muestreo, sin construir su
+    texto. Los que se conservan se fijan antes de encolar, como en
+    `QueueHandler.prepare`: el mensaje se combina con sus argumentos y la excepción
+    se convierte en texto. Así un argumento mutable (el Update, un Counter de
+    métricas) sale como estaba al registrarlo y no como esté cuando escriba el hilo
+    de fondo; este solo aplica el formato de cada destino.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _FORMATO_EXCEPCION.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        update_id = getattr(_contexto, 'update_id', None)
+        if update_id is not None:
+            if record.levelno <= logging.DEBUG and not _contexto.depuracion:
+                return
+            record.update_id = update_id
+            record.user_id = _contexto.user_id
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+class FormateadorJSON(logging.Formatter):
+    """Un objeto JSON por línea con la hora, nivel, logger, mensaje e ids del update."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'hilo': record.threadName,
+        }
+        update_id = getattr(record, 'update_id', None)
+        if update_id is not None:
+            datos['update_id'] = update_id
+            datos['user_id'] = record.user_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+def configurar_logging(archivo: str = "bot.log", nivel: Union[str, int] = LOG_NIVEL) -> None:
+    """
+    Envía todos los registros a una cola y los escribe desde un hilo de fondo.
+
+    El archivo (JSON por línea, con rotación) y la consola se atienden en ese hilo,
+    así que ningún handler espera al disco. Se puede volver a llamar, por ejemplo en un
+    proceso hijo tras un fork, donde el hilo escritor del padre no existe.
+
+    Args:
+        archivo (str): Nombre del archivo dentro de LOGS_DIR.
+        nivel (Union[str, int]): Nivel mínimo del logger raíz.
+    """
+    global _listener
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    # Tras un fork el hilo escritor heredado ya no existe y basta con sustituirlo
+    if _listener is not None and _listener._thread is not None and _listener._thread.is_alive():
+        detener_logging()
+
+    archivo_log = RotatingFileHandler(os.path.join(LOGS_DIR, archivo), maxBytes=LOG_MAX_BYTES,
+                                      backupCount=LOG_COPIAS, encoding='utf-8')
+    archivo_log.setFormatter(FormateadorJSON())
+    consola = logging.StreamHandler()
+    consola.setFormatter(logging.Formatter(FORMATO_CONSOLA))
+
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(_HandlerCola(cola))
+    raiz.setLevel(nivel)
+
+    _listener = QueueListener(cola, archivo_log, consola, respect_handler_level=True)
+    _listener.start()
+
+
+def configurar_logging_trabajador(indice: int) -> None:
+    """En un proceso trabajador recién creado, vuelve a arrancar el escritor con su propio archivo."""
+    if _listener is not None:
+        configurar_logging(f"bot_{indice}.log", logging.getLogger().level)
+
+
+def detener_logging() -> None:
+    """Vacía la cola y cierra los archivos (se ejecuta también al salir)."""
+    global _listener
+    if _listener is not None and _listener._thread is not None and _listener._thread.is_alive():
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+
+
+atexit.register(detener_logging)
@@ -0,0 +1,114 @@
+# app/salud.py
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import SALUD_CACHE_BD_SEGUNDOS, SALUD_MAX_SIN_PROCESAR
+from arranque import arranque
+from metricas import RUTAS
+from utils import verificar_base_datos, medir_escritura_bd, estado_banco
+import instrumentacion
+
+logger = logging.getLogger(__name__)
+
+
+class Salud:
+    """
+    Comprobaciones de /salud (el proceso está vivo y atiende) y /listo (puede recibir tráfico).
+
+    Se calculan en el hilo del servidor HTTP a partir de datos que ya existen: el tamaño
+    de la cola de updates, la marca que deja instrumentacion.py al terminar cada update
+    y el estado del banco en memoria. La única prueba con coste real, la escritura en
+    SQLite, se cachea SALUD_CACHE_BD_SEGUNDOS, así que consultar cada pocos segundos no
+    añade carga ni pasa por los handlers.
+    """
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        # Updates pendientes de procesar y, si la cuenta este proceso, instante del último procesado
+        self.profundidad_cola: Callable[[], int] = lambda: 0
+        self.ultimo_update: Callable[[], Optional[float]] = lambda: instrumentacion.ultimo_update
+        self._bd: Tuple[float, Optional[Dict[str, Any]]] = (0.0, None)
+        self._lock = threading.Lock()
+
+    def configurar(self, profundidad_cola: Callable[[], int],
+                   ultimo_update: Optional[Callable[[], Optional[float]]] = None) -> None:
+        """Indica de dónde leer la cola de updates (y el último procesado, si no es el de instrumentacion)."""
+        self.profundidad_cola = profundidad_cola
+        if ultimo_update is not None:
+            self.ultimo_update = ultimo_update
+
+    def comprobar_bd(self) -> Dict[str, Any]:
+        """Tablas presentes y latencia de una escritura, repetidas como mucho cada SALUD_CACHE_BD_SEGUNDOS."""
+        with self._lock:
+            instante, resultado = self._bd
+            if resultado is not None and time.monotonic() - instante < SALUD_CACHE_BD_SEGUNDOS:
+                return resultado
+            escritura = medir_escritura_bd()
+            resultado = {
+                'ok': verificar_base_datos() and escritura is not None,
+                'escritura_ms': round(escritura * 1000, 2) if escritura is not None else None,
+            }
+            self._bd = (time.monotonic(), resultado)
+        return resultado
+
+    def _dispatcher(self) -> Dict[str, Any]:
+        try:
+            cola = self.profundidad_cola()
+        except (NotImplementedError, OSError):
+            # multiprocessing.Queue.qsize no está disponible en todas las plataformas
+            cola = None
+        ultimo = self.ultimo_update()
+        sin_procesar = time.monotonic() - ultimo if ultimo is not None else None
+        return {
+            'cola': cola,
+            'desde_ultimo_update_s': round(sin_procesar, 1) if sin_procesar is not None else None,
+        }
+
+    def vivo(self) -> Tuple[int, Dict[str, Any]]:
+        """Vivo salvo que haya updates en cola y ninguno se haya procesado en SALUD_MAX_SIN_PROCESAR."""
+        dispatcher = self._dispatcher()
+        # Sin ningún update procesado aún, el plazo cuenta desde el arranque
+        referencia = dispatcher['desde_ultimo_update_s']
+        if referencia is None:
+            referencia = time.monotonic() - self.inicio
+        bloqueado = bool(dispatcher['cola']) and referencia > SALUD_MAX_SIN_PROCESAR
+        cuerpo = {
+            'estado': 'bloqueado' if bloqueado else 'ok',
+            'pid': os.getpid(),
+            'activo_s': round(time.monotonic() - self.inicio, 1),
+            'dispatcher': dispatcher,
+        }
+        return (503 if bloqueado else 200), cuerpo
+
+    def listo(self) -> Tuple[int, Dict[str, Any]]:
+        """Listo cuando ha terminado el arranque, la base de datos admite escrituras y hay banco cargado."""
+        bd = dict(self.comprobar_bd())
+        bd['hace_s'] = round(time.monotonic() - self._bd[0], 1)
+        banco = estado_banco()
+        arrancado = arranque.listo.is_set()
+        listo = arrancado and bd['ok'] and banco['cargado'] and banco['preguntas'] > 0
+        cuerpo = {
+            'estado': 'listo' if listo else 'no_listo',
+            'arranque_s': round(arranque.segundos, 2) if arranque.segundos is not None else None,
+            'bd': bd,
+            'banco': banco,
+            'dispatcher': self._dispatcher(),
+        }
+        return (200 if listo else 503), cuerpo
+
+
+def _respuesta_json(comprobacion: Callable[[], Tuple[int, Dict[str, Any]]]) -> Callable[[], Tuple[int, str, str]]:
+    def ruta() -> Tuple[int, str, str]:
+        codigo, cuerpo = comprobacion()
+        return codigo, "application/json; charset=utf-8", json.dumps(cuerpo, ensure_ascii=False) + "\n"
+    return ruta
+
+
+salud = Salud()
+RUTAS["/salud"] = _respuesta_json(salud.vivo)
+RUTAS["/listo"] = _respuesta_json(salud.listo)
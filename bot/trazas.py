@@ -0,0 +1,167 @@
+# app/trazas.py
+
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import TRAZAS_ARCHIVO, TRAZAS_MUESTREO, TRAZAS_UMBRAL_LENTO, TRAZAS_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Traza del update que atiende cada hilo: lista de tramos (nombre, categoría, inicio, duración, args)
+_hilo = threading.local()
+
+Tramo = Tuple[str, str, float, float, Optional[Dict[str, Any]]]
+
+# perf_counter no tiene origen fijo: se ancla al reloj de pared para alinear procesos distintos
+_ORIGEN_PERF = time.perf_counter()
+_ORIGEN_US = time.time() * 1_000_000
+
+
+def iniciar_traza() -> None:
+    """Empieza a recoger los tramos del update que atiende este hilo."""
+    _hilo.traza = []
+    _hilo.inicio = time.perf_counter()
+
+
+def registrar_tramo(nombre: str, categoria: str, inicio: float, duracion: float,
+                    args: Optional[Dict[str, Any]] = None) -> None:
+    """Añade un tramo ya medido a la traza en curso (no hace nada fuera de un update)."""
+    traza = getattr(_hilo, 'traza', None)
+    if traza is not None:
+        traza.append((nombre, categoria, inicio, duracion, args))
+
+
+def trazar(categoria: str) -> Callable:
+    """Decorador que registra cada llamada a la función como un tramo de *categoria*."""
+    def decorador(funcion: Callable) -> Callable:
+        nombre = funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            traza = getattr(_hilo, 'traza', None)
+            if traza is None:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                traza.append((nombre, categoria, inicio, time.perf_counter() - inicio, None))
+
+        return envoltura
+    return decorador
+
+
+def finalizar_traza(nombre: str, args: Dict[str, Any]) -> None:
+    """
+    Cierra la traza del update y decide si se conserva.
+
+    Las trazas que superan TRAZAS_UMBRAL_LENTO se guardan siempre; el resto,
+    con probabilidad TRAZAS_MUESTREO.
+
+    Args:
+        nombre (str): Nombre del tramo raíz (tipo de update y handler).
+        args (Dict[str, Any]): Atributos del tramo raíz (update_id, user_id...).
+    """
+    traza = getattr(_hilo, 'traza', None)
+    if traza is None:
+        return
+    _hilo.traza = None
+    inicio = _hilo.inicio
+    duracion = time.perf_counter() - inicio
+    if duracion < TRAZAS_UMBRAL_LENTO and random.random() >= TRAZAS_MUESTREO:
+        return
+    args['lenta'] = duracion >= TRAZAS_UMBRAL_LENTO
+    traza.insert(0, (nombre, 'update', inicio, duracion, args))
+    escritor.guardar(traza, threading.get_ident())
+
+
+def _evento(tramo: Tramo, pid: int, tid: int) -> Dict[str, Any]:
+    nombre, categoria, inicio, duracion, args = tramo
+    evento = {
+        'name': nombre, 'cat': categoria, 'ph': 'X', 'pid': pid, 'tid': tid,
+        'ts': round(_ORIGEN_US + (inicio - _ORIGEN_PERF) * 1_000_000, 1),
+        'dur': round(duracion * 1_000_000, 1),
+    }
+    if args:
+        evento['args'] = args
+    return evento
+
+
+class EscritorTrazas:
+    """
+    Escribe las trazas conservadas en formato Trace Event de Chrome desde un hilo de fondo.
+
+    El archivo es un array JSON sin cerrar (admitido por chrome://tracing y Perfetto),
+    así que cada traza se añade al final sin reescribir nada. Al superar
+    TRAZAS_MAX_BYTES se rota a `<archivo>.1`.
+    """
+
+    def __init__(self, ruta: str = TRAZAS_ARCHIVO):
+        self.ruta = ruta
+        self._cola: "queue.SimpleQueue[Optional[Tuple[List[Tramo], int, int]]]" = queue.SimpleQueue()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def reiniciar(self, ruta: str) -> None:
+        """En un proceso hijo recién creado: archivo propio y cola nueva (la del padre no es fiable tras el fork)."""
+        self.ruta = ruta
+        self._cola = queue.SimpleQueue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def guardar(self, traza: List[Tramo], tid: int) -> None:
+        # Se arranca con la primera traza (y de nuevo en un hijo tras un fork)
+        if self._hilo is None or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or not self._hilo.is_alive():
+                    self._hilo = threading.Thread(target=self._bucle, name="trazas", daemon=True)
+                    self._hilo.start()
+        self._cola.put((traza, os.getpid(), tid))
+
+    def _abrir(self):
+        if os.path.exists(self.ruta) and os.path.getsize(self.ruta) >= TRAZAS_MAX_BYTES:
+            os.replace(self.ruta, f"{self.ruta}.1")
+        nuevo = not os.path.exists(self.ruta) or os.path.getsize(self.ruta) == 0
+        archivo = open(self.ruta, 'a', encoding='utf-8')
+        if nuevo:
+            archivo.write('[\n')
+        return archivo
+
+    def _bucle(self) -> None:
+        try:
+            archivo = self._abrir()
+        except OSError as e:
+            logger.error(f"No se pudo abrir el archivo de trazas {self.ruta}: {e}")
+            return
+        while True:
+            elemento = self._cola.get()
+            if elemento is None:
+                break
+            traza, pid, tid = elemento
+            try:
+                for tramo in traza:
+                    archivo.write(json.dumps(_evento(tramo, pid, tid), ensure_ascii=False, default=str) + ',\n')
+                archivo.flush()
+                if archivo.tell() >= TRAZAS_MAX_BYTES:
+                    archivo.close()
+                    archivo = self._abrir()
+            except OSError as e:
+                logger.error(f"Error escribiendo trazas: {e}")
+        archivo.close()
+
+    def detener(self) -> None:
+        if self._hilo is not None and self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join(timeout=5)
+
+
+escritor = EscritorTrazas()
+atexit.register(escritor.detener)
@@ -1,44 +1,254 @@
 # app/utils.py
 
+import functools
+import inspect
 import json
 import logging
 import random
 import sqlite3
 import os
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Union, Any, Tuple
+from typing import Callable, Dict, List, Optional, Union, Any, Tuple
 
 from config import (
-    PREGUNTAS_JSON, ASIGNATURAS, DATA_DIR, DB_PATH, 
-    TABLA_RESULTADOS, TABLA_USUARIOS
+    PREGUNTAS_JSON, BANCO_SQLITE, ASIGNATURAS, DATA_DIR, DB_PATH, 
+    TABLA_RESULTADOS, TABLA_USUARIOS, TABLA_ANUNCIOS, TABLA_ANUNCIOS_ENVIOS, TABLA_SALUD
 )
+from metricas import cronometrar_bd, CARGA_BANCO, TAMANO_BANCO, RECARGAS_BANCO
+from consultas import conectar
+from banco_sqlite import banco_sqlite
+from escrituras import ClienteEscritor
+from trazas import trazar
 
-# Configuración de logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
+# Banco de preguntas en memoria; se vuelve a leer solo si el archivo cambia en disco.
+# 'version' es la que publica el extractor dentro del JSON (None en bancos escritos a mano).
+# 'indices' guarda (lista de la que se calcularon, preguntas por asignatura, asignaturas, conteo)
+_cache_preguntas: Dict[str, Any] = {'firma': None, 'version': None, 'preguntas': [], 'indices': None}
+
+# Con la recarga en segundo plano activa (recarga.py), cargar_preguntas no consulta el disco
+_recarga_en_segundo_plano = False
+
+# Si se configura, todas las escrituras se delegan en un único proceso escritor
+_escritor: Optional[ClienteEscritor] = None
+
+# Funciones marcadas con @escritura, por nombre: las que ejecuta el proceso escritor
+ESCRITURAS: Dict[str, Callable[..., Any]] = {}
+
+def configurar_escritor(escritor: Optional[ClienteEscritor]) -> None:
+    """
+    Hace que las funciones marcadas con @escritura se ejecuten en el proceso escritor.
+    
+    Args:
+        escritor (ClienteEscritor, optional): Cliente de la cola del escritor, o None para escribir directamente.
+    """
+    global _escritor
+    _escritor = escritor
+
+def escritura(esperar: bool = False) -> Callable[[Callable], Callable]:
+    """
+    Decorador de las funciones que escriben en la base de datos.
+    
+    Sin escritor configurado la función se ejecuta tal cual. Con él se encola para
+    el proceso escritor: sin *esperar* se vuelve enseguida (los errores los registra
+    el escritor); con *esperar* se devuelve su resultado o se lanza su excepción.
+    """
+    def decorador(funcion: Callable) -> Callable:
+        nombre = funcion.__name__
+        firma = inspect.signature(funcion)
+        ESCRITURAS[nombre] = funcion
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if _escritor is None:
+                return funcion(*args, **kwargs)
+            argumentos = firma.bind(*args, **kwargs).args
+            if esperar:
+                return _escritor.ejecutar(nombre, argumentos)
+            _escritor.encolar(nombre, argumentos)
+
+        return envoltura
+    return decorador
+
+def _ver_escrituras_propias() -> None:
+    """Antes de una lectura: espera a que el escritor haya hecho lo que este proceso le encargó."""
+    if _escritor is None:
+        return
+    try:
+        _escritor.sincronizar()
+    except Exception as e:
+        logger.error(f"El proceso escritor no ha confirmado las escrituras pendientes: {e}")
+
+def profundidad_cola_escrituras() -> Optional[int]:
+    """
+    Escrituras pendientes en la cola del proceso escritor.
+    
+    Returns:
+        Optional[int]: Elementos en cola, o None si las escrituras son directas (o la plataforma no lo permite).
+    """
+    if _escritor is None:
+        return None
+    try:
+        return _escritor.profundidad()
+    except NotImplementedError:
+        return None
+
+def _leer_banco() -> Tuple[Tuple[int, int], Optional[int], List[Dict[str, Any]]]:
+    """
+    Lee y analiza el archivo de preguntas.
+    
+    La firma (mtime, tamaño) se toma del archivo abierto: si el extractor lo sustituye
+    mientras tanto, la firma corresponde a lo leído y la siguiente comprobación lo detecta.
+    
+    Returns:
+        Tuple: (firma, versión publicada o None, preguntas).
+    """
+    inicio = time.perf_counter()
+    with open(PREGUNTAS_JSON, 'r', encoding='utf-8') as file:
+        estado = os.fstat(file.fileno())
+        data = json.load(file)
+    CARGA_BANCO.set(time.perf_counter() - inicio)
+    return (estado.st_mtime_ns, estado.st_size), data.get("version"), data.get("preguntas", [])
+
+@trazar('banco')
 def cargar_preguntas() -> List[Dict[str, Any]]:
     """
     Carga las preguntas desde el archivo JSON.
     
+    El resultado se cachea mientras el archivo no cambie (mismo mtime y tamaño),
+    así que la lista devuelta es compartida y no debe modificarse. Con la recarga
+    en segundo plano activa se devuelve siempre la lista en memoria y los cambios
+    los aplica recargar_banco desde su hilo.
+    
     Returns:
         List[Dict[str, Any]]: Lista de preguntas con toda su información.
     """
     try:
-        with open(PREGUNTAS_JSON, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            return data.get("preguntas", [])
+        if _recarga_en_segundo_plano and _cache_preguntas['firma'] is not None:
+            return _cache_preguntas['preguntas']
+        estado = os.stat(PREGUNTAS_JSON)
+        firma = (estado.st_mtime_ns, estado.st_size)
+        if firma != _cache_preguntas['firma']:
+            firma, version, preguntas = _leer_banco()
+            _cache_preguntas['preguntas'] = preguntas
+            _cache_preguntas['version'] = version
+            _cache_preguntas['firma'] = firma
+            TAMANO_BANCO.set(len(preguntas))
+        return _cache_preguntas['preguntas']
     except Exception as e:
         logger.error(f"Error al cargar el archivo de preguntas: {e}")
         return []
 
+def _calcular_indices(preguntas: List[Dict[str, Any]]) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, str], Dict[str, int]]:
+    """Preguntas por asignatura, asignaturas disponibles y conteo, en una sola pasada."""
+    por_asignatura: Dict[str, List[Dict[str, Any]]] = {}
+    asignaturas: Dict[str, str] = {}
+    for pregunta in preguntas:
+        codigo = pregunta.get("asignatura")
+        if codigo:
+            if codigo not in por_asignatura:
+                por_asignatura[codigo] = []
+                asignaturas[codigo] = ASIGNATURAS.get(codigo, codigo)
+            por_asignatura[codigo].append(pregunta)
+    conteo = {codigo: len(lista) for codigo, lista in por_asignatura.items()}
+    conteo["global"] = len(preguntas)
+    return por_asignatura, asignaturas, conteo
+
+def _indices_banco(preguntas: List[Dict[str, Any]]) -> Optional[Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, str], Dict[str, int]]]:
+    """
+    Índices del banco cacheado: preguntas por asignatura, asignaturas disponibles y conteo.
+
+    Se calculan en una sola pasada la primera vez que se piden para la lista cargada
+    y se reutilizan hasta que el banco cambie. Devuelve None si *preguntas* no es la
+    lista cacheada (p. ej. una lista ya filtrada).
+    """
+    indices = _cache_preguntas['indices']
+    if indices is not None and indices[0] is preguntas:
+        return indices[1:]
+    if preguntas is not _cache_preguntas['preguntas']:
+        return None
+
+    por_asignatura, asignaturas, conteo = _calcular_indices(preguntas)
+    # Una sola asignación: otro hilo nunca ve índices a medio construir
+    _cache_preguntas['indices'] = (preguntas, por_asignatura, asignaturas, conteo)
+    return por_asignatura, asignaturas, conteo
+
+def recargar_banco() -> bool:
+    """
+    Sustituye el banco en memoria si el archivo ha cambiado en disco.
+    
+    La lectura, el análisis y los índices se preparan aparte y el banco nuevo se
+    publica con unas pocas asignaciones, así que los handlers nunca esperan a la
+    carga: un test ya empezado conserva sus preguntas y los siguientes usan el banco
+    nuevo. Si el archivo no se puede leer se mantiene el banco actual.
+    
+    Returns:
+        bool: True si se ha cargado un banco nuevo.
+    """
+    try:
+        estado = os.stat(PREGUNTAS_JSON)
+        if (estado.st_mtime_ns, estado.st_size) == _cache_preguntas['firma']:
+            return False
+        firma, version, preguntas = _leer_banco()
+    except (OSError, ValueError) as e:
+        logger.error(f"No se pudo recargar el banco de preguntas ({e}); se mantiene el actual")
+        RECARGAS_BANCO.inc(resultado="error")
+        return False
+
+    por_asignatura, asignaturas, conteo = _calcular_indices(preguntas)
+    # Índices antes que la lista: quien aún tenga la lista anterior filtra sin índice
+    _cache_preguntas['indices'] = (preguntas, por_asignatura, asignaturas, conteo)
+    _cache_preguntas['preguntas'] = preguntas
+    _cache_preguntas['version'] = version
+    _cache_preguntas['firma'] = firma
+    TAMANO_BANCO.set(len(preguntas))
+    RECARGAS_BANCO.inc(resultado="ok")
+    return True
+
+def activar_recarga_en_segundo_plano() -> None:
+    """A partir de aquí cargar_preguntas no comprueba el disco: los cambios llegan por recargar_banco."""
+    global _recarga_en_segundo_plano
+    _recarga_en_segundo_plano = True
+
+def cargar_banco() -> int:
+    """
+    Carga el banco al arrancar: el JSON en memoria o, con BANCO_SQLITE, abre la base y cuenta sus preguntas.
+    
+    Returns:
+        int: Número de preguntas del banco.
+    """
+    if BANCO_SQLITE:
+        try:
+            return banco_sqlite.conteo()["global"]
+        except Exception as e:
+            logger.error(f"Error al abrir el banco SQLite: {e}")
+            return 0
+    return len(cargar_preguntas())
+
+def precalentar_banco() -> int:
+    """
+    Carga el banco y construye sus índices para que el primer usuario no pague ese coste.
+    
+    Con BANCO_SQLITE no hay nada que precalentar: los índices son los de la base.
+    
+    Returns:
+        int: Número de preguntas cargadas.
+    """
+    if BANCO_SQLITE:
+        return cargar_banco()
+    preguntas = cargar_preguntas()
+    _indices_banco(preguntas)
+    return len(preguntas)
+
+@trazar('banco')
 def filtrar_preguntas_por_asignatura(preguntas: List[Dict[str, Any]], codigo_asignatura: str) -> List[Dict[str, Any]]:
     """
     Filtra las preguntas por asignatura.
     
+    Con el banco cacheado se devuelve la lista del índice, compartida: no debe modificarse.
+    
     Args:
         preguntas (List[Dict[str, Any]]): Lista completa de preguntas.
         codigo_asignatura (str): Código de la asignatura (ej: "BDD", "EDD").
@@ -46,8 +256,12 @@ def filtrar_preguntas_por_asignatura(preguntas: List[Dict[str, Any]], codigo_asi
     Returns:
         List[Dict[str, Any]]: Lista de preguntas filtradas por asignatura.
     """
+    indices = _indices_banco(preguntas)
+    if indices is not None:
+        return indices[0].get(codigo_asignatura, [])
     return [p for p in preguntas if p.get("asignatura") == codigo_asignatura]
 
+@trazar('banco')
 def seleccionar_preguntas_aleatorias(preguntas: List[Dict[str, Any]], cantidad: int) -> List[Dict[str, Any]]:
     """
     Selecciona un número determinado de preguntas aleatorias.
@@ -82,6 +296,7 @@ def verificar_respuesta(pregunta: Dict[str, Any], respuesta_usuario: str) -> boo
     respuesta_correcta = pregunta.get("respuesta_correcta", "")
     return respuesta_usuario == respuesta_correcta
 
+@trazar('banco')
 def obtener_todas_asignaturas(preguntas: List[Dict[str, Any]]) -> Dict[str, str]:
     """
     Obtiene todas las asignaturas disponibles en las preguntas.
@@ -92,6 +307,10 @@ def obtener_todas_asignaturas(preguntas: List[Dict[str, Any]]) -> Dict[str, str]
     Returns:
         Dict[str, str]: Diccionario con los códigos y nombres de las asignaturas.
     """
+    indices = _indices_banco(preguntas)
+    if indices is not None:
+        return dict(indices[1])
+
     asignaturas_disponibles = {}
     for pregunta in preguntas:
         codigo = pregunta.get("asignatura")
@@ -100,6 +319,74 @@ def obtener_todas_asignaturas(preguntas: List[Dict[str, Any]]) -> Dict[str, str]
     
     return asignaturas_disponibles
 
+def asignaturas_disponibles() -> Dict[str, str]:
+    """
+    Asignaturas con preguntas en el banco, del JSON en memoria o de la base SQLite.
+    
+    Returns:
+        Dict[str, str]: Diccionario con los códigos y nombres de las asignaturas.
+    """
+    if BANCO_SQLITE:
+        try:
+            return {codigo: ASIGNATURAS.get(codigo, codigo)
+                    for codigo in banco_sqlite.conteo() if codigo != "global"}
+        except Exception as e:
+            logger.error(f"Error al obtener las asignaturas: {e}")
+            return {}
+    return obtener_todas_asignaturas(cargar_preguntas())
+
+@trazar('banco')
+def preguntas_para_test(tipo_test: str, cantidad: int) -> List[Dict[str, Any]]:
+    """
+    Preguntas aleatorias para un test.
+    
+    Con BANCO_SQLITE la muestra se lee de la base por índice, sin cargar el banco;
+    si no, se filtra y se sortea sobre el banco en memoria.
+    
+    Args:
+        tipo_test (str): 'global' o código de asignatura.
+        cantidad (int): Preguntas a seleccionar (como mucho las disponibles).
+        
+    Returns:
+        List[Dict[str, Any]]: Preguntas seleccionadas.
+    """
+    if BANCO_SQLITE:
+        try:
+            return banco_sqlite.muestra(cantidad, None if tipo_test == "global" else tipo_test)
+        except Exception as e:
+            logger.error(f"Error al seleccionar preguntas del banco SQLite: {e}")
+            return []
+    preguntas = cargar_preguntas()
+    if tipo_test != "global":
+        preguntas = filtrar_preguntas_por_asignatura(preguntas, tipo_test)
+    logger.debug("Test %s: %d preguntas disponibles", tipo_test, len(preguntas))
+    return seleccionar_preguntas_aleatorias(preguntas, cantidad)
+
+@trazar('banco')
+def preguntas_por_id(ids: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Preguntas del banco con esos ids, en el mismo orden (para retomar un test guardado).
+    
+    Args:
+        ids (List[str]): Ids de las preguntas.
+        
+    Returns:
+        Optional[List[Dict[str, Any]]]: Las preguntas, o None si alguna ya no está en el banco.
+    """
+    if BANCO_SQLITE:
+        try:
+            preguntas = [banco_sqlite.pregunta(pregunta_id) for pregunta_id in ids]
+        except Exception as e:
+            logger.error(f"Error al buscar preguntas en el banco SQLite: {e}")
+            return None
+        return None if None in preguntas else preguntas
+    buscados = set(ids)
+    por_id = {p.get("id"): p for p in cargar_preguntas() if p.get("id") in buscados}
+    if len(por_id) < len(buscados):
+        return None
+    return [por_id[pregunta_id] for pregunta_id in ids]
+
+@cronometrar_bd
 def inicializar_base_datos() -> None:
     """
     Inicializa la base de datos si no existe.
@@ -110,12 +397,20 @@ def inicializar_base_datos() -> None:
         os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
         
         # Conectar a la base de datos
-        conn = sqlite3.connect(DB_PATH)
+        conn = conectar()
         cursor = conn.cursor()
         
         # Crear tablas si no existen
         cursor.execute(TABLA_RESULTADOS)
         cursor.execute(TABLA_USUARIOS)
+        cursor.execute(TABLA_ANUNCIOS)
+        cursor.execute(TABLA_ANUNCIOS_ENVIOS)
+        cursor.execute(TABLA_SALUD)
+
+        # Migración: columna 'bloqueado' en bases de datos anteriores
+        cursor.execute("PRAGMA table_info(usuarios)")
+        if 'bloqueado' not in [columna[1] for columna in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE usuarios ADD COLUMN bloqueado INTEGER NOT NULL DEFAULT 0")
         
         # Guardar cambios y cerrar conexión
         conn.commit()
@@ -125,6 +420,21 @@ def inicializar_base_datos() -> None:
     except Exception as e:
         logger.error(f"Error al inicializar la base de datos: {e}")
 
+@cronometrar_bd
+def activar_modo_wal() -> None:
+    """
+    Activa el modo WAL de SQLite para que las lecturas no esperen al proceso escritor.
+    El modo queda guardado en el propio archivo de la base de datos.
+    """
+    try:
+        conn = conectar()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+    except Exception as e:
+        logger.error(f"Error al activar el modo WAL: {e}")
+
+@escritura()
+@cronometrar_bd
 def registrar_usuario(user_id: int, nombre: str = None, apellido: str = None, nombre_usuario: str = None) -> None:
     """
     Registra o actualiza un usuario en la base de datos.
@@ -136,7 +446,7 @@ def registrar_usuario(user_id: int, nombre: str = None, apellido: str = None, no
         nombre_usuario (str, optional): Nombre de usuario en Telegram.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = conectar()
         cursor = conn.cursor()
         
         # Verificar si el usuario ya existe
@@ -148,8 +458,9 @@ def registrar_usuario(user_id: int, nombre: str = None, apellido: str = None, no
         
         if usuario_existente:
             # Actualizar información del usuario
+            # Si el usuario vuelve a escribir, ya no tiene el bot bloqueado
             cursor.execute(
-                "UPDATE usuarios SET ultimo_acceso = ?, nombre = COALESCE(?, nombre), "
+                "UPDATE usuarios SET ultimo_acceso = ?, bloqueado = 0, nombre = COALESCE(?, nombre), "
                 "apellido = COALESCE(?, apellido), nombre_usuario = COALESCE(?, nombre_usuario) "
                 "WHERE user_id = ?",
                 (ahora, nombre, apellido, nombre_usuario, user_id)
@@ -167,6 +478,8 @@ def registrar_usuario(user_id: int, nombre: str = None, apellido: str = None, no
     except Exception as e:
         logger.error(f"Error al registrar usuario: {e}")
 
+@escritura()
+@cronometrar_bd
 def guardar_resultado_test(user_id: int, user_name: str, tipo_test: str, correctas: int, total: int) -> None:
     """
     Guarda el resultado de un test en la base de datos.
@@ -179,7 +492,7 @@ def guardar_resultado_test(user_id: int, user_name: str, tipo_test: str, correct
         total (int): Total de preguntas en el test.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = conectar()
         cursor = conn.cursor()
         
         # Calcular el porcentaje de acierto
@@ -200,10 +513,11 @@ def guardar_resultado_test(user_id: int, user_name: str, tipo_test: str, correct
         conn.commit()
         conn.close()
         
-        logger.info(f"Resultado guardado: Usuario {user_id}, Test {tipo_test}, Resultado {correctas}/{total}")
+        logger.info("Resultado guardado: Usuario %s, Test %s, Resultado %s/%s", user_id, tipo_test, correctas, total)
     except Exception as e:
         logger.error(f"Error al guardar resultado: {e}")
 
+@cronometrar_bd
 def obtener_historial_usuario(user_id: int) -> List[Dict[str, Any]]:
     """
     Obtiene el historial de resultados de un usuario.
@@ -214,8 +528,10 @@ def obtener_historial_usuario(user_id: int) -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: Lista con los resultados de los tests.
     """
+    # Que aparezca el test que se acaba de guardar
+    _ver_escrituras_propias()
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = conectar()
         conn.row_factory = sqlite3.Row  # Para obtener resultados como diccionarios
         cursor = conn.cursor()
         
@@ -235,6 +551,7 @@ def obtener_historial_usuario(user_id: int) -> List[Dict[str, Any]]:
         logger.error(f"Error al obtener historial: {e}")
         return []
 
+@cronometrar_bd
 def obtener_estadisticas_usuario(user_id: int) -> Dict[str, Any]:
     """
     Obtiene estadísticas globales del usuario.
@@ -245,8 +562,9 @@ def obtener_estadisticas_usuario(user_id: int) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Diccionario con las estadísticas.
     """
+    _ver_escrituras_propias()
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = conectar()
         cursor = conn.cursor()
         
         # Obtener estadísticas globales
@@ -305,6 +623,7 @@ def obtener_estadisticas_usuario(user_id: int) -> Dict[str, Any]:
             'por_asignatura': {}
         }
 
+@trazar('banco')
 def contar_preguntas_por_asignatura() -> Dict[str, int]:
     """
     Cuenta el número de preguntas disponibles por asignatura.
@@ -313,21 +632,20 @@ def contar_preguntas_por_asignatura() -> Dict[str, int]:
         Dict[str, int]: Diccionario con el conteo por asignatura.
     """
     try:
+        if BANCO_SQLITE:
+            return banco_sqlite.conteo()
         preguntas = cargar_preguntas()
-        conteo = {}
-        
-        for pregunta in preguntas:
-            asignatura = pregunta.get("asignatura")
-            if asignatura:
-                conteo[asignatura] = conteo.get(asignatura, 0) + 1
-        
-        conteo["global"] = len(preguntas)  # Total global
-        
-        return conteo
+        # Calculado una vez por versión del banco (ver _indices_banco); None si una recarga
+        # acaba de sustituir el banco que se ha leído
+        indices = _indices_banco(preguntas)
+        if indices is not None:
+            return dict(indices[2])
+        return _calcular_indices(preguntas)[2]
     except Exception as e:
         logger.error(f"Error al contar preguntas: {e}")
         return {"global": 0}
 
+@cronometrar_bd
 def verificar_base_datos() -> bool:
     """
     Verifica que la base de datos existe y tiene las tablas necesarias.
@@ -336,7 +654,7 @@ def verificar_base_datos() -> bool:
         bool: True si la base de datos está correctamente configurada, False en caso contrario.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = conectar()
         cursor = conn.cursor()
         
         # Verificar existencia de tablas
@@ -351,4 +669,198 @@ def verificar_base_datos() -> bool:
         return todas_existen
     except Exception as e:
         logger.error(f"Error al verificar la base de datos: {e}")
-        return False
\ No newline at end of file
+        return False
+
+@escritura(esperar=True)
+def escribir_salud() -> None:
+    """Reescribe la fila de la tabla salud (con su commit)."""
+    conn = conectar(timeout=5)
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO salud (id, fecha) VALUES (1, ?)", (datetime.now().isoformat(),))
+    finally:
+        conn.close()
+
+def medir_escritura_bd() -> Optional[float]:
+    """
+    Mide cuánto tarda en hacerse la escritura de salud.
+    
+    Con proceso escritor es la ida y vuelta por su cola, así que también falla si
+    el escritor no responde.
+    
+    Returns:
+        Optional[float]: Segundos de la escritura, o None si ha fallado.
+    """
+    try:
+        inicio = time.perf_counter()
+        escribir_salud()
+        return time.perf_counter() - inicio
+    except Exception as e:
+        logger.error(f"Error al medir la escritura en la base de datos: {e}")
+        return None
+
+def estado_banco() -> Dict[str, Any]:
+    """
+    Estado del banco de preguntas en memoria, sin cargarlo.
+    
+    Returns:
+        Dict[str, Any]: cargado, número de preguntas, versión (la publicada por el
+        extractor o, si no la hay, mtime y tamaño del archivo cargado) y si coincide
+        con el archivo actual en disco.
+    """
+    if BANCO_SQLITE:
+        # La base se consulta en disco: siempre está al día
+        try:
+            return {'cargado': True, 'preguntas': banco_sqlite.conteo()["global"],
+                    'version': banco_sqlite.version(), 'al_dia': True}
+        except Exception as e:
+            logger.error(f"Error al consultar el banco SQLite: {e}")
+            return {'cargado': False, 'preguntas': 0, 'version': None, 'al_dia': False}
+    firma = _cache_preguntas['firma']
+    try:
+        estado = os.stat(PREGUNTAS_JSON)
+        en_disco = (estado.st_mtime_ns, estado.st_size)
+    except OSError:
+        en_disco = None
+    return {
+        'cargado': firma is not None,
+        'preguntas': len(_cache_preguntas['preguntas']),
+        'version': (_cache_preguntas['version'] if _cache_preguntas['version'] is not None
+                    else f"{firma[0]}-{firma[1]}" if firma else None),
+        'al_dia': firma is not None and firma == en_disco,
+    }
+
+@escritura(esperar=True)
+@cronometrar_bd
+def crear_anuncio(texto: str, autor_id: int) -> Optional[int]:
+    """
+    Registra un nuevo anuncio pendiente de difusión.
+    
+    Args:
+        texto (str): Texto del anuncio.
+        autor_id (int): ID del administrador que lo envía.
+        
+    Returns:
+        Optional[int]: ID del anuncio creado o None si hubo un error.
+    """
+    try:
+        conn = conectar()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO anuncios (texto, autor_id) VALUES (?, ?)",
+            (texto, autor_id)
+        )
+        anuncio_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return anuncio_id
+    except Exception as e:
+        logger.error(f"Error al crear anuncio: {e}")
+        return None
+
+@cronometrar_bd
+def obtener_anuncios_en_curso() -> List[Dict[str, Any]]:
+    """
+    Obtiene los anuncios cuya difusión no ha terminado (p. ej. por un reinicio).
+    
+    Returns:
+        List[Dict[str, Any]]: Lista de anuncios con id, texto y autor_id.
+    """
+    try:
+        conn = conectar()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, texto, autor_id FROM anuncios WHERE estado = 'en_curso' ORDER BY id")
+        anuncios = [dict(anuncio) for anuncio in cursor.fetchall()]
+        conn.close()
+        return anuncios
+    except Exception as e:
+        logger.error(f"Error al obtener anuncios en curso: {e}")
+        return []
+
+@cronometrar_bd
+def obtener_destinatarios_pendientes(anuncio_id: int, desde_user_id: int, limite: int) -> List[int]:
+    """
+    Obtiene el siguiente lote de usuarios que aún no han recibido un anuncio.
+    
+    La paginación es por user_id (no por OFFSET), así que cada consulta usa la
+    clave primaria y no recorre los usuarios ya procesados. Los errores de la base
+    de datos se propagan: una lista vacía significa que no quedan destinatarios.
+    
+    Args:
+        anuncio_id (int): ID del anuncio.
+        desde_user_id (int): Último user_id procesado del lote anterior.
+        limite (int): Tamaño máximo del lote.
+        
+    Returns:
+        List[int]: IDs de usuario ordenados de forma ascendente.
+    """
+    _ver_escrituras_propias()
+    conn = conectar()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT u.user_id FROM usuarios u "
+            "LEFT JOIN anuncios_envios e ON e.anuncio_id = ? AND e.user_id = u.user_id "
+            "WHERE u.user_id > ? AND u.bloqueado = 0 AND e.user_id IS NULL "
+            "ORDER BY u.user_id LIMIT ?",
+            (anuncio_id, desde_user_id, limite)
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+    finally:
+        conn.close()
+
+@escritura(esperar=True)
+@cronometrar_bd
+def registrar_envios_anuncio(anuncio_id: int, envios: List[Tuple[int, str]]) -> None:
+    """
+    Guarda el estado de entrega de un lote de envíos y marca a los usuarios que han bloqueado el bot.
+    
+    Los errores de la base de datos se propagan para que la difusión no dé el lote por guardado.
+    
+    Args:
+        anuncio_id (int): ID del anuncio.
+        envios (List[Tuple[int, str]]): Pares (user_id, estado) con estado 'enviado', 'bloqueado' o 'error'.
+    """
+    conn = conectar()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO anuncios_envios (anuncio_id, user_id, estado) VALUES (?, ?, ?)",
+            [(anuncio_id, user_id, estado) for user_id, estado in envios]
+        )
+        cursor.executemany(
+            "UPDATE usuarios SET bloqueado = 1 WHERE user_id = ?",
+            [(user_id,) for user_id, estado in envios if estado == 'bloqueado']
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+@escritura(esperar=True)
+@cronometrar_bd
+def finalizar_anuncio(anuncio_id: int) -> Dict[str, int]:
+    """
+    Marca un anuncio como completado y devuelve el resumen de entregas.
+    
+    Los errores de la base de datos se propagan: el anuncio sigue 'en_curso' y se reanudará.
+    
+    Args:
+        anuncio_id (int): ID del anuncio.
+        
+    Returns:
+        Dict[str, int]: Número de envíos por estado.
+    """
+    conn = conectar()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE anuncios SET estado = 'completado' WHERE id = ?", (anuncio_id,))
+        cursor.execute(
+            "SELECT estado, COUNT(*) FROM anuncios_envios WHERE anuncio_id = ? GROUP BY estado",
+            (anuncio_id,)
+        )
+        resumen = {estado: total for estado, total in cursor.fetchall()}
+        conn.commit()
+        return resumen
+    finally:
+        conn.close()
@@ -8,6 +8,10 @@ Reexporta las clases y helpers principales para importar fácilmente:
 
 from .docx_parser import parse_docx
 from .json_builder import JsonBuilder
+from .manifest import Manifest
+from .report import ExtractionReport
+from .sqlite_store import SqliteStore
+from .watcher import DocxWatcher
 from .utils import (
     get_docx_files,
     ensure_directory_exists,
@@ -17,6 +21,10 @@ from .utils import (
 __all__ = [
     'parse_docx',
     'JsonBuilder',
+    'Manifest',
+    'ExtractionReport',
+    'SqliteStore',
+    'DocxWatcher',
     'get_docx_files',
     'ensure_directory_exists',
     'clean_text',
@@ -22,18 +22,19 @@ Parser de archivos DOCX con preguntas tipo test.
         ]
     }
 
-No genera ID: eso lo hace `JsonBuilder`.
+No genera ID: eso lo hace `JsonBuilder`. Con *stats* se rellenan además las
+cifras de calidad del documento (líneas leídas e ignoradas, preguntas
+encontradas y descartadas por motivo) para el informe del extractor.
 """
 from __future__ import annotations
 
+import itertools
 import re
 import logging
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional
 
-from docx import Document  # python-docx
-
-from .utils import clean_text
+from .docx_reader import iter_paragraphs
 
 LOGGER = logging.getLogger("docx_parser")
 if not LOGGER.handlers:
@@ -57,134 +58,160 @@ RE_RESPUESTA   = re.compile(r"^RESPUESTA\s+CORRECTA\s*[:.]\s*(?:(?:Opción\s+\d+
 RE_REFERENCIA  = re.compile(r"^REFERENCIA\s*[:.]\s*(.+)$", re.I)
 RE_EXPLICACION = re.compile(r"^EXPLICACI[ÓO]N\s*[:.]\s*(.+)$", re.I)
 
+# Clasificador de una sola pasada: cada alternativa es un tipo de línea y van en el
+# mismo orden en que se probaban las expresiones anteriores, así que gana la misma.
+# `m.lastgroup` dice qué tipo ha casado.
+RE_LINEA = re.compile(
+    r"(?P<pregunta>PREGUNTA\s+\d+\s*[.:]\s*(?P<enunciado>.+)$)"
+    rf"|(?P<opcion>(?:{PAT_CLASICO})|(?:{PAT_LISTA}))"
+    r"|(?P<respuesta>RESPUESTA\s+CORRECTA\s*[:.]\s*(?:(?:Opción\s+\d+\s*\()(?P<resp1>[A-D])\)|(?P<resp2>[A-D])))"
+    r"|(?P<referencia>REFERENCIA\s*[:.]\s*(?P<ref>.+)$)"
+    r"|(?P<explicacion>EXPLICACI[ÓO]N\s*[:.]\s*(?P<expl>.+)$)",
+    re.I,
+)
+RE_RESPUESTA_PARENTESIS = re.compile(r"\(([A-D])\)", re.I)
+RE_RESPUESTA_LISTA      = re.compile(r":\s*([A-D])\)", re.I)
+
 # --------------------------------------------------------------------------- #
 #  API pública                                                                 
 # --------------------------------------------------------------------------- #
 
-def parse_docx(file_path: str | Path) -> Dict[str, Any]:
-    """Devuelve la información estructurada del DOCX."""
+def parse_docx(file_path: str | Path,
+               reader: Callable[[str | Path], Iterable[str]] = iter_paragraphs,
+               stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Devuelve la información estructurada del DOCX.
+
+    *reader* da el texto de cada párrafo: por defecto el lector en streaming de
+    `docx_reader`; `iter_paragraphs_python_docx` permite comparar con python-docx.
+    Si se pasa *stats*, se rellena con `lines`, `ignored_lines`, `questions_found`,
+    `questions_kept` y `dropped` (preguntas descartadas por motivo).
+    """
 
     file_path = Path(file_path)
     if not file_path.exists():
         raise FileNotFoundError(file_path)
 
-    doc = Document(str(file_path))
-
-    # Expandir cada párrafo en posibles sub-líneas por saltos blandos
-    lines: List[str] = []
-    for p in doc.paragraphs:
-        if not p.text.strip():
-            continue
-        for chunk in p.text.splitlines():
-            text = clean_text(chunk)
-            if text:
-                lines.append(text)
-
+    lines = _iter_lines(reader(file_path))
     asignatura = origen = ""
     preguntas: List[Dict[str, Any]] = []
-
-    idx = 0
-    total = len(lines)
+    first: str | None = None  # primera línea tras las cabeceras
+    header_lines = 0
 
     # ------------------- Cabeceras ------------------- #
-    while idx < total:
-        ln = lines[idx]
+    for ln in lines:
+        header_lines += 1
         if not asignatura and (m := RE_ASIGNATURA.match(ln)):
             asignatura = m.group(1).strip()
-            idx += 1
             continue
         if not origen and (m := RE_ORIGEN.match(ln)):
             origen = m.group(1).strip()
-            idx += 1
             continue
         if asignatura and origen:
+            first = ln
             break
-        idx += 1
 
     if not (asignatura and origen):
         raise ValueError(f"Faltan ASIGNATURA/ORIGEN en {file_path.name}")
 
     # ------------------- Preguntas ------------------- #
     current: Dict[str, Any] | None = None
-    while idx < total:
-        ln = lines[idx]
+    dropped: Dict[str, int] = {}
+    ignored = n_lines = 0
+    for n_lines, ln in enumerate(itertools.chain([first] if first is not None else [], lines), 1):
+        m = RE_LINEA.match(ln)
+        kind = m.lastgroup if m else None
 
         # Inicio de pregunta
-        if m := RE_PREGUNTA.match(ln):
-            if current:
-                _commit(current, preguntas)
+        if kind == "pregunta":
+            if current and (reason := _commit(current, preguntas)):
+                dropped[reason] = dropped.get(reason, 0) + 1
             current = {
-                "enunciado": m.group(1).strip(),
+                "enunciado": m.group("enunciado").strip(),
                 "opciones": [],
                 "respuesta_correcta": "",
                 "explicacion": "",
                 "referencia": "",
             }
-            idx += 1
-            continue
+        elif current is None:
+            ignored += 1  # antes de la primera pregunta solo cuenta su inicio
 
         # Opciones (ambos formatos)
-        if current and (m := RE_OPCION.match(ln)):
+        elif kind == "opcion":
             letra = (m.group("let1") or m.group("let2")).upper()
             texto  = (m.group("txt1") or m.group("txt2")).strip()
             current["opciones"].append({"letra": letra, "texto": texto})
-            idx += 1
-            continue
 
-        # Respuesta correcta - MODIFICADO para capturar ambos formatos
-        if current and (m := RE_RESPUESTA.match(ln)):
-            # Extraer la letra de respuesta del primer o segundo grupo capturado
-            current["respuesta_correcta"] = (m.group(1) or m.group(2)).upper()
-            idx += 1
-            continue
-        
-        # Si no se pudo extraer con la expresión regular pero la línea contiene "RESPUESTA CORRECTA"
-        if current and ln.startswith("RESPUESTA CORRECTA"):
-            # Método alternativo: buscar directamente la letra entre paréntesis
-            if match := re.search(r"\(([A-D])\)", ln, re.I):
-                current["respuesta_correcta"] = match.group(1).upper()
-            else:
-                # Alternativa para formato "A) texto"
-                if match := re.search(r":\s*([A-D])\)", ln, re.I):
-                    current["respuesta_correcta"] = match.group(1).upper()
-            idx += 1
-            continue
+        # Respuesta correcta: "B" u "Opción 2 (B)"
+        elif kind == "respuesta":
+            current["respuesta_correcta"] = (m.group("resp1") or m.group("resp2")).upper()
 
-        # Referencia
-        if current and (m := RE_REFERENCIA.match(ln)):
-            current["referencia"] = m.group(1).strip()
-            idx += 1
-            continue
+        elif kind == "referencia":
+            current["referencia"] = m.group("ref").strip()
 
-        # Explicación
-        if current and (m := RE_EXPLICACION.match(ln)):
-            current["explicacion"] = m.group(1).strip()
-            idx += 1
-            continue
+        elif kind == "explicacion":
+            current["explicacion"] = m.group("expl").strip()
+
+        # "RESPUESTA CORRECTA" sin el separador esperado: buscar la letra entre paréntesis o "A)"
+        elif ln.startswith("RESPUESTA CORRECTA"):
+            if match := RE_RESPUESTA_PARENTESIS.search(ln):
+                current["respuesta_correcta"] = match.group(1).upper()
+            elif match := RE_RESPUESTA_LISTA.search(ln):
+                current["respuesta_correcta"] = match.group(1).upper()
 
-        idx += 1  # nada reconocido → línea ignorada
+        # nada reconocido → línea ignorada
+        else:
+            ignored += 1
 
-    if current:
-        _commit(current, preguntas)
+    if current and (reason := _commit(current, preguntas)):
+        dropped[reason] = dropped.get(reason, 0) + 1
 
     LOGGER.info("%d preguntas extraídas de %s", len(preguntas), file_path.name)
+    if stats is not None:
+        stats.update(
+            # La primera línea tras las cabeceras se cuenta en las dos partes
+            lines=header_lines + n_lines - (first is not None),
+            ignored_lines=ignored,
+            questions_found=len(preguntas) + sum(dropped.values()),
+            questions_kept=len(preguntas),
+            dropped=dropped,
+        )
     return {"asignatura": asignatura, "origen": origen, "preguntas": preguntas}
 
 # --------------------------------------------------------------------------- #
 #  Helpers                                                                    #
 # --------------------------------------------------------------------------- #
 
-def _commit(q: Dict[str, Any], out: List[Dict[str, Any]]) -> None:
-    """Añade *q* a *out* si es coherente (3-5 opciones + respuesta válida)."""
+def _iter_lines(paragraphs: Iterable[str]) -> Iterator[str]:
+    """Líneas no vacías y normalizadas, partiendo cada párrafo por sus saltos blandos (Shift+Enter)."""
+    for text in paragraphs:
+        for chunk in text.splitlines():
+            # Lo mismo que clean_text: split() ya separa por tabuladores y retornos
+            line = " ".join(chunk.split())
+            if line:
+                yield line
+
+
+def _commit(q: Dict[str, Any], out: List[Dict[str, Any]]) -> Optional[str]:
+    """Añade *q* a *out* si es coherente (3-5 opciones + respuesta válida).
+
+    Devuelve el motivo del descarte ("options", "duplicate_letters", "no_answer" o
+    "answer_not_in_options"), o None.
+    """
     # MODIFICADO: Ahora acepta preguntas con 3-5 opciones
     if not (3 <= len(q["opciones"]) <= 5):
         LOGGER.warning("Pregunta omitida: %d opciones (se esperan 3-5)", len(q["opciones"]))
-        return
+        return "options"
     
     letras = {o["letra"] for o in q["opciones"]}
+    if len(letras) < len(q["opciones"]):
+        # Dos "B)" no se pueden distinguir al responder (ni guardar en SQLite, clave (pregunta, letra))
+        LOGGER.warning("Pregunta omitida: letras de opción repetidas (%s)", ", ".join(o["letra"] for o in q["opciones"]))
+        return "duplicate_letters"
+
     if q["respuesta_correcta"] not in letras:
         LOGGER.warning("Pregunta omitida: respuesta '%s' fuera de %s", q["respuesta_correcta"], sorted(letras))
-        return
+        return "answer_not_in_options" if q["respuesta_correcta"] else "no_answer"
     
     q["opciones"].sort(key=lambda o: o["letra"])
-    out.append(q)
\ No newline at end of file
+    out.append(q)
+    return None
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Lectura en streaming del texto de un DOCX.
+
+python-docx construye el árbol completo del documento (y un objeto por párrafo y
+por run) solo para que `parse_docx` lea `paragraph.text`. Aquí se lee la parte
+principal (`word/document.xml`) directamente del zip con `iterparse` de lxml (la
+misma biblioteca que usa python-docx, filtrando en C solo los `<w:p>`), se genera
+el texto de cada párrafo en cuanto se cierra su elemento y se descarta: la
+memoria no depende del tamaño del documento.
+
+El texto es el mismo que da python-docx 0.8 (`Document(...).paragraphs[i].text`):
+
+* solo los párrafos hijos directos de `<w:body>` (ni tablas ni controles de contenido),
+* de cada párrafo, los `<w:r>` hijos directos, y de cada run: `<w:t>` tal cual,
+  `<w:tab/>` → "\\t" y `<w:br/>` / `<w:cr/>` (saltos blandos, Shift+Enter) → "\\n".
+
+Si el paquete no tiene la estructura habitual (sin relación officeDocument, parte
+inexistente, espacio de nombres distinto del transicional...) se recurre a
+python-docx, así que el resultado nunca cambia respecto al lector anterior.
+"""
+from __future__ import annotations
+
+import logging
+import posixpath
+import zipfile
+from pathlib import Path
+from typing import Iterator, Union
+
+from lxml import etree
+
+LOGGER = logging.getLogger("docx_reader")
+if not LOGGER.handlers:
+    LOGGER.addHandler(logging.NullHandler())
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+REL_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+_W_DOCUMENT = f"{{{W_NS}}}document"
+_W_BODY = f"{{{W_NS}}}body"
+_W_P = f"{{{W_NS}}}p"
+_W_R = f"{{{W_NS}}}r"
+_W_T = f"{{{W_NS}}}t"
+_W_TAB = f"{{{W_NS}}}tab"
+_BREAKS = (f"{{{W_NS}}}br", f"{{{W_NS}}}cr")
+
+# Los DOCX vienen de fuera: sin entidades externas ni red, como python-docx
+_SAFE_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+
+class UnsupportedDocx(Exception):
+    """El paquete no tiene la forma que espera el lector en streaming."""
+
+
+def iter_paragraphs(file_path: Union[str, Path]) -> Iterator[str]:
+    """
+    Texto de cada párrafo del cuerpo, en orden, con python-docx como respaldo.
+
+    La decisión de usar el respaldo se toma antes de generar el primer párrafo,
+    así que nunca se mezclan los dos lectores en un mismo documento.
+    """
+    try:
+        stream = _open_stream(file_path)
+    except UnsupportedDocx as exc:
+        LOGGER.info("%s: lectura con python-docx (%s)", Path(file_path).name, exc)
+        return _iter_python_docx(file_path)
+    return stream
+
+
+def iter_paragraphs_python_docx(file_path: Union[str, Path]) -> Iterator[str]:
+    """Lector anterior: texto de `Document(file_path).paragraphs` (para comparar resultados)."""
+    return _iter_python_docx(file_path)
+
+
+# --------------------------------------------------------------------------- #
+#  Helpers                                                                    #
+# --------------------------------------------------------------------------- #
+
+def _iter_python_docx(file_path: Union[str, Path]) -> Iterator[str]:
+    from docx import Document  # python-docx, solo si hace falta
+
+    for p in Document(str(file_path)).paragraphs:
+        yield p.text
+
+
+def _main_part(zf: zipfile.ZipFile) -> str:
+    """Ruta dentro del zip de la parte principal, según _rels/.rels."""
+    try:
+        rels = etree.fromstring(zf.read("_rels/.rels"), _SAFE_PARSER)
+    except KeyError:
+        raise UnsupportedDocx("sin _rels/.rels")
+    for rel in rels.iter(f"{{{REL_NS}}}Relationship"):
+        if rel.get("Type") == REL_OFFICE_DOCUMENT and rel.get("TargetMode") != "External":
+            target = posixpath.normpath(rel.get("Target", "").lstrip("/"))
+            if target not in zf.NameToInfo:
+                raise UnsupportedDocx(f"falta la parte {target}")
+            return target
+    raise UnsupportedDocx("sin relación officeDocument")
+
+
+def _open_stream(file_path: Union[str, Path]) -> Iterator[str]:
+    """Abre el paquete y comprueba la raíz del documento; devuelve el generador de párrafos."""
+    try:
+        zf = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile as exc:
+        raise UnsupportedDocx(str(exc))
+    try:
+        part = _main_part(zf)
+        # Solo se lee el principio de la parte para ver la raíz
+        with zf.open(part) as fh:
+            _, root = next(etree.iterparse(fh, events=("start",), resolve_entities=False, no_network=True))
+            if root.tag != _W_DOCUMENT:
+                raise UnsupportedDocx(f"raíz inesperada {root.tag}")
+    except UnsupportedDocx:
+        zf.close()
+        raise
+    except Exception as exc:
+        zf.close()
+        raise UnsupportedDocx(f"{type(exc).__name__}: {exc}")
+    return _paragraphs(zf, part)
+
+
+def _paragraphs(zf: zipfile.ZipFile, part: str) -> Iterator[str]:
+    try:
+        with zf.open(part) as fh:
+            for _, p in etree.iterparse(fh, events=("end",), tag=_W_P, resolve_entities=False, no_network=True):
+                body = p.getparent()
+                # Los párrafos de tablas y controles de contenido no cuentan (como en python-docx)
+                if body.tag != _W_BODY:
+                    continue
+                yield _paragraph_text(p)
+                # Lo ya leído (este párrafo y las tablas anteriores) no se vuelve a necesitar
+                p.clear()
+                while p.getprevious() is not None:
+                    del body[0]
+    finally:
+        zf.close()
+
+
+def _paragraph_text(p) -> str:
+    parts = []
+    for run in p.iterchildren(_W_R):
+        for child in run:
+            tag = child.tag
+            if tag == _W_T:
+                if child.text:
+                    parts.append(child.text)
+            elif tag == _W_TAB:
+                parts.append("\t")
+            elif tag in _BREAKS:
+                parts.append("\n")
+    return "".join(parts)
@@ -4,11 +4,16 @@ Script principal para extraer preguntas de archivos DOCX y guardarlas en JSON.
 
 from __future__ import annotations
 
+import os
 import sys
+import signal
+import time
 import argparse
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # Ajustar imports relativos
 ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -16,7 +21,10 @@ sys.path.append(str(ROOT_DIR))
 
 from extractor.docx_parser import parse_docx
 from extractor.json_builder import JsonBuilder
+from extractor.manifest import Manifest
+from extractor.report import ExtractionReport
 from extractor.utils import get_docx_files, ensure_directory_exists
+from extractor.watcher import DocxWatcher
 
 # Configuración de logging
 LOG_DIR = Path("/opt/telegram-test-bot/data/logs")
@@ -41,47 +49,250 @@ def build_arg_parser() -> argparse.ArgumentParser:
                    help="Archivo JSON de salida")
     p.add_argument("-m", "--mode", choices=["add", "replace"], default="replace",
                    help="Modo de operación: añadir (add) o reemplazar (replace). Por defecto 'replace'.")
+    p.add_argument("-j", "--jobs", type=int, default=1,
+                   help="Procesos que analizan DOCX en paralelo (0 = uno por CPU). Por defecto 1.")
+    p.add_argument("--manifest", default=None,
+                   help="Manifiesto de la extracción incremental. Por defecto <salida>.manifest.json")
+    p.add_argument("--full", action="store_true",
+                   help="Ignorar el manifiesto y volver a analizar todos los DOCX")
+    p.add_argument("--sqlite", default=None,
+                   help="Publicar también el banco en esta base SQLite (consultas indexadas y búsqueda de texto)")
+    p.add_argument("--watch", action="store_true",
+                   help="Quedarse vigilando el directorio de entrada y re-extraer (incremental) al cambiar algún DOCX")
+    p.add_argument("--debounce", type=float, default=2.0,
+                   help="Segundos sin cambios que se esperan antes de re-extraer en --watch. Por defecto 2.")
+    p.add_argument("--poll", action="store_true",
+                   help="En --watch, sondear el directorio en vez de usar inotify (p. ej. en carpetas de red)")
+    p.add_argument("--poll-interval", type=float, default=5.0,
+                   help="Segundos entre sondeos sin inotify. Por defecto 5.")
+    p.add_argument("--report", default=None,
+                   help="Informe JSON de la ejecución con las cifras de calidad por archivo. Por defecto <salida>.report.json")
+    p.add_argument("--min-questions", type=int, default=None,
+                   help="Umbral: preguntas mínimas que debe aportar cada archivo procesado")
+    p.add_argument("--max-drop-ratio", type=float, default=None,
+                   help="Umbral: fracción máxima de preguntas descartadas por archivo (p. ej. 0.1)")
+    p.add_argument("--max-blank-ratio", type=float, default=None,
+                   help="Umbral: fracción máxima de respuestas que se quedan vacías por archivo")
+    p.add_argument("--max-parse-seconds", type=float, default=None,
+                   help="Umbral: segundos máximos de análisis por archivo")
+    p.add_argument("--fail-on-violations", action="store_true",
+                   help="Terminar con código 3 si algún archivo falla o incumple un umbral")
     return p
 
-def main() -> int:
-    args = build_arg_parser().parse_args()
-    logger.info("Iniciando extracción (modo=%s)", args.mode)
+def parse_file(file_path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """parse_docx con sus cifras de calidad y el tiempo de análisis (``parse_seconds``)."""
+    stats: Dict[str, Any] = {}
+    inicio = time.perf_counter()
+    result = parse_docx(file_path, stats=stats)
+    stats["parse_seconds"] = time.perf_counter() - inicio
+    return result, stats
 
-    in_dir = Path(args.input)
-    if not in_dir.exists():
-        logger.error("Directorio de entrada no encontrado: %s", in_dir)
-        return 1
+def parse_files(docx_files: List[str], jobs: int = 1) -> Iterator[Tuple[str, Optional[Tuple[Dict[str, Any], Dict[str, Any]]], Optional[Exception]]]:
+    """
+    Analiza *docx_files* y genera ``(ruta, (resultado, cifras), error)`` en el orden de la lista.
 
-    ensure_directory_exists(Path(args.output).parent)
+    Con *jobs* > 1 los archivos se reparten entre procesos y cada resultado se
+    entrega en cuanto han terminado todos los anteriores: el análisis no espera al
+    final del lote, pero quien consume (JsonBuilder, que numera los ids según lo
+    que ya hay en el JSON) los recibe en el mismo orden que en una ejecución
+    secuencial, así que ids y orden de salida no cambian con el número de procesos.
+    """
+    if jobs <= 1 or len(docx_files) <= 1:
+        for file_path in docx_files:
+            try:
+                yield file_path, parse_file(file_path), None
+            except Exception as exc:
+                yield file_path, None, exc
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(docx_files))) as pool:
+        futures = {pool.submit(parse_file, file_path): idx for idx, file_path in enumerate(docx_files)}
+        terminados = {}
+        siguiente = 0
+        for future in as_completed(futures):
+            terminados[futures[future]] = future
+            # Entregar el tramo contiguo que ya esté completo
+            while siguiente in terminados:
+                listo = terminados.pop(siguiente)
+                try:
+                    yield docx_files[siguiente], listo.result(), None
+                except Exception as exc:
+                    yield docx_files[siguiente], None, exc
+                siguiente += 1
+
+def run_extraction(args: argparse.Namespace, in_dir: Path, full: bool) -> List[Dict[str, Any]]:
+    """Una extracción completa (*full*) o incremental de *in_dir*, publicada al terminar.
+
+    Escribe el informe de la ejecución y devuelve sus violaciones de calidad.
+    """
+    logger.info("Iniciando extracción (modo=%s)", args.mode)
     docx_files = get_docx_files(str(in_dir))
-    if not docx_files:
-        logger.warning("No se encontraron archivos DOCX en %s", in_dir)
-        return 0
+    builder = JsonBuilder(args.output, sqlite_file=args.sqlite)
+    manifest = Manifest(args.manifest or Path(args.output).with_suffix(".manifest.json"), in_dir)
+    incremental = not full and manifest.load()
+
+    mode = args.mode
+    if incremental:
+        # El archivo es la unidad: sus preguntas anteriores se sustituyen por las nuevas
+        all_files = docx_files
+        unchanged, docx_files, deleted = manifest.diff(docx_files)
+        logger.info("Extracción incremental: %d sin cambios, %d nuevos o modificados, %d eliminados",
+                    len(unchanged), len(docx_files), len(deleted))
+    else:
+        if not docx_files:
+            logger.warning("No se encontraron archivos DOCX en %s", in_dir)
+            return []
+        unchanged, deleted = [], []
+        manifest.files = {}
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if jobs > 1 and len(docx_files) > 1:
+        logger.info("Analizando %d archivos con %d procesos", len(docx_files), jobs)
+    results = parse_files(docx_files, jobs)
+
+    if incremental and mode == "replace" and (docx_files or deleted):
+        # Como en --full, cada par afectado debe quedarse con las preguntas del último de sus
+        # archivos: se vuelven a procesar, en el orden de siempre, también los que no han cambiado
+        def pair(key: str) -> Optional[Tuple[str, str]]:
+            entry = manifest.files.get(key)
+            return (entry["asignatura"], entry["origen"]) if entry else None
+
+        results = list(results)
+        pairs = {pair(key) for key in deleted + [manifest.key(f) for f in docx_files]}
+        pairs.update((parsed[0]["asignatura"], parsed[0]["origen"]) for _, parsed, _ in results if parsed)
+        extra = [f for f in unchanged if pair(manifest.key(f)) in pairs]
+        if extra:
+            logger.info("Modo replace: %d archivos sin cambios de los pares afectados se vuelven a procesar",
+                        len(extra))
+            order = {f: idx for idx, f in enumerate(all_files)}
+            results = sorted(results + list(parse_files(extra, jobs)), key=lambda r: order[r[0]])
+            unchanged = [f for f in unchanged if f not in set(extra)]
+
+    report = ExtractionReport(incremental, min_questions=args.min_questions, max_drop_ratio=args.max_drop_ratio,
+                              max_blank_ratio=args.max_blank_ratio, max_parse_seconds=args.max_parse_seconds)
+    report.unchanged = len(unchanged)
 
-    builder = JsonBuilder(args.output)
     total_preguntas = 0
     archivos_con_preguntas = 0
 
-    for file_path in docx_files:
-        try:
-            logger.info("Procesando archivo: %s", file_path)
-            result = parse_docx(file_path)
-            asignatura, origen, preguntas = result["asignatura"], result["origen"], result["preguntas"]
+    # Todo el lote se aplica en memoria y el JSON se escribe una sola vez al final
+    with builder.batch():
+        for key in deleted:
+            builder.remove_questions(manifest.ids(key))
+            manifest.forget(key)
+            logger.info("Archivo eliminado: %s", key)
 
-            logger.info("  → %d preguntas extraídas para %s (%s)", len(preguntas), asignatura, origen)
-            if not preguntas:
-                continue
+        for file_path, parsed, error in results:
+            entry = report.file(manifest.key(file_path))
+            try:
+                logger.info("Procesando archivo: %s", file_path)
+                if error is not None:
+                    raise error
+                result, stats = parsed
+                entry.update(stats)
+                asignatura, origen, preguntas = result["asignatura"], result["origen"], result["preguntas"]
+                entry.update(asignatura=asignatura, origen=origen)
 
-            if builder.build_json(asignatura, origen, preguntas, args.mode):
-                archivos_con_preguntas += 1
-                total_preguntas += len(preguntas)
-            else:
-                logger.error("  ¡Error guardando preguntas para %s (%s)!", asignatura, origen)
+                logger.info("  → %d preguntas extraídas para %s (%s)", len(preguntas), asignatura, origen)
+                key = manifest.key(file_path)
+                inicio = time.perf_counter()
+                if incremental:
+                    builder.remove_questions(manifest.ids(key))
+                if not preguntas:
+                    entry["status"] = "no_questions"
+                    manifest.record(file_path, asignatura, origen, [])
+                    continue
 
-        except Exception as exc:
-            logger.exception("Error procesando %s: %s", file_path, exc)
+                ok = builder.build_json(asignatura, origen, preguntas, mode)
+                entry["build_seconds"] = time.perf_counter() - inicio
+                for reason, n in builder.last_stats.get("dropped", {}).items():
+                    entry["dropped"][reason] = entry["dropped"].get(reason, 0) + n
+                entry["answers_blanked"] = builder.last_stats.get("answers_blanked", 0)
+                entry["answers_remapped"] = builder.last_stats.get("answers_remapped", 0)
+                if ok:
+                    if mode == "replace":
+                        # Las preguntas de otros archivos del mismo par ya no están en el JSON
+                        manifest.clear_pair(asignatura, origen)
+                    archivos_con_preguntas += 1
+                    total_preguntas += len(preguntas)
+                    entry["questions_added"] = len(builder.last_ids)
+                    manifest.record(file_path, asignatura, origen, builder.last_ids)
+                else:
+                    entry["status"] = "build_failed"
+                    logger.error("  ¡Error guardando preguntas para %s (%s)!", asignatura, origen)
+                    # Sin entrada en el manifiesto se vuelve a intentar en la próxima ejecución
+                    manifest.forget(key)
+
+            except Exception as exc:
+                entry.update(status="error", error=f"{type(exc).__name__}: {exc}")
+                logger.exception("Error procesando %s: %s", file_path, exc)
+
+    manifest.save()
+    # Sin cambios en el JSON no se ha publicado nada: la base puede faltar o venir de otro banco
+    builder.sync_store()
+    if builder.store is not None:
+        report.store_result(builder.store.path, builder.store_error)
 
     logger.info("Proceso completado: %d preguntas de %d archivos", total_preguntas, archivos_con_preguntas)
+
+    violations = report.check()
+    report_path = args.report or Path(args.output).with_suffix(".report.json")
+    report.save(report_path)
+    for v in violations:
+        logger.warning("Calidad: %s incumple %s (%s; límite %s)", v["file"], v["check"], v["value"], v["limit"])
+    logger.info("Informe en %s: %d archivos, %d violaciones", report_path, len(report.files), len(violations))
+    return violations
+
+def watch(args: argparse.Namespace, in_dir: Path, watcher: DocxWatcher) -> None:
+    """
+    Re-extrae *in_dir* cada vez que cambian sus DOCX, hasta Ctrl+C o SIGTERM.
+
+    Tras el primer cambio se espera a que pasen ``--debounce`` segundos sin otro
+    (guardar un documento o copiar varios genera ráfagas de eventos), con un
+    máximo de 10 veces ese plazo para que una escritura continua no lo retrase
+    indefinidamente. Cada extracción es incremental: solo se analizan los
+    archivos que han cambiado y el banco se publica para los bots en marcha.
+    """
+    logger.info("Vigilando %s (%s, espera de %.1f s)", in_dir, watcher.backend, args.debounce)
+    try:
+        while True:
+            watcher.wait()
+            limit = time.monotonic() + 10 * args.debounce
+            while time.monotonic() < limit and watcher.wait(min(args.debounce, limit - time.monotonic())):
+                pass
+            logger.info("Cambios detectados en %s", in_dir)
+            try:
+                run_extraction(args, in_dir, full=False)
+            except Exception as exc:
+                # El daemon sigue: el siguiente cambio vuelve a intentarlo
+                logger.exception("Error en la extracción: %s", exc)
+    finally:
+        watcher.close()
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+def main() -> int:
+    args = build_arg_parser().parse_args()
+
+    in_dir = Path(args.input)
+    if not in_dir.exists():
+        logger.error("Directorio de entrada no encontrado: %s", in_dir)
+        return 1
+
+    ensure_directory_exists(Path(args.output).parent)
+    # La vigilancia empieza antes de la primera extracción: lo que cambie durante ella no se pierde
+    watcher = DocxWatcher(in_dir, poll=args.poll, poll_interval=args.poll_interval) if args.watch else None
+    violations = run_extraction(args, in_dir, full=args.full)
+    if watcher is None:
+        return 3 if args.fail_on_violations and violations else 0
+
+    # systemctl stop / docker stop envían SIGTERM: salir como con Ctrl+C
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        watch(args, in_dir, watcher)
+    except KeyboardInterrupt:
+        logger.info("Vigilancia detenida")
     return 0
 
 if __name__ == "__main__":
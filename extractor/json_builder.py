@@ -6,18 +6,24 @@ extraídas de los .docx.
 * Si la letra de la respuesta no casa con las letras de opciones,
   intenta mapearla buscando coincidencia de texto.
 * Permite explicación o referencia vacías (ya se completa luego si se desea).
+* Los ids son estables: una pregunta que se sustituye por otra con el mismo
+  contenido (enunciado y opciones) conserva su id, y un número ya usado no se
+  reasigna a otra pregunta ("ultimos_ids" guarda el máximo de cada prefijo).
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import re
+from contextlib import contextmanager
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
 
-from extractor.utils import ensure_directory_exists, clean_text
+from extractor.sqlite_store import SqliteStore
+from extractor.utils import ensure_directory_exists, clean_text, write_atomic
 
 LOG_DIR = Path("/opt/telegram-test-bot/data/logs")
 ensure_directory_exists(LOG_DIR)
@@ -35,12 +41,53 @@ if not any(isinstance(h, RotatingFileHandler) for h in logger.handlers):
 class JsonBuilder:
     """Mantiene (crear / actualizar) preguntas en un único archivo JSON."""
 
-    def __init__(self, output_file: str):
+    def __init__(self, output_file: str, sqlite_file: Optional[str] = None):
         self.output_file = Path(output_file)
+        self.version_file = self.output_file.with_suffix(".version")
+        # Copia opcional del banco en SQLite, publicada junto al JSON
+        self.store = SqliteStore(sqlite_file) if sqlite_file else None
+        # Error de la última publicación en SQLite, o None (para el informe del extractor)
+        self.store_error: Optional[str] = None
+        # ids creados por la última llamada a build_json (para el manifiesto)
+        self.last_ids: List[str] = []
+        # Cifras de la validación de la última llamada (para el informe del extractor)
+        self.last_stats: Dict[str, Any] = {}
+        # Banco en memoria mientras hay un lote abierto (ver batch())
+        self._batching = False
+        self._batch: Optional[Dict[str, Any]] = None
+        self._batch_dirty = False
+        # Índice de ids del banco cargado (ver _id_index): máximo por prefijo, ids en uso
+        # y preguntas por asignatura-origen
+        self._id_data: Optional[Dict[str, Any]] = None
+        self._id_max: Dict[str, int] = {}
+        self._id_set: Set[str] = set()
+        self._pairs: Dict[Tuple[str, str], int] = {}
+        # Ids de preguntas quitadas, por (prefijo, huella del contenido), para reutilizarlos
+        self._retired: Dict[Tuple[str, str], List[str]] = {}
 
     # ------------------------------------------------------------------
     #  API pública
     # ------------------------------------------------------------------
+    @contextmanager
+    def batch(self) -> Iterator["JsonBuilder"]:
+        """Agrupa varias llamadas a build_json/remove_questions en una sola escritura.
+
+        El JSON se lee (una vez) con el primer cambio, los cambios se aplican en
+        memoria y se ordena y guarda una sola vez al salir, solo si algo cambió. Si
+        el bloque termina con una excepción no se escribe nada.
+        """
+        if self._batching:
+            yield self
+            return
+        self._batching, self._batch, self._batch_dirty = True, None, False
+        try:
+            yield self
+            if self._batch_dirty:
+                self._batch["preguntas"].sort(key=lambda p: p["id"])
+                self._save(self._batch)
+        finally:
+            self._batching, self._batch = False, None
+
     def build_json(
         self,
         asignatura: str,
@@ -51,26 +98,71 @@ class JsonBuilder:
         """Valida y vuelca *preguntas* de una asignatura‑origen al JSON.
         *mode* = "replace" elimina las preguntas previas del mismo par.
         """
+        self.last_ids = []
+        self.last_stats = {"dropped": {}, "answers_blanked": 0, "answers_remapped": 0}
         try:
             valid = self._validate_questions(asignatura, origen, preguntas)
             if not valid:
                 return False
 
-            data = self._load_existing()
-            if mode == "replace":
-                data["preguntas"] = [p for p in data["preguntas"]
-                    if not (p.get("asignatura") == asignatura and p.get("origen") == origen)]
+            data = self._data()
+            self._id_index(data)
+            # Sin preguntas previas del par no hace falta recorrer el banco
+            if mode == "replace" and self._pairs.get((asignatura, origen)):
+                kept = []
+                for p in data["preguntas"]:
+                    if p.get("asignatura") == asignatura and p.get("origen") == origen:
+                        self._retire(data, p)
+                    else:
+                        kept.append(p)
+                data["preguntas"] = kept
 
             new_entries = self._build_entries(asignatura, origen, valid, data)
             data["preguntas"].extend(new_entries)
-            data["preguntas"].sort(key=lambda p: p["id"])
-            self._save(data)
+            self._store(data)
+            self.last_ids = [e["id"] for e in new_entries]
             logger.info("%d preguntas agregadas para %s (%s)", len(new_entries), asignatura, origen)
             return True
         except Exception as exc:
             logger.exception("Error al construir JSON: %s", exc)
             return False
 
+    def remove_questions(self, ids: Iterable[str]) -> int:
+        """Elimina del JSON las preguntas con esos *ids*; devuelve cuántas se quitaron."""
+        ids = set(ids)
+        if not ids:
+            return 0
+        data = self._data()
+        ids &= self._id_index(data)[1]
+        if not ids:
+            return 0
+        kept = []
+        for p in data["preguntas"]:
+            if p.get("id") in ids:
+                self._retire(data, p)
+            else:
+                kept.append(p)
+        removed = len(data["preguntas"]) - len(kept)
+        data["preguntas"] = kept
+        if removed:
+            self._store(data)
+            logger.info("%d preguntas eliminadas", removed)
+        return removed
+
+    def sync_store(self) -> bool:
+        """Publica el banco actual en SQLite si la base falta o tiene otra versión que el JSON.
+
+        Cubre la primera ejecución con --sqlite sobre un banco que no cambia (sin
+        escritura del JSON no habría publicación). Devuelve True si se ha publicado.
+        """
+        if self.store is None:
+            return False
+        data = self._load_existing()
+        if self.store.version() == int(data.get("version") or 0):
+            return False
+        self._publish_store(data)
+        return True
+
     # ------------------------------------------------------------------
     #  helpers internos
     # ------------------------------------------------------------------
@@ -83,10 +175,17 @@ class JsonBuilder:
             opts = q.get("opciones", [])
             if not (3 <= len(opts) <= 5):
                 logger.warning("[%s-%s] P%d ignorada: %d opciones (se esperan 3‑5)", asign, orig, idx, len(opts))
+                dropped = self.last_stats.setdefault("dropped", {})
+                dropped["options"] = dropped.get("options", 0) + 1
                 continue
 
             # letras únicas A‑E
             letras = {o["letra"].upper() for o in opts}
+            if len(letras) < len(opts):
+                logger.warning("[%s-%s] P%d ignorada: letras de opción repetidas", asign, orig, idx)
+                dropped = self.last_stats.setdefault("dropped", {})
+                dropped["duplicate_letters"] = dropped.get("duplicate_letters", 0) + 1
+                continue
             ans = q.get("respuesta_correcta", "").upper()
 
             if ans not in letras:
@@ -114,6 +213,9 @@ class JsonBuilder:
                 if ans not in letras:
                     logger.warning("[%s-%s] P%d: no se reconoce la letra de respuesta; se marca vacía", asign, orig, idx)
                     ans = ""
+                    self._count("answers_blanked")
+                else:
+                    self._count("answers_remapped")
 
             valids.append({
                 "enunciado": clean_text(q.get("enunciado", "")),
@@ -128,6 +230,9 @@ class JsonBuilder:
             logger.warning("No hay preguntas válidas para %s (%s)", asign, orig)
         return valids
 
+    def _count(self, key: str) -> None:
+        self.last_stats[key] = self.last_stats.get(key, 0) + 1
+
     # --------------------------------------------------------------
     def _load_existing(self) -> Dict[str, Any]:
         if self.output_file.exists() and self.output_file.stat().st_size > 0:
@@ -137,21 +242,45 @@ class JsonBuilder:
                 logger.warning("%s corrupto, se rehace.", self.output_file)
         return {"preguntas": []}
 
+    # --------------------------------------------------------------
+    def _data(self) -> Dict[str, Any]:
+        """Banco sobre el que trabajar: el del lote abierto o el leído del disco."""
+        if not self._batching:
+            return self._load_existing()
+        if self._batch is None:
+            self._batch = self._load_existing()
+        return self._batch
+
+    def _store(self, data: Dict[str, Any]) -> None:
+        """Guarda *data* ahora o, con un lote abierto, al cerrarlo."""
+        if self._batching:
+            self._batch_dirty = True
+            return
+        data["preguntas"].sort(key=lambda p: p["id"])
+        self._save(data)
+
     # --------------------------------------------------------------
     def _build_entries(self, asign: str, orig: str, qs: List[Dict[str, Any]], data: Dict[str, Any]) -> List[Dict[str, Any]]:
         # Generar prefijos a partir de las iniciales de palabras en asignatura y origen
         pref_as = "".join(w[0].upper() for w in asign.split())
         pref_or = "".join(w[0].upper() for w in orig.split())
         id_prefix = f"{pref_as}_{pref_or}_"
-        
-        # Buscar el número más alto existente para este prefijo
-        existing_nums = [int(p["id"].split("_")[-1]) for p in data["preguntas"]
-                         if p["id"].startswith(id_prefix) and p["id"].split("_")[-1].isdigit()]
-        next_idx = max(existing_nums, default=0) + 1
 
+        max_ids, in_use = self._id_index(data)
         new_entries = []
-        for off, q in enumerate(qs, start=next_idx):
-            qid = f"{id_prefix}{off:03d}"
+        for q in qs:
+            # Misma pregunta que una recién quitada: conserva su id (historial y estadísticas)
+            qid = None
+            retired = self._retired.get((id_prefix, _fingerprint(q)))
+            while retired and qid is None:
+                candidate = retired.pop(0)
+                if candidate not in in_use:
+                    qid = candidate
+            if qid is None:
+                max_ids[id_prefix] = max_ids.get(id_prefix, 0) + 1
+                qid = f"{id_prefix}{max_ids[id_prefix]:03d}"
+            in_use.add(qid)
+            self._pairs[(asign, orig)] = self._pairs.get((asign, orig), 0) + 1
             new_entries.append({
                 "id": qid,
                 "asignatura": asign,
@@ -160,7 +289,74 @@ class JsonBuilder:
             })
         return new_entries
 
+    def _id_index(self, data: Dict[str, Any]) -> Tuple[Dict[str, int], Set[str]]:
+        """Número más alto por prefijo e ids en uso de *data* (y preguntas por par en self._pairs).
+
+        Se calcula una vez por banco cargado (una vez por lote) y después se mantiene
+        al insertar y quitar, en vez de recorrer todas las preguntas por archivo. El
+        máximo se guarda en data["ultimos_ids"] y no baja al quitar preguntas: el
+        número de una pregunta borrada no se da a otra distinta.
+        """
+        if self._id_data is not data:
+            max_ids = data.setdefault("ultimos_ids", {})
+            in_use = set()
+            pairs: Dict[Tuple[str, str], int] = {}
+            for p in data["preguntas"]:
+                in_use.add(p["id"])
+                pair = (p.get("asignatura"), p.get("origen"))
+                pairs[pair] = pairs.get(pair, 0) + 1
+                prefix, _, num = p["id"].rpartition("_")
+                if num.isdigit() and int(num) > max_ids.get(prefix + "_", 0):
+                    max_ids[prefix + "_"] = int(num)
+            self._id_data, self._id_max, self._id_set, self._pairs = data, max_ids, in_use, pairs
+        return self._id_max, self._id_set
+
+    def _retire(self, data: Dict[str, Any], question: Dict[str, Any]) -> None:
+        """Anota el id de una pregunta que sale del banco por si vuelve con el mismo contenido."""
+        _, in_use = self._id_index(data)
+        qid = question["id"]
+        in_use.discard(qid)
+        pair = (question.get("asignatura"), question.get("origen"))
+        self._pairs[pair] = self._pairs.get(pair, 1) - 1
+        prefix = qid.rpartition("_")[0] + "_"
+        self._retired.setdefault((prefix, _fingerprint(question)), []).append(qid)
+
     # --------------------------------------------------------------
     def _save(self, data: Dict[str, Any]):
-        self.output_file.parent.mkdir(parents=True, exist_ok=True)
-        self.output_file.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
\ No newline at end of file
+        """Publica *data* con una versión nueva del banco.
+
+        El JSON se sustituye de forma atómica (un bot que lo lea a la vez ve el
+        anterior o el nuevo, nunca uno truncado) e incluye el campo "version", que
+        sube en cada publicación. Después se reescribe <salida>.version con ese
+        número: los bots detectan el archivo nuevo y lo recargan en caliente.
+        """
+        data["version"] = int(data.get("version") or 0) + 1
+        write_atomic(self.output_file, json.dumps(data, ensure_ascii=False, indent=2))
+        write_atomic(self.version_file, f"{data['version']}\n")
+        logger.info("Banco publicado en %s (versión %d, %d preguntas)",
+                    self.output_file, data["version"], len(data["preguntas"]))
+        if self.store is not None:
+            self._publish_store(data)
+
+    def _publish_store(self, data: Dict[str, Any]) -> None:
+        # El JSON ya está publicado: un fallo aquí solo deja la base en la versión anterior
+        try:
+            self.store.publish(data)
+        except Exception as exc:
+            logger.exception("No se pudo publicar %s: %s", self.store.path, exc)
+            self.store_error = f"{type(exc).__name__}: {exc}"
+            return
+        self.store_error = None
+        logger.info("Banco publicado en %s (versión %d)", self.store.path, int(data.get("version") or 0))
+
+
+def _fingerprint(question: Dict[str, Any]) -> str:
+    """Huella del contenido de una pregunta: enunciado y opciones, sin mayúsculas ni espacios de más.
+
+    La respuesta, la explicación y la referencia no cuentan: corregirlas no cambia
+    la pregunta y debe conservar su id.
+    """
+    parts = [" ".join(question.get("enunciado", "").split()).lower()]
+    for o in sorted(question.get("opciones", []), key=lambda o: o["letra"].upper()):
+        parts.append(f"{o['letra'].upper()}\x1e{' '.join(o['texto'].split()).lower()}")
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,147 @@
+"""
+Manifiesto de la extracción incremental.
+
+Guarda, por cada DOCX procesado (ruta relativa al directorio de entrada):
+
+    {
+        "hash": "sha256 del contenido",
+        "size": int,
+        "mtime_ns": int,
+        "asignatura": str,
+        "origen": str,
+        "ids": ["BD_SE_001", …]     # preguntas que generó en el JSON
+    }
+
+Con él, una ejecución solo vuelve a analizar los archivos nuevos o modificados
+y sabe qué preguntas quitar de los que han cambiado o ya no existen. Tamaño y
+mtime sirven de filtro rápido: el hash solo se calcula cuando alguno de los dos
+ha cambiado (un `touch` o una copia que conserva el contenido no provoca
+re-análisis).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from extractor.utils import write_atomic
+
+LOGGER = logging.getLogger("manifest")
+if not LOGGER.handlers:
+    LOGGER.addHandler(logging.NullHandler())
+
+MANIFEST_VERSION = 1
+_CHUNK = 1 << 20  # 1 MB por lectura al calcular el hash
+
+
+def file_hash(path: Union[str, Path]) -> str:
+    """sha256 del contenido de *path*, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Estado de cada DOCX en la última extracción y las preguntas que produjo."""
+
+    def __init__(self, path: Union[str, Path], base_dir: Union[str, Path]):
+        self.path = Path(path)
+        self.base_dir = Path(base_dir)
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    # ------------------------------------------------------------------
+    #  Persistencia
+    # ------------------------------------------------------------------
+    def load(self) -> bool:
+        """Carga el manifiesto; devuelve False si no existe o no es válido (se hará una extracción completa)."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return False
+        except (OSError, json.JSONDecodeError) as exc:
+            LOGGER.warning("Manifiesto %s ilegible (%s); se hará una extracción completa", self.path, exc)
+            return False
+        if data.get("version") != MANIFEST_VERSION:
+            LOGGER.warning("Manifiesto %s con versión %s; se hará una extracción completa",
+                           self.path, data.get("version"))
+            return False
+        self.files = data.get("archivos", {})
+        return True
+
+    def save(self) -> None:
+        # Con fsync, como el banco: un manifiesto viejo tras un corte haría que la siguiente
+        # ejecución volviera a añadir preguntas que ya están publicadas
+        data = {"version": MANIFEST_VERSION, "archivos": dict(sorted(self.files.items()))}
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False, indent=2))
+
+    # ------------------------------------------------------------------
+    #  Comparación con el directorio de entrada
+    # ------------------------------------------------------------------
+    def key(self, path: Union[str, Path]) -> str:
+        path = Path(path)
+        try:
+            return path.relative_to(self.base_dir).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def diff(self, docx_files: Iterable[str]) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Clasifica *docx_files* frente al manifiesto.
+
+        Returns:
+            Tuple[List[str], List[str], List[str]]: (sin cambios, nuevos o modificados,
+            claves de archivos que ya no existen). Los dos primeros conservan el orden de
+            *docx_files*.
+        """
+        unchanged: List[str] = []
+        changed: List[str] = []
+        seen = set()
+        for file_path in docx_files:
+            key = self.key(file_path)
+            seen.add(key)
+            entry = self.files.get(key)
+            if entry is None:
+                changed.append(file_path)
+                continue
+            st = os.stat(file_path)
+            if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]:
+                unchanged.append(file_path)
+                continue
+            if st.st_size == entry["size"] and file_hash(file_path) == entry["hash"]:
+                # Mismo contenido con otra fecha: basta con actualizarla
+                entry["mtime_ns"] = st.st_mtime_ns
+                unchanged.append(file_path)
+                continue
+            changed.append(file_path)
+        deleted = [key for key in self.files if key not in seen]
+        return unchanged, changed, deleted
+
+    def ids(self, key: str) -> List[str]:
+        entry = self.files.get(key)
+        return list(entry["ids"]) if entry else []
+
+    def record(self, file_path: str, asignatura: str, origen: str, ids: List[str]) -> None:
+        """Anota el estado actual de *file_path* y las preguntas que ha producido."""
+        st = os.stat(file_path)
+        self.files[self.key(file_path)] = {
+            "hash": file_hash(file_path),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "asignatura": asignatura,
+            "origen": origen,
+            "ids": list(ids),
+        }
+
+    def forget(self, key: str) -> None:
+        self.files.pop(key, None)
+
+    def clear_pair(self, asignatura: str, origen: str) -> None:
+        """Vacía los ids de las entradas de ese par (el modo replace acaba de sustituir sus preguntas)."""
+        for entry in self.files.values():
+            if entry["asignatura"] == asignatura and entry["origen"] == origen:
+                entry["ids"] = []
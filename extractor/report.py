@@ -0,0 +1,140 @@
+"""
+Informe de validación de una ejecución del extractor.
+
+Los descartes y las respuestas vaciadas solo quedaban en los logs rotativos. El
+informe los recoge por archivo en un JSON (por defecto <salida>.report.json, se
+reescribe en cada ejecución):
+
+    {
+        "started": "2026-…", "seconds": float, "incremental": bool,
+        "totals": {"files", "unchanged", "files_failed" y las cifras de cada archivo sumadas},
+        "thresholds": {"min_questions": 1, ...},
+        "violations": [{"file": str, "check": str, "value": …, "limit": …}],
+        "store": {"path": str, "status": "ok" | "error", "error": str},   # solo con --sqlite
+        "files": [
+            {
+                "file": "ruta relativa", "status": "ok" | "error" | "no_questions" | "build_failed",
+                "error": str,                        # solo si status == "error"
+                "asignatura": str, "origen": str,
+                "lines": int, "ignored_lines": int,
+                "questions_found": int, "questions_kept": int, "questions_added": int,
+                "dropped": {"options": int, "duplicate_letters": int, "no_answer": int,
+                            "answer_not_in_options": int},
+                "answers_blanked": int, "answers_remapped": int,
+                "parse_seconds": float, "build_seconds": float
+            }, …
+        ]
+    }
+
+Los umbrales son opcionales; un archivo que no se ha podido analizar siempre es
+una violación, y también que no se haya podido publicar la base SQLite (check
+"store"). Con `--fail-on-violations` el extractor termina con código 3 si
+hay alguna.
+"""
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from extractor.utils import write_atomic
+
+_COUNTERS = ("lines", "ignored_lines", "questions_found", "questions_kept", "questions_added",
+             "answers_blanked", "answers_remapped")
+_TIMERS = ("parse_seconds", "build_seconds")
+
+
+class ExtractionReport:
+    """Cifras por archivo de una ejecución y comprobación de los umbrales de calidad."""
+
+    def __init__(self, incremental: bool, min_questions: Optional[int] = None,
+                 max_drop_ratio: Optional[float] = None, max_blank_ratio: Optional[float] = None,
+                 max_parse_seconds: Optional[float] = None):
+        self.incremental = incremental
+        self.unchanged = 0
+        self.thresholds = {
+            "min_questions": min_questions,
+            "max_drop_ratio": max_drop_ratio,
+            "max_blank_ratio": max_blank_ratio,
+            "max_parse_seconds": max_parse_seconds,
+        }
+        self.files: List[Dict[str, Any]] = []
+        # Publicación en SQLite (ver store_result); None sin --sqlite
+        self.store: Optional[Dict[str, Any]] = None
+        self.violations: List[Dict[str, Any]] = []
+        self._started = datetime.now()
+        self._t0 = time.perf_counter()
+
+    def file(self, key: str) -> Dict[str, Any]:
+        """Entrada nueva (a cero) para el archivo *key*; se rellena según avanza su proceso."""
+        entry: Dict[str, Any] = {"file": key, "status": "ok", "asignatura": "", "origen": ""}
+        entry.update({name: 0 for name in _COUNTERS})
+        entry["dropped"] = {}
+        entry.update({name: 0.0 for name in _TIMERS})
+        self.files.append(entry)
+        return entry
+
+    def store_result(self, path: Union[str, Path], error: Optional[str]) -> None:
+        """Anota si la base SQLite está publicada (*error* None) o por qué no."""
+        self.store = {"path": str(path), "status": "ok" if error is None else "error"}
+        if error is not None:
+            self.store["error"] = error
+
+    def check(self) -> List[Dict[str, Any]]:
+        """Compara cada archivo con los umbrales; devuelve (y guarda) las violaciones."""
+        t = self.thresholds
+        self.violations = []
+        for entry in self.files:
+            if entry["status"] == "error":
+                self._violation(entry, "error", entry.get("error"), None)
+                continue
+            found, kept = entry["questions_found"], entry["questions_kept"]
+            drop_ratio = sum(entry["dropped"].values()) / found if found else 0.0
+            blank_ratio = entry["answers_blanked"] / kept if kept else 0.0
+            if t["min_questions"] is not None and entry["questions_added"] < t["min_questions"]:
+                self._violation(entry, "min_questions", entry["questions_added"], t["min_questions"])
+            if t["max_drop_ratio"] is not None and drop_ratio > t["max_drop_ratio"]:
+                self._violation(entry, "max_drop_ratio", round(drop_ratio, 3), t["max_drop_ratio"])
+            if t["max_blank_ratio"] is not None and blank_ratio > t["max_blank_ratio"]:
+                self._violation(entry, "max_blank_ratio", round(blank_ratio, 3), t["max_blank_ratio"])
+            if t["max_parse_seconds"] is not None and entry["parse_seconds"] > t["max_parse_seconds"]:
+                self._violation(entry, "max_parse_seconds", round(entry["parse_seconds"], 3),
+                                t["max_parse_seconds"])
+        if self.store is not None and self.store["status"] == "error":
+            # El JSON está bien, pero los bots que leen la base siguen con la versión anterior
+            self._violation({"file": self.store["path"]}, "store", self.store["error"], None)
+        return self.violations
+
+    def _violation(self, entry: Dict[str, Any], check: str, value: Any, limit: Any) -> None:
+        self.violations.append({"file": entry["file"], "check": check, "value": value, "limit": limit})
+
+    def totals(self) -> Dict[str, Any]:
+        totals: Dict[str, Any] = {"files": len(self.files), "unchanged": self.unchanged,
+                                  "files_failed": sum(e["status"] == "error" for e in self.files)}
+        totals.update({name: sum(e[name] for e in self.files) for name in _COUNTERS})
+        dropped: Dict[str, int] = {}
+        for entry in self.files:
+            for reason, n in entry["dropped"].items():
+                dropped[reason] = dropped.get(reason, 0) + n
+        totals["dropped"] = dropped
+        totals.update({name: round(sum((e[name] for e in self.files), 0.0), 3) for name in _TIMERS})
+        return totals
+
+    def save(self, path: Union[str, Path]) -> None:
+        for entry in self.files:
+            for name in _TIMERS:
+                entry[name] = round(entry[name], 3)
+        data = {
+            "started": self._started.isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - self._t0, 3),
+            "incremental": self.incremental,
+            "totals": self.totals(),
+            "thresholds": {k: v for k, v in self.thresholds.items() if v is not None},
+            "violations": self.violations,
+            "files": self.files,
+        }
+        if self.store is not None:
+            data["store"] = self.store
+        write_atomic(path, json.dumps(data, ensure_ascii=False, indent=2))
@@ -0,0 +1,172 @@
+"""
+Banco de preguntas en SQLite, como destino adicional de JsonBuilder.
+
+El JSON obliga a cargar el banco entero para cualquier consulta. Con `--sqlite`
+el extractor publica además una base con el mismo contenido:
+
+    sources        (id, asignatura, origen, preguntas)        único por asignatura-origen
+    questions      (pos, id, source_id, asignatura, pos_asignatura,
+                    enunciado, respuesta_correcta, explicacion, referencia)
+    options        (question, letra, texto)                   clave (question, letra)
+    questions_fts  FTS5 sobre enunciado, opciones, explicación y referencia
+    meta           (key, value): "schema", "version", "fts"
+
+`pos` numera las preguntas 1..N y `pos_asignatura` 1..n dentro de cada
+asignatura, ambas sin huecos e indexadas: una muestra aleatoria se elige entre
+esas posiciones y se lee con una consulta por índice, sin recorrer el banco.
+
+La base se construye entera en un temporal del mismo directorio y se publica con
+os.replace, como el JSON: nunca se modifica en su sitio, así que un lector ve la
+versión anterior o la nueva completa (y le basta con reabrir la conexión cuando
+cambia el archivo).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from extractor.utils import fsync_directory, replacement_mode
+
+LOGGER = logging.getLogger("sqlite_store")
+if not LOGGER.handlers:
+    LOGGER.addHandler(logging.NullHandler())
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE sources (
+    id         INTEGER PRIMARY KEY,
+    asignatura TEXT NOT NULL,
+    origen     TEXT NOT NULL,
+    preguntas  INTEGER NOT NULL,
+    UNIQUE (asignatura, origen)
+);
+CREATE INDEX sources_origen ON sources (origen);
+CREATE TABLE questions (
+    pos                INTEGER PRIMARY KEY,
+    id                 TEXT NOT NULL UNIQUE,
+    source_id          INTEGER NOT NULL REFERENCES sources (id),
+    asignatura         TEXT NOT NULL,
+    pos_asignatura     INTEGER NOT NULL,
+    enunciado          TEXT NOT NULL,
+    respuesta_correcta TEXT NOT NULL,
+    explicacion        TEXT NOT NULL,
+    referencia         TEXT NOT NULL
+);
+CREATE UNIQUE INDEX questions_asignatura ON questions (asignatura, pos_asignatura);
+CREATE INDEX questions_source ON questions (source_id);
+CREATE TABLE options (
+    question INTEGER NOT NULL REFERENCES questions (pos),
+    letra    TEXT NOT NULL,
+    texto    TEXT NOT NULL,
+    PRIMARY KEY (question, letra)
+) WITHOUT ROWID;
+"""
+
+# Sin acentos para buscar: "transaccion" encuentra "transacción"
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE questions_fts USING fts5(
+    enunciado, opciones, explicacion, referencia,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+class SqliteStore:
+    """Publica el banco (el dict que guarda JsonBuilder) como base SQLite."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def version(self) -> Optional[int]:
+        """Versión del banco publicada en la base, o None si no existe o no es legible."""
+        if not self.path.exists():
+            return None
+        try:
+            conn = sqlite3.connect(self.path.resolve().as_uri() + "?mode=ro", uri=True)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+        return int(row[0]) if row else None
+
+    def publish(self, data: Dict[str, Any]) -> None:
+        """Construye la base con las preguntas de *data* y la sustituye de forma atómica."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            os.chmod(tmp, replacement_mode(self.path))
+            conn = sqlite3.connect(tmp)
+            try:
+                # Es un archivo nuevo que nadie lee todavía: sin diario ni fsync por sentencia
+                conn.execute("PRAGMA journal_mode = OFF")
+                conn.execute("PRAGMA synchronous = OFF")
+                self._fill(conn, data)
+                conn.commit()
+            finally:
+                conn.close()
+            with open(tmp, "rb+") as fh:
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        fsync_directory(self.path.parent)
+
+    # ------------------------------------------------------------------
+    #  helpers internos
+    # ------------------------------------------------------------------
+    def _fill(self, conn: sqlite3.Connection, data: Dict[str, Any]) -> None:
+        conn.executescript(SCHEMA)
+        try:
+            conn.executescript(FTS_SCHEMA)
+            fts = True
+        except sqlite3.OperationalError as exc:
+            # SQLite compilado sin FTS5: la base sirve igual, solo sin búsqueda de texto
+            LOGGER.warning("%s sin búsqueda de texto (%s)", self.path.name, exc)
+            fts = False
+
+        sources: Dict[tuple, int] = {}
+        counts: Dict[tuple, int] = {}
+        per_subject: Dict[str, int] = {}
+        questions, options, texts = [], [], []
+        for pos, q in enumerate(data.get("preguntas", []), 1):
+            key = (q["asignatura"], q["origen"])
+            source_id = sources.setdefault(key, len(sources) + 1)
+            counts[key] = counts.get(key, 0) + 1
+            per_subject[q["asignatura"]] = per_subject.get(q["asignatura"], 0) + 1
+            questions.append((pos, q["id"], source_id, q["asignatura"], per_subject[q["asignatura"]],
+                              q.get("enunciado", ""), q.get("respuesta_correcta", ""),
+                              q.get("explicacion", ""), q.get("referencia", "")))
+            options.extend((pos, o["letra"], o["texto"]) for o in q.get("opciones", []))
+            if fts:
+                texts.append((pos, q.get("enunciado", ""), "\n".join(o["texto"] for o in q.get("opciones", [])),
+                              q.get("explicacion", ""), q.get("referencia", "")))
+
+        conn.executemany("INSERT INTO sources (id, asignatura, origen, preguntas) VALUES (?, ?, ?, ?)",
+                         [(sid, asig, orig, counts[(asig, orig)]) for (asig, orig), sid in sources.items()])
+        conn.executemany("INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", questions)
+        conn.executemany("INSERT INTO options (question, letra, texto) VALUES (?, ?, ?)", options)
+        if fts:
+            conn.executemany("INSERT INTO questions_fts (rowid, enunciado, opciones, explicacion, referencia) "
+                             "VALUES (?, ?, ?, ?, ?)", texts)
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ("schema", str(SCHEMA_VERSION)),
+            ("version", str(int(data.get("version") or 0))),
+            ("fts", "1" if fts else "0"),
+        ])
+        conn.execute("ANALYZE")
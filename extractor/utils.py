@@ -5,6 +5,9 @@ Utilidades para el extractor de preguntas.
 from __future__ import annotations
 
 import logging
+import os
+import stat
+import tempfile
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import List, Union
@@ -36,6 +39,13 @@ if not any(isinstance(h, RotatingFileHandler) for h in _logger.handlers):
 # --------------------------------------------------------------------------- #
 
 
+def is_docx_name(name: str) -> bool:
+    """
+    True si *name* es un .docx a procesar: no los temporales de Word, que empiezan por "~$".
+    """
+    return name.endswith(".docx") and not name.startswith("~$")
+
+
 def get_docx_files(directory: Union[str, Path]) -> List[str]:
     """
     Devuelve lista de rutas a archivos .docx dentro de *directory* (recursivo).
@@ -45,7 +55,7 @@ def get_docx_files(directory: Union[str, Path]) -> List[str]:
         dir_path = Path(directory)
         docx_files = [
             str(p) for p in dir_path.rglob("*.docx")
-            if not p.name.startswith("~$")
+            if is_docx_name(p.name)
         ]
         _logger.info("Se encontraron %s archivos DOCX en %s", len(docx_files), directory)
         return docx_files
@@ -66,6 +76,63 @@ def ensure_directory_exists(directory: Union[str, Path]) -> bool:
         return False
 
 
+def write_atomic(path: Union[str, Path], text: str) -> None:
+    """
+    Escribe *text* en *path* sin que un lector pueda ver nunca el archivo a medias.
+
+    Se escribe en un temporal del mismo directorio, se hace fsync y se renombra
+    encima del destino (os.replace es atómico dentro de un mismo sistema de
+    archivos); después se sincroniza el directorio para que el rename sobreviva a
+    un corte de luz.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.fchmod(fd, replacement_mode(path))
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    fsync_directory(path.parent)
+
+
+def replacement_mode(path: Union[str, Path]) -> int:
+    """
+    Permisos para el archivo que sustituirá a *path*: los que ya tiene o, si no
+    existe, los de un archivo recién creado (0o666 menos la umask).
+
+    mkstemp crea el temporal con 0o600; sin esto cada publicación dejaría el JSON
+    o la base ilegibles para un bot que corra con otro usuario del mismo grupo.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def fsync_directory(directory: Union[str, Path]) -> None:
+    """Sincroniza *directory* para que un rename reciente sobreviva a un corte de luz."""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # p. ej. Windows, donde no se pueden abrir directorios
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
 def clean_text(text: str) -> str:
     """
     Normaliza espacios y elimina saltos de línea/tabulaciones extra en *text*.
@@ -0,0 +1,216 @@
+"""
+Vigilancia del directorio de entrada para el modo `--watch` del extractor.
+
+`DocxWatcher.wait()` bloquea hasta que cambia algún .docx (nuevo, modificado,
+borrado o renombrado, en cualquier subdirectorio) y no consume CPU mientras
+tanto:
+
+* En Linux usa inotify directamente con ctypes (sin dependencias): el proceso
+  duerme en `select()` hasta que el kernel notifica un evento. Word guarda en un
+  temporal y lo renombra, así que basta con IN_CLOSE_WRITE e IN_MOVED_TO/FROM
+  para los archivos, más la creación o borrado de subdirectorios.
+* En otro caso (o con `poll=True`, p. ej. en carpetas de red donde inotify no
+  ve los cambios remotos) compara cada `poll_interval` segundos el tamaño y el
+  mtime de los .docx.
+
+En ambos se ignoran los temporales "~$" de Word, como en `get_docx_files`.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from extractor.utils import is_docx_name
+
+LOGGER = logging.getLogger("watcher")
+if not LOGGER.handlers:
+    LOGGER.addHandler(logging.NullHandler())
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+               | IN_DELETE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (y después el nombre)
+
+
+class DocxWatcher:
+    """Espera cambios en los .docx de un directorio (inotify o sondeo)."""
+
+    def __init__(self, directory: Union[str, Path], poll: bool = False, poll_interval: float = 5.0):
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._watches: Dict[int, Path] = {}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        self._libc = None if poll else _load_libc()
+        if self._libc is not None:
+            try:
+                self._start_inotify()
+            except OSError as exc:
+                LOGGER.warning("inotify no disponible (%s); se sondeará cada %.0f s", exc, poll_interval)
+                self._fall_back_to_polling()
+        if self._libc is None:
+            self._snapshot = self._scan()
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._fd is not None else "sondeo"
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Bloquea hasta que cambia algún .docx o pasan *timeout* segundos (None = sin límite).
+
+        Returns:
+            bool: True si ha habido cambios.
+        """
+        if self._fd is not None:
+            return self._wait_inotify(timeout)
+        return self._wait_poll(timeout)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._watches.clear()
+
+    # ------------------------------------------------------------------
+    #  inotify
+    # ------------------------------------------------------------------
+    def _start_inotify(self) -> None:
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        self._add_tree(self.directory)
+
+    def _add_tree(self, root: Path) -> None:
+        """Vigila *root* y todos sus subdirectorios (rglob en get_docx_files también baja por ellos)."""
+        for dirpath, _, _ in os.walk(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), _WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    # Límite de fs.inotify.max_user_watches: sin vigilancia no hay garantías
+                    raise OSError(err, "límite de vigilancias de inotify alcanzado")
+                LOGGER.debug("No se vigila %s: %s", dirpath, os.strerror(err))
+                continue
+            self._watches[wd] = Path(dirpath)
+
+    def _fall_back_to_polling(self) -> None:
+        self.close()
+        self._libc = None
+
+    def _wait_inotify(self, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if not ready:
+                return False
+            if self._read_events():
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def _read_events(self) -> bool:
+        """Lee los eventos pendientes; True si alguno afecta a un .docx."""
+        changed = False
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # Se han perdido eventos: mejor una extracción (incremental) de más
+                    changed = True
+                elif mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                elif mask & IN_ISDIR:
+                    parent = self._watches.get(wd)
+                    if parent is not None and mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            self._add_tree(parent / name)
+                        except OSError as exc:
+                            # Sin vigilar el subdirectorio nuevo sus .docx pasarían inadvertidos
+                            LOGGER.warning("No se puede vigilar %s (%s); se sondeará cada %.0f s",
+                                           parent / name, exc, self.poll_interval)
+                            self._fall_back_to_polling()
+                            self._snapshot = self._scan()
+                            return True
+                    # Un directorio que entra, sale o desaparece puede llevar .docx
+                    changed = changed or bool(mask & (IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE))
+                elif mask & IN_DELETE_SELF:
+                    changed = True
+                elif is_docx_name(name) and not mask & IN_CREATE:
+                    # La creación no basta: el contenido llega con IN_CLOSE_WRITE
+                    changed = True
+
+    # ------------------------------------------------------------------
+    #  Sondeo
+    # ------------------------------------------------------------------
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                if is_docx_name(name):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue  # borrado mientras se recorría
+                    snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def _wait_poll(self, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.poll_interval if deadline is None else min(self.poll_interval,
+                                                                        deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+            snapshot = self._scan()
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+
+def _load_libc():
+    """libc con inotify (Linux), o None si no la hay."""
+    if not hasattr(select, "select") or os.name != "posix":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc